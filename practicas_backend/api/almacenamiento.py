@@ -0,0 +1,103 @@
+"""
+Almacenamiento direccionado por contenido para los archivos subidos.
+
+Cada archivo se guarda como cas/ab/cd/<hash><ext>, donde <hash> es el
+HashContenido (sha256 por bloques, el mismo de las subidas fragmentadas) de su
+contenido. Dos subidas idénticas terminan en el mismo archivo: ArchivoContenido
+lleva la cuenta de cuántos FileField lo referencian y el archivo se borra
+cuando la cuenta llega a cero. Como el contenido de un nombre nunca cambia, se
+puede servir con caché inmutable.
+
+Los nombres anteriores (informes/, boletas_pago/, ...) se siguen leyendo
+normalmente hasta que `rehashear_media` los migra.
+"""
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from .models import ArchivoContenido
+from .subidas import HashContenido
+
+PREFIJO_CONTENIDO = 'cas/'
+
+
+def es_nombre_por_contenido(nombre):
+    return bool(nombre) and nombre.startswith(PREFIJO_CONTENIDO)
+
+
+def nombre_por_contenido(hash_contenido, extension):
+    return f'{PREFIJO_CONTENIDO}{hash_contenido[:2]}/{hash_contenido[2:4]}/{hash_contenido}{extension}'
+
+
+def _extension(nombre):
+    # Se conserva para que el tipo de contenido se deduzca al servir el archivo
+    return os.path.splitext(nombre)[1].lower()[:10]
+
+
+class AlmacenamientoPorContenido(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo lo decide _save a partir del contenido
+        return name
+
+    def _save(self, name, content):
+        directorio = self.path(f'{PREFIJO_CONTENIDO}tmp')
+        os.makedirs(directorio, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=directorio)
+        hash_contenido = HashContenido()
+        try:
+            with os.fdopen(descriptor, 'wb') as destino:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for fragmento in content.chunks():
+                    destino.write(fragmento)
+                    hash_contenido.update(fragmento)
+        except BaseException:
+            os.remove(temporal)
+            raise
+        return self.adoptar(temporal, hash_contenido.hexdigest(), _extension(name))
+
+    def adoptar(self, ruta, hash_contenido, extension, referencias=1):
+        """
+        Incorpora al almacén un archivo local cuyo hash ya se conoce (por ejemplo,
+        una subida fragmentada) y suma `referencias`. Si el contenido ya estaba,
+        el archivo local se descarta. Devuelve el nombre por contenido.
+        """
+        nombre = nombre_por_contenido(hash_contenido, extension)
+        destino = self.path(nombre)
+        with transaction.atomic():
+            registro, _ = ArchivoContenido.objects.select_for_update().get_or_create(
+                nombre=nombre,
+                defaults={'hash_contenido': hash_contenido, 'tamano': os.path.getsize(ruta)}
+            )
+            if os.path.exists(destino):
+                os.remove(ruta)
+            else:
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                os.replace(ruta, destino)
+                os.chmod(destino, self.file_permissions_mode or 0o644)
+            ArchivoContenido.objects.filter(pk=registro.pk).update(referencias=F('referencias') + referencias)
+        return nombre
+
+    def liberar(self, nombre):
+        """Resta una referencia y borra el archivo cuando ya nadie lo usa."""
+        with transaction.atomic():
+            registro = ArchivoContenido.objects.select_for_update().filter(nombre=nombre).first()
+            if registro is None:
+                return
+            if registro.referencias > 1:
+                ArchivoContenido.objects.filter(pk=registro.pk).update(referencias=F('referencias') - 1)
+                return
+            registro.delete()
+            try:
+                os.remove(self.path(nombre))
+            except FileNotFoundError:
+                pass
+
+    def delete(self, name):
+        # Un nombre por contenido puede estar compartido: lo borra liberar()
+        if not es_nombre_por_contenido(name):
+            super().delete(name)
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .models import Usuario
+from .revocacion import registro_revocaciones
+
+
+class RefreshTokenConRol(RefreshToken):
+    """Refresh token que además lleva `rol` y `username` como claims firmados."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['rol'] = user.rol
+        token['username'] = user.username
+        return token
+
+
+class TokenConRolSerializer(TokenObtainPairSerializer):
+    token_class = RefreshTokenConRol
+
+
+class TokenRefreshConRevocacionSerializer(TokenRefreshSerializer):
+    """
+    Rechaza refresh tokens revocados y, si el token lleva claims de rol,
+    los vuelve a leer de la base para que un cambio de rol o una baja se
+    reflejen en el siguiente access token.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if registro_revocaciones.revocado(refresh):
+            raise InvalidToken('El token fue revocado')
+
+        data = super().validate(attrs)
+        if 'rol' in refresh:
+            usuario = Usuario.objects.filter(
+                pk=refresh[api_settings.USER_ID_CLAIM], is_active=True
+            ).values('rol', 'username').first()
+            if usuario is None:
+                raise InvalidToken('Usuario inactivo o inexistente')
+            access = AccessToken(data['access'])
+            access['rol'] = usuario['rol']
+            access['username'] = usuario['username']
+            data['access'] = str(access)
+        return data
+
+
+class JWTAutenticacionConRol(JWTAuthentication):
+    """
+    Con JWT_SIN_ESTADO activo, arma request.user a partir de los claims del
+    token sin consultar la base de datos. El usuario es una instancia de Usuario
+    con id, username y rol cargados y el resto de campos diferidos: la fila se
+    lee (una sola vez) solo si la vista accede a otro campo. Los tokens sin el
+    claim `rol` siguen el camino normal de simplejwt. En ambos modos se
+    rechazan los tokens revocados.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if registro_revocaciones.revocado(validated_token):
+            raise InvalidToken('El token fue revocado')
+        return validated_token
+
+    def get_user(self, validated_token):
+        if not getattr(settings, 'JWT_SIN_ESTADO', False) or 'rol' not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('El token no contiene una identificación de usuario')
+
+        claims = {
+            'id': user_id,
+            'username': validated_token.get('username'),
+            'rol': validated_token['rol'],
+        }
+        campos = [field.attname for field in Usuario._meta.concrete_fields if field.attname in claims]
+        return Usuario.from_db(DEFAULT_DB_ALIAS, campos, [claims[campo] for campo in campos])
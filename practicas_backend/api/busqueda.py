@@ -0,0 +1,237 @@
+"""
+Búsqueda de texto completo en informes.
+
+Índice invertido propio en dos tablas (EntradaIndice: término -> informe con
+frecuencia y posiciones; InformeIndexado: largo y firma de cada informe), así
+que funciona igual en SQLite y en MySQL sin FULLTEXT ni extensiones. Se
+actualiza al guardar cada informe y se reconstruye con `reindexar_informes`.
+
+Los términos se normalizan a minúsculas y sin tildes. Una consulta devuelve los
+informes que contienen todos sus términos, ordenados por BM25 con un extra
+cuando los términos aparecen seguidos como en la consulta.
+"""
+import hashlib
+import io
+import logging
+import math
+import os
+import re
+import unicodedata
+import zipfile
+from collections import defaultdict
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Case, Count, FloatField, IntegerField, Value, When
+
+from .models import EntradaIndice, Informe, InformeIndexado
+
+TOKEN = re.compile(r'\w+')
+LARGO_MAXIMO_TERMINO = 64
+PALABRAS_VACIAS = frozenset(
+    'a al algo con contra de del desde el en entre era es esta este esto ha la las le lo los mas '
+    'me mi no o para pero por que se sin sobre su sus un una uno y ya'.split()
+)
+# Parámetros habituales de BM25
+K1 = 1.2
+B = 0.75
+BONO_FRASE = 1.5
+
+logger = logging.getLogger(__name__)
+_aviso_pdf = False
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def terminos(texto, limite=None):
+    """Términos del texto en orden; la posición de cada uno es su índice en la lista."""
+    resultado = []
+    for coincidencia in TOKEN.finditer(normalizar(texto)):
+        termino = coincidencia.group()
+        if len(termino) < 2 or termino in PALABRAS_VACIAS:
+            continue
+        resultado.append(termino[:LARGO_MAXIMO_TERMINO])
+        if limite and len(resultado) >= limite:
+            break
+    return resultado
+
+
+def _texto_docx(datos):
+    with zipfile.ZipFile(io.BytesIO(datos)) as docx:
+        xml = docx.read('word/document.xml')
+    return ' '.join(ElementTree.fromstring(xml).itertext())
+
+
+def extractor_pdf_disponible():
+    try:
+        import pypdf  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _texto_pdf(datos):
+    global _aviso_pdf
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        # Sin pypdf (ver requirements.txt) solo se indexa el contenido escrito del informe
+        if not _aviso_pdf:
+            _aviso_pdf = True
+            logger.warning('pypdf no está instalado: el texto de los PDF no se indexa')
+        return ''
+    return ' '.join(pagina.extract_text() or '' for pagina in PdfReader(io.BytesIO(datos)).pages)
+
+
+EXTRACTORES = {
+    '.txt': lambda datos: datos.decode('utf-8', errors='ignore'),
+    '.md': lambda datos: datos.decode('utf-8', errors='ignore'),
+    '.docx': _texto_docx,
+    '.pdf': _texto_pdf,
+}
+
+
+def texto_documento(archivo):
+    """Texto del documento subido, o '' si el formato no se reconoce o no se puede leer."""
+    extractor = EXTRACTORES.get(os.path.splitext(archivo.name)[1].lower())
+    if extractor is None:
+        return ''
+    try:
+        with archivo.open('rb') as origen:
+            return extractor(origen.read())
+    except Exception:
+        # Un documento dañado no debe impedir guardar el informe
+        return ''
+
+
+def _firma(informe):
+    datos = f'{informe.contenido}\0{informe.documento.name if informe.documento else ""}'
+    return hashlib.sha256(datos.encode()).hexdigest()
+
+
+def indexar_informe(informe, forzar=False):
+    """Reemplaza las entradas del informe si cambió su contenido o su documento."""
+    firma = _firma(informe)
+    if not forzar and InformeIndexado.objects.filter(informe_id=informe.pk, firma=firma).exists():
+        return False
+
+    texto = informe.contenido or ''
+    if informe.documento:
+        texto = f'{texto}\n{texto_documento(informe.documento)}'
+    lista = terminos(texto, getattr(settings, 'BUSQUEDA_MAX_TERMINOS', None))
+    posiciones = defaultdict(list)
+    for posicion, termino in enumerate(lista):
+        posiciones[termino].append(posicion)
+
+    with transaction.atomic():
+        EntradaIndice.objects.filter(informe_id=informe.pk).delete()
+        EntradaIndice.objects.bulk_create([
+            EntradaIndice(termino=termino, informe_id=informe.pk, frecuencia=len(lugares), posiciones=lugares)
+            for termino, lugares in posiciones.items()
+        ], batch_size=500)
+        InformeIndexado.objects.update_or_create(
+            informe_id=informe.pk, defaults={'longitud': len(lista), 'firma': firma}
+        )
+    return True
+
+
+def _hay_frase(posiciones_por_termino, consulta):
+    # ¿Algún inicio p tal que consulta[i] aparezca en p + i para todos los términos?
+    conjuntos = [set(posiciones_por_termino[t]) for t in consulta]
+    return any(all(p + i in conjuntos[i] for i in range(1, len(consulta))) for p in conjuntos[0])
+
+
+def buscar(consulta, informes=None):
+    """
+    Lista de (informe_id, puntaje) de mayor a menor. `informes` restringe la
+    búsqueda (por ejemplo, a los visibles para el usuario).
+    """
+    consulta = terminos(consulta)
+    unicos = list(dict.fromkeys(consulta))
+    if not unicos:
+        return []
+
+    frecuencia_documentos = dict(
+        EntradaIndice.objects.filter(termino__in=unicos)
+        .values('termino').annotate(total=Count('id')).values_list('termino', 'total')
+    )
+    if len(frecuencia_documentos) < len(unicos):
+        # Algún término no aparece en ningún informe
+        return []
+    totales = InformeIndexado.objects.aggregate(n=Count('informe'), promedio=Avg('longitud'))
+    promedio = totales['promedio'] or 1
+
+    # Se empieza por el término más raro para traer la menor cantidad de filas
+    candidatos = None
+    for termino in sorted(unicos, key=frecuencia_documentos.get):
+        filas = EntradaIndice.objects.filter(termino=termino)
+        if informes is not None:
+            filas = filas.filter(informe__in=informes)
+        if candidatos is not None:
+            filas = filas.filter(informe_id__in=candidatos)
+        candidatos = set(filas.values_list('informe_id', flat=True))
+        if not candidatos:
+            return []
+
+    entradas = defaultdict(dict)
+    for informe_id, termino, frecuencia, posiciones in EntradaIndice.objects.filter(
+        termino__in=unicos, informe_id__in=candidatos
+    ).values_list('informe_id', 'termino', 'frecuencia', 'posiciones'):
+        entradas[informe_id][termino] = (frecuencia, posiciones)
+    longitudes = dict(
+        InformeIndexado.objects.filter(informe_id__in=candidatos).values_list('informe_id', 'longitud')
+    )
+
+    resultados = []
+    for informe_id, por_termino in entradas.items():
+        largo = longitudes.get(informe_id, 0)
+        puntaje = 0.0
+        for termino, (frecuencia, _) in por_termino.items():
+            df = frecuencia_documentos[termino]
+            idf = math.log(1 + (totales['n'] - df + 0.5) / (df + 0.5))
+            puntaje += idf * frecuencia * (K1 + 1) / (frecuencia + K1 * (1 - B + B * largo / promedio))
+        if len(consulta) > 1 and _hay_frase({t: p for t, (_, p) in por_termino.items()}, consulta):
+            puntaje *= BONO_FRASE
+        resultados.append((informe_id, puntaje))
+    resultados.sort(key=lambda r: (-r[1], r[0]))
+    return resultados
+
+
+def ranking_busqueda(queryset, consulta):
+    """Ranking de los informes del queryset, recortado a BUSQUEDA_MAX_RESULTADOS."""
+    return buscar(consulta, queryset.values('pk'))[:getattr(settings, 'BUSQUEDA_MAX_RESULTADOS', 500)]
+
+
+def ordenar_por_relevancia(queryset, ranking):
+    """Restringe el queryset a los informes del ranking, en su orden y con `relevancia` anotada."""
+    if not ranking:
+        return queryset.none()
+    return queryset.filter(pk__in=[pk for pk, _ in ranking]).annotate(
+        relevancia=Case(*(When(pk=pk, then=Value(puntaje)) for pk, puntaje in ranking), output_field=FloatField()),
+        orden_busqueda=Case(*(When(pk=pk, then=Value(i)) for i, (pk, _) in enumerate(ranking)), output_field=IntegerField()),
+    ).order_by('orden_busqueda')
+
+
+def reindexar(lote=200, forzar=False, salida=None):
+    """Indexa los informes en lotes por rango de id; devuelve (revisados, reindexados)."""
+    revisados = reindexados = 0
+    ultimo = 0
+    while True:
+        informes = list(
+            Informe.objects.filter(pk__gt=ultimo).order_by('pk')
+            .only('pk', 'contenido', 'documento')[:lote]
+        )
+        if not informes:
+            return revisados, reindexados
+        # Un commit por lote y no por informe
+        with transaction.atomic():
+            for informe in informes:
+                reindexados += indexar_informe(informe, forzar=forzar)
+        revisados += len(informes)
+        ultimo = informes[-1].pk
+        if salida is not None:
+            salida(f'{revisados} informes revisados')
@@ -0,0 +1,166 @@
+"""
+Caché de respuestas de lectura (list/retrieve) con invalidación por etiquetas.
+
+Cada respuesta se guarda junto con la versión vigente de las etiquetas de las
+instancias que contiene ('api.practica:7') y de la colección que lista
+('api.practica:*'). Invalidar una etiqueta es reemplazar su versión, así que
+una entrada es válida solo si todas sus etiquetas siguen en la versión con que
+se guardó. No depende de borrar por patrón ni de un servicio externo: funciona
+con los backends de memoria local y de archivos de Django. Con varios procesos
+hay que usar el de archivos (u otro compartido) para que las invalidaciones de
+un proceso lleguen a los demás.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+PREFIJO_ETIQUETA = 'etq:'
+PREFIJO_RESPUESTA = 'resp:'
+
+
+def periodo_firma():
+    """
+    (número, inicio en segundos epoch) del periodo vigente de las URLs firmadas
+    de descarga (api/media.py). Dura media MEDIA_FIRMA_VIGENCIA y entra en la
+    clave de caché y en el ETag de las respuestas: un cuerpo guardado o
+    validado con 304 deja de servirse al cambiar de periodo, cuando a sus
+    enlaces todavía les queda al menos media vigencia.
+    """
+    duracion = max(settings.MEDIA_FIRMA_VIGENCIA // 2, 1)
+    numero = int(time.time()) // duracion
+    return numero, numero * duracion
+
+
+def _cache():
+    return caches[getattr(settings, 'CACHE_RESPUESTAS_ALIAS', 'default')]
+
+
+def etiqueta(modelo, pk=None):
+    """Etiqueta de una instancia o, sin pk, de la colección completa del modelo."""
+    return f"{modelo._meta.label_lower}:{'*' if pk is None else pk}"
+
+
+def versiones_etiquetas(etiquetas):
+    cache = _cache()
+    claves = {PREFIJO_ETIQUETA + e: e for e in etiquetas}
+    actuales = cache.get_many(claves)
+    faltantes = {clave: uuid.uuid4().hex for clave in claves if clave not in actuales}
+    for clave, version in faltantes.items():
+        # add() no pisa la versión que otro proceso haya escrito entre tanto
+        if not cache.add(clave, version, timeout=None):
+            version = cache.get(clave, version)
+        actuales[clave] = version
+    return {claves[clave]: version for clave, version in actuales.items()}
+
+
+def _invalidar_ahora(etiquetas):
+    _cache().set_many({PREFIJO_ETIQUETA + e: uuid.uuid4().hex for e in etiquetas}, timeout=None)
+
+
+def invalidar(*etiquetas):
+    """
+    Invalida las etiquetas de inmediato y otra vez al confirmar la transacción,
+    por si una lectura concurrente guardó en la caché datos aún sin confirmar.
+    """
+    etiquetas = set(etiquetas)
+    if not etiquetas:
+        return
+    _invalidar_ahora(etiquetas)
+    transaction.on_commit(lambda: _invalidar_ahora(etiquetas))
+
+
+def obtener(clave):
+    entrada = _cache().get(PREFIJO_RESPUESTA + clave)
+    if entrada is None:
+        return None
+    versiones = versiones_etiquetas(entrada['versiones'])
+    if versiones != entrada['versiones']:
+        return None
+    return entrada['datos']
+
+
+def guardar(clave, datos, etiquetas, versiones=None):
+    """
+    Guarda la respuesta con las versiones de sus etiquetas. Conviene leer las
+    versiones antes de consultar los datos: si algo se invalida mientras se arma
+    la respuesta, la entrada nace vencida.
+    """
+    if versiones is None:
+        versiones = versiones_etiquetas(etiquetas)
+    else:
+        versiones = {**versiones, **versiones_etiquetas(set(etiquetas) - set(versiones))}
+    _cache().set(
+        PREFIJO_RESPUESTA + clave,
+        {'versiones': versiones, 'datos': datos},
+        timeout=getattr(settings, 'CACHE_RESPUESTAS_TTL', 300)
+    )
+
+
+class CacheRespuestasMixin:
+    """
+    Cachea list y retrieve de un ModelViewSet. La clave combina endpoint,
+    parámetros de consulta y el alcance del usuario (`alcance_cache`); las
+    etiquetas salen de los objetos serializados (`etiquetas_objeto`).
+    """
+
+    def alcance_cache(self):
+        # Por defecto todos los usuarios de un mismo rol ven lo mismo
+        return getattr(self.request.user, 'rol', '')
+
+    def etiquetas_objeto(self, objeto):
+        return [etiqueta(type(objeto), objeto.pk)]
+
+    def etiquetas_alcance(self):
+        # Etiquetas de lo que define qué filas ve el usuario, si depende de él
+        return []
+
+    def _clave_cache(self):
+        partes = [
+            type(self).__module__, type(self).__name__, self.action,
+            repr(sorted(self.kwargs.items())),
+            repr(sorted(self.request.query_params.lists())),
+            str(self.alcance_cache()),
+            str(periodo_firma()[0]),
+        ]
+        return hashlib.sha256('|'.join(partes).encode()).hexdigest()
+
+    def _responder_con_cache(self, construir, etiquetas_base):
+        clave = self._clave_cache()
+        datos = obtener(clave)
+        if datos is not None:
+            return Response(datos)
+
+        versiones = versiones_etiquetas(etiquetas_base)
+        datos, objetos = construir()
+        etiquetas = set(etiquetas_base)
+        for objeto in objetos:
+            etiquetas.update(self.etiquetas_objeto(objeto))
+        guardar(clave, datos, etiquetas, versiones)
+        return Response(datos)
+
+    def list(self, request, *args, **kwargs):
+        def construir():
+            queryset = self.filter_queryset(self.get_queryset())
+            pagina = self.paginate_queryset(queryset)
+            objetos = list(pagina if pagina is not None else queryset)
+            datos = self.get_serializer(objetos, many=True).data
+            if pagina is not None:
+                datos = self.get_paginated_response(datos).data
+            return datos, objetos
+
+        etiquetas = [etiqueta(self.get_queryset().model), *self.etiquetas_alcance()]
+        return self._responder_con_cache(construir, etiquetas)
+
+    def retrieve(self, request, *args, **kwargs):
+        def construir():
+            instancia = self.get_object()
+            return self.get_serializer(instancia).data, [instancia]
+
+        modelo = self.get_queryset().model
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return self._responder_con_cache(construir, [etiqueta(modelo, lookup), *self.etiquetas_alcance()])
@@ -0,0 +1,79 @@
+"""
+GET condicional (ETag / Last-Modified) para listados y detalles.
+
+La firma de una respuesta sale de una sola consulta agregada sobre el queryset
+ya filtrado (cantidad de filas, max(updated_at) y suma de versiones) más la
+forma pedida (parámetros, formato y alcance del usuario) y el periodo de las
+URLs firmadas. Si coincide con If-None-Match se responde 304 sin serializar nada.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .cache_respuestas import etiqueta, periodo_firma, versiones_etiquetas
+
+
+class RespuestaCondicionalMixin:
+    # Otros updated_at que afectan la respuesta, p. ej. 'practica__updated_at'
+    campos_modificacion_etag = ()
+    # Modelos anidados sin updated_at: se usa la versión de su etiqueta de caché
+    modelos_anidados_etag = ()
+
+    def alcance_etag(self):
+        return f'{getattr(self.request.user, "rol", "")}:{self.request.user.pk}'
+
+    def _firma(self, queryset):
+        agregados = {'total': Count('pk'), 'ultima': Max('updated_at'), 'versiones': Sum('version')}
+        for i, campo in enumerate(self.campos_modificacion_etag):
+            agregados[f'relacion_{i}'] = Max(campo)
+        fila = queryset.order_by().aggregate(**agregados)
+
+        anidados = versiones_etiquetas([etiqueta(modelo) for modelo in self.modelos_anidados_etag])
+        # Las URLs firmadas de la respuesta vencen aunque las filas no cambien
+        periodo, inicio_periodo = periodo_firma()
+        partes = [
+            type(self).__name__, self.action, self.request.accepted_renderer.format,
+            repr(sorted(self.request.query_params.lists())), self.alcance_etag(),
+            repr(sorted(fila.items())), repr(sorted(anidados.items())), str(periodo),
+        ]
+        etag = '"%s"' % hashlib.sha256('|'.join(partes).encode()).hexdigest()[:32]
+        ultima = max(
+            (valor for clave, valor in fila.items() if clave not in ('total', 'versiones') and valor),
+            default=None
+        )
+        if ultima is not None:
+            # Por lo mismo, If-Modified-Since no valida un cuerpo de un periodo anterior
+            ultima = max(ultima, datetime.fromtimestamp(inicio_periodo, tz=dt_timezone.utc))
+        return fila['total'], etag, ultima
+
+    def _responder_condicional(self, queryset, detalle, metodo, request, *args, **kwargs):
+        total, etag, ultima = self._firma(queryset)
+        if detalle and not total:
+            # Sin fila no hay representación: el 404 lo arma el método normal
+            return metodo(request, *args, **kwargs)
+
+        # En listados una baja no mueve max(updated_at): If-Modified-Since
+        # solo se respeta en detalles, el listado se valida con el ETag
+        marca = ultima.timestamp() if ultima and detalle else None
+        respuesta = get_conditional_response(request, etag=etag, last_modified=marca)
+        if respuesta is None:
+            respuesta = metodo(request, *args, **kwargs)
+        respuesta['ETag'] = etag
+        if ultima:
+            respuesta['Last-Modified'] = http_date(ultima.timestamp())
+        patch_cache_control(respuesta, private=True, no_cache=True)
+        return respuesta
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self._responder_condicional(queryset, False, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return self._responder_condicional(queryset, True, super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,87 @@
+"""
+Exportación en streaming (CSV o JSON Lines) para los listados de la API.
+
+Las filas se leen por lotes con paginación por clave primaria y proyectadas
+con values_list, así la memoria queda acotada al tamaño del lote sin importar
+cuántas filas tenga la consulta (MySQL no ofrece cursores de servidor a
+QuerySet.iterator()).
+"""
+import csv
+import json
+
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+TAMANO_LOTE_EXPORTACION = 2000
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+}
+
+
+class _Eco:
+    # csv.writer escribe sobre este objeto y recibimos cada línea ya formateada
+    def write(self, valor):
+        return valor
+
+
+def iterar_por_lotes(queryset, campos, tamano=TAMANO_LOTE_EXPORTACION):
+    """Recorre el queryset por lotes ordenados por pk, proyectando solo `campos`."""
+    queryset = queryset.prefetch_related(None).order_by('pk')
+    ultimo = None
+    while True:
+        lote = queryset if ultimo is None else queryset.filter(pk__gt=ultimo)
+        filas = list(lote.values_list('pk', *campos)[:tamano])
+        if not filas:
+            return
+        for fila in filas:
+            yield fila[1:]
+        ultimo = filas[-1][0]
+
+
+def _lineas_csv(encabezados, filas):
+    escritor = csv.writer(_Eco())
+    # BOM para que Excel reconozca el UTF-8 (tildes y eñes)
+    yield '\ufeff' + escritor.writerow(encabezados)
+    for fila in filas:
+        yield escritor.writerow(fila)
+
+
+def _lineas_jsonl(encabezados, filas):
+    for fila in filas:
+        yield json.dumps(dict(zip(encabezados, fila)), default=str, ensure_ascii=False) + '\n'
+
+
+def respuesta_exportacion(queryset, columnas, formato, nombre):
+    """`columnas` es una secuencia de pares (encabezado, ruta ORM)."""
+    encabezados = [encabezado for encabezado, _ in columnas]
+    filas = iterar_por_lotes(queryset, [campo for _, campo in columnas])
+    lineas = _lineas_csv(encabezados, filas) if formato == 'csv' else _lineas_jsonl(encabezados, filas)
+
+    content_type, extension = FORMATOS[formato]
+    response = StreamingHttpResponse(lineas, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{extension}"'
+    return response
+
+
+class ExportacionMixin:
+    """Agrega GET <listado>/exportar/?formato=csv|jsonl con los filtros del listado."""
+    columnas_exportacion = ()
+
+    def get_queryset_exportacion(self):
+        return self.filter_queryset(self.get_queryset())
+
+    @action(detail=False, methods=['get'])
+    def exportar(self, request):
+        formato = request.query_params.get('formato', 'csv')
+        if formato not in FORMATOS:
+            return Response(
+                {'error': f'Formato no soportado. Opciones válidas: {list(FORMATOS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return respuesta_exportacion(
+            self.get_queryset_exportacion(), self.columnas_exportacion, formato, self.basename
+        )
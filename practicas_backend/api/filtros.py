@@ -0,0 +1,62 @@
+import operator
+from collections import defaultdict
+from functools import reduce
+
+from django.db.models import Exists, OuterRef, Q
+from rest_framework import filters
+
+
+class BusquedaSinDuplicadosFilter(filters.SearchFilter):
+    """
+    SearchFilter que resuelve los campos de relaciones muchos a muchos
+    ('supervisores__username') con un EXISTS correlacionado sobre la tabla
+    intermedia, en lugar de hacer JOIN con ella. Así cada fila sale una sola vez
+    sin DISTINCT y la consulta principal no crece con la cantidad de
+    relacionados; el EXISTS usa el índice único (origen, destino) de la tabla
+    intermedia.
+    """
+
+    def _separar_campos(self, queryset, search_fields):
+        directos = []
+        por_relacion = defaultdict(list)
+        opts = queryset.model._meta
+        for campo in map(str, search_fields):
+            prefijo = campo[0] if campo[0] in self.lookup_prefixes else ''
+            relacion, _, resto = campo[len(prefijo):].partition('__')
+            field = opts.get_field(relacion) if resto else None
+            if field is not None and field.many_to_many and not field.auto_created:
+                por_relacion[field].append(prefijo + resto)
+            else:
+                directos.append(self.construct_search(campo, queryset))
+        return directos, por_relacion
+
+    def _existe_relacionado(self, field, lookups, termino):
+        through = field.remote_field.through
+        destino = field.m2m_reverse_field_name()
+        condicion = reduce(operator.or_, (Q(**{f'{destino}__{lookup}': termino}) for lookup in lookups))
+        return Exists(through.objects.filter(condicion, **{field.m2m_field_name(): OuterRef('pk')}))
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        directos, por_relacion = self._separar_campos(queryset, search_fields)
+        lookups_relacion = {
+            field: [
+                self.construct_search(campo, field.related_model._default_manager.all())
+                for campo in campos
+            ]
+            for field, campos in por_relacion.items()
+        }
+        condiciones = []
+        for termino in search_terms:
+            # Cada término puede aparecer en cualquier campo; todos los términos deben aparecer
+            opciones = [Q(**{lookup: termino}) for lookup in directos]
+            opciones += [
+                Q(self._existe_relacionado(field, lookups, termino))
+                for field, lookups in lookups_relacion.items()
+            ]
+            condiciones.append(reduce(operator.or_, opciones))
+        return queryset.filter(reduce(operator.and_, condiciones))
@@ -0,0 +1,195 @@
+"""
+Importación masiva de estudiantes desde un padrón CSV o XLSX.
+
+El archivo se recorre fila a fila y se procesa en lotes: cada lote se valida
+con EstudianteImportacionSerializer, las contraseñas iniciales se hashean en un
+pool de procesos compartido por todas las importaciones del proceso y los
+Usuario/Estudiante se insertan con bulk_create. Un lote que choca con filas
+creadas al mismo tiempo por otra importación se informa en el reporte.
+
+Cada fila debe traer su contraseña inicial. Usar el DNI cuando falta es una
+opción explícita (`dni_como_password`), porque es un valor conocido por terceros.
+"""
+import codecs
+import csv
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from .models import Estudiante, Usuario
+from .serializers import EstudianteImportacionSerializer
+
+TAMANO_LOTE = 500
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def leer_filas(archivo, nombre):
+    """Genera diccionarios por fila sin cargar el archivo completo en memoria."""
+    if nombre.lower().endswith('.xlsx'):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValidationError({'archivo': 'Instale openpyxl para importar archivos XLSX'})
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+        filas = libro.active.iter_rows(values_only=True)
+        cabecera = [str(celda).strip() if celda is not None else '' for celda in next(filas, ())]
+        for fila in filas:
+            if any(celda is not None for celda in fila):
+                yield {
+                    columna: '' if valor is None else str(valor).strip()
+                    for columna, valor in zip(cabecera, fila)
+                }
+        libro.close()
+        return
+
+    lector = csv.DictReader(codecs.iterdecode(archivo, 'utf-8-sig'))
+    for fila in lector:
+        yield {(columna or '').strip(): (valor or '').strip() for columna, valor in fila.items()}
+
+
+def _inicializar_proceso():
+    # Con el método 'spawn' el proceso hijo no hereda la configuración de Django
+    import django
+    django.setup()
+
+
+def _hashear(password):
+    return make_password(password)
+
+
+def _pool_hasheo(procesos):
+    """Pool de procesos del módulo; se crea con la primera importación y se reutiliza."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso)
+        return _pool
+
+
+def _descartar_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+class ImportadorEstudiantes:
+    def __init__(self, procesos=None, tamano_lote=TAMANO_LOTE, dni_como_password=False):
+        if procesos is None:
+            procesos = getattr(settings, 'IMPORTACION_PROCESOS', os.cpu_count() or 1)
+        self.procesos = procesos
+        self.tamano_lote = tamano_lote
+        self.dni_como_password = dni_como_password
+        self.creados = 0
+        self.errores = []
+        self._usernames = set()
+        self._dnis = set()
+
+    def importar(self, filas):
+        """Importa las filas y devuelve el reporte con creados y errores por fila."""
+        numeradas = enumerate(filas, start=2)  # la fila 1 es la cabecera
+        while True:
+            lote = list(islice(numeradas, self.tamano_lote))
+            if not lote:
+                break
+            self._procesar_lote(lote)
+        self.errores.sort(key=lambda error: error['fila'])
+        return {'creados': self.creados, 'errores': self.errores}
+
+    def _error(self, numero, errores):
+        self.errores.append({'fila': numero, 'errores': errores})
+
+    def _hashear_lote(self, passwords):
+        if self.procesos > 1:
+            pool = _pool_hasheo(self.procesos)
+            try:
+                return list(pool.map(_hashear, passwords, chunksize=max(1, len(passwords) // (self.procesos * 4))))
+            except BrokenProcessPool:
+                # Un proceso hijo murió; la próxima importación crea otro pool
+                _descartar_pool(pool)
+        return [_hashear(password) for password in passwords]
+
+    def _procesar_lote(self, lote):
+        validador = EstudianteImportacionSerializer()
+        validas = []
+        for numero, fila in lote:
+            try:
+                datos = validador.run_validation(fila)
+            except ValidationError as e:
+                self._error(numero, e.detail)
+                continue
+            if not datos['password'] and not self.dni_como_password:
+                self._error(numero, {'password': ['Se requiere la contraseña inicial']})
+                continue
+            if datos['username'] in self._usernames:
+                self._error(numero, {'username': ['Usuario repetido en el archivo']})
+                continue
+            if datos['dni'] in self._dnis:
+                self._error(numero, {'dni': ['DNI repetido en el archivo']})
+                continue
+            self._usernames.add(datos['username'])
+            self._dnis.add(datos['dni'])
+            validas.append((numero, datos))
+
+        usernames = {datos['username'] for _, datos in validas}
+        dnis = {datos['dni'] for _, datos in validas}
+        usernames_existentes = set(Usuario.objects.filter(username__in=usernames).values_list('username', flat=True))
+        dnis_existentes = set(Usuario.objects.filter(dni__in=dnis).values_list('dni', flat=True))
+
+        nuevas = []
+        for numero, datos in validas:
+            if datos['username'] in usernames_existentes:
+                self._error(numero, {'username': ['Ya existe un usuario con este nombre']})
+            elif datos['dni'] in dnis_existentes:
+                self._error(numero, {'dni': ['Ya existe un usuario con este DNI']})
+            else:
+                nuevas.append((numero, datos))
+        if not nuevas:
+            return
+
+        # Con dni_como_password, la contraseña inicial es el DNI cuando el padrón no trae una
+        hashes = self._hashear_lote([datos['password'] or datos['dni'] for _, datos in nuevas])
+        try:
+            self._insertar_lote([datos for _, datos in nuevas], hashes)
+        except IntegrityError:
+            # Otra importación creó el mismo usuario o DNI después de la verificación
+            for numero, _ in nuevas:
+                self._error(numero, {'non_field_errors': [
+                    'Conflicto con un usuario creado al mismo tiempo; vuelva a importar la fila'
+                ]})
+            return
+        self.creados += len(nuevas)
+
+    def _insertar_lote(self, nuevas, hashes):
+        with transaction.atomic():
+            Usuario.objects.bulk_create([
+                Usuario(
+                    username=datos['username'],
+                    email=datos['email'],
+                    first_name=datos['first_name'],
+                    last_name=datos['last_name'],
+                    dni=datos['dni'],
+                    rol='ESTUDIANTE',
+                    password=password
+                )
+                for datos, password in zip(nuevas, hashes)
+            ], batch_size=self.tamano_lote)
+
+            # MySQL no devuelve las claves de bulk_create; se recuperan por username
+            ids = dict(Usuario.objects.filter(
+                username__in=[datos['username'] for datos in nuevas]
+            ).values_list('username', 'id'))
+            Estudiante.objects.bulk_create([
+                Estudiante(usuario_id=ids[datos['username']], carrera=datos['carrera'], ciclo=datos['ciclo'])
+                for datos in nuevas
+            ], batch_size=self.tamano_lote)
@@ -0,0 +1,133 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Avg, Count, Exists, Max, OuterRef
+
+from api.models import (
+    AsignacionJurado, Asistencia, EntradaIndice, Evaluacion, Informe, Practica, Usuario
+)
+from api.views import informes_visibles, supervisada_por
+
+
+def _primero(queryset, campo='pk'):
+    # Valores de muestra reales para que el plan use las estadísticas de la tabla
+    return queryset.values_list(campo, flat=True).first() or 0
+
+
+def catalogo():
+    """
+    (nombre, queryset, tablas en las que se acepta un recorrido completo). Son
+    las consultas de los endpoints más usados y de calcular_nota_final, armadas
+    igual que en las vistas y los modelos.
+    """
+    practica = _primero(Practica.objects.all())
+    estudiante = _primero(Practica.objects.all(), 'estudiante_id')
+    docente = _primero(Practica.supervisores.through.objects.all(), 'usuario_id')
+    jurado = _primero(AsignacionJurado.objects.all(), 'jurado_id')
+    docente_usuario = Usuario(pk=docente, rol='DOCENTE')
+
+    return [
+        ('practicas: list de estudiante',
+         Practica.objects.filter(id__in=Practica.objects.filter(estudiante_id=estudiante)
+                                 .values('modulo').annotate(max_id=Max('id')).values_list('max_id', flat=True)),
+         set()),
+        # El EXISTS recorre prácticas en motores sin semi-join (SQLite)
+        ('practicas: list de docente', Practica.objects.filter(supervisada_por([docente])), {'api_practica'}),
+        ('practicas: list de jurado',
+         Practica.objects.filter(Exists(AsignacionJurado.objects.filter(practica=OuterRef('pk'), jurado_id=jurado))),
+         {'api_practica'}),
+        ('practicas: detalle', Practica.objects.filter(pk=practica), set()),
+        ('asistencias: de una práctica por fecha',
+         Asistencia.objects.filter(practica_id=practica).order_by('fecha'), set()),
+        ('asistencias: rango de fechas',
+         Asistencia.objects.filter(practica_id=practica, fecha__range=(date(2000, 1, 1), date.today())), set()),
+        ('informes: pendientes_evaluacion',
+         Informe.objects.filter(calificacion__isnull=True, fecha_evaluacion__isnull=True).order_by('fecha_entrega'),
+         set()),
+        ('informes: list de docente', informes_visibles(Informe.objects.all(), docente_usuario), set()),
+        ('calcular_nota_final: promedio de jurados',
+         Evaluacion.objects.filter(practica_id=practica, jurado__rol='JURADO')
+         .values('practica').annotate(promedio=Avg('calificacion')), set()),
+        ('calcular_nota_final: promedio de informes',
+         Informe.objects.filter(practica_id=practica, calificacion__isnull=False)
+         .values('practica').annotate(promedio=Avg('calificacion')), set()),
+        ('usuarios: por rol', Usuario.objects.filter(rol='DOCENTE'), set()),
+        ('jurados: asignaciones de un jurado', AsignacionJurado.objects.filter(jurado_id=jurado), set()),
+        ('informes: búsqueda por término',
+         EntradaIndice.objects.filter(termino='practica').values('termino').annotate(total=Count('id')), set()),
+    ]
+
+
+def _plan_sqlite(cursor, sql, params):
+    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+    plan, alertas = [], []
+    for fila in cursor.fetchall():
+        detalle = fila[-1]
+        plan.append(detalle)
+        if detalle.startswith('SCAN ') and 'USING' not in detalle:
+            # "SCAN tabla" sin índice es un recorrido completo
+            alertas.append(('recorrido completo', detalle.split()[1]))
+        elif 'USE TEMP B-TREE' in detalle:
+            alertas.append(('ordenamiento en temporal (filesort)', detalle))
+    return plan, alertas
+
+
+def _plan_mysql(cursor, sql, params):
+    cursor.execute('EXPLAIN ' + sql, params)
+    columnas = [col[0] for col in cursor.description]
+    plan, alertas = [], []
+    for fila in cursor.fetchall():
+        fila = dict(zip(columnas, fila))
+        extra = fila.get('Extra') or ''
+        plan.append(f"{fila.get('table')}: type={fila.get('type')} key={fila.get('key')} "
+                    f"rows={fila.get('rows')} {extra}".strip())
+        if fila.get('type') == 'ALL':
+            alertas.append(('recorrido completo', fila.get('table')))
+        if 'Using filesort' in extra:
+            alertas.append(('filesort', fila.get('table')))
+        if 'Using temporary' in extra:
+            alertas.append(('tabla temporal', fila.get('table')))
+    return plan, alertas
+
+
+PLANES = {'sqlite': _plan_sqlite, 'mysql': _plan_mysql}
+
+
+class Command(BaseCommand):
+    help = ('Ejecuta EXPLAIN sobre las consultas de los endpoints más usados y de '
+            'calcular_nota_final, y marca recorridos completos y filesorts. Conviene '
+            'correrlo contra una base con datos representativos: con tablas casi vacías '
+            'el motor puede preferir recorrerlas aunque exista el índice.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--solo-informe', action='store_true',
+                            help='No termina con error aunque haya alertas')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        plan_de = PLANES.get(connection.vendor)
+        if plan_de is None:
+            raise CommandError(f'Motor no soportado: {connection.vendor}')
+
+        total_alertas = 0
+        with connection.cursor() as cursor:
+            for nombre, queryset, permitidas in catalogo():
+                sql, params = queryset.using(options['database']).query.sql_with_params()
+                plan, alertas = plan_de(cursor, sql, params)
+                alertas = [(tipo, objeto) for tipo, objeto in alertas
+                           if not (tipo == 'recorrido completo' and objeto in permitidas)]
+                estilo = self.style.ERROR if alertas else self.style.SUCCESS
+                self.stdout.write(estilo(f"{'ALERTA' if alertas else 'ok'}  {nombre}"))
+                if options['verbosity'] > 1 or alertas:
+                    for linea in plan:
+                        self.stdout.write(f'      {linea}')
+                for tipo, objeto in alertas:
+                    self.stdout.write(self.style.WARNING(f'      -> {tipo}: {objeto}'))
+                total_alertas += len(alertas)
+
+        if total_alertas and not options['solo_informe']:
+            raise CommandError(f'{total_alertas} alertas en los planes de consulta')
+        self.stdout.write(self.style.SUCCESS('Sin alertas') if not total_alertas
+                          else self.style.WARNING(f'{total_alertas} alertas'))
@@ -0,0 +1,98 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections, connections
+from django.utils import timezone
+
+from api.models import Trabajo
+from api.tareas import TAREAS, ejecutar_en_pool, inicializar_proceso
+
+
+class Command(BaseCommand):
+    help = ('Trabajador de la cola de trabajos en segundo plano (ver api/tareas.py). Toma '
+            'los trabajos pendientes por prioridad y los corre en un pool de hilos o de '
+            'procesos. Se pueden correr varios trabajadores sobre la misma base; SIGTERM '
+            'deja de tomar trabajos y espera a que terminen los que están en curso.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=4, help='Trabajos simultáneos en un pool de hilos')
+        parser.add_argument('--procesos', type=int,
+                            help='Usar un pool de N procesos en lugar de hilos (tareas de CPU)')
+        parser.add_argument('--tipo', action='append', dest='tipos', help='Solo estos tipos (repetible)')
+        parser.add_argument('--intervalo', type=float, default=1.0,
+                            help='Segundos de espera cuando la cola está vacía')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Termina cuando no quedan trabajos vencidos')
+
+    def handle(self, *args, **options):
+        desconocidos = set(options['tipos'] or ()) - set(TAREAS)
+        if desconocidos:
+            raise CommandError(f"Tipos no registrados: {', '.join(sorted(desconocidos))}")
+
+        nombre = f'{socket.gethostname()}:{os.getpid()}'
+        abandono = getattr(settings, 'TRABAJOS_ABANDONO', 300)
+        intervalo_latido = getattr(settings, 'TRABAJOS_LATIDO', 30)
+        if options['procesos']:
+            capacidad = options['procesos']
+            # Los procesos hijos no deben heredar la conexión abierta del padre
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=capacidad, initializer=inicializar_proceso)
+        else:
+            capacidad = options['hilos']
+            pool = ThreadPoolExecutor(max_workers=capacidad, thread_name_prefix='trabajo')
+
+        self.detener = False
+        signal.signal(signal.SIGTERM, self._detener)
+        en_curso = {}
+        terminados = 0
+        ultimo_latido = None
+        try:
+            while not self.detener:
+                # Con --una-vez la conexión es la de quien llamó al comando y se deja abierta
+                if not options['una_vez']:
+                    close_old_connections()
+                try:
+                    if ultimo_latido is None or time.monotonic() - ultimo_latido >= intervalo_latido:
+                        Trabajo.objects.filter(pk__in=en_curso.values(), estado='EN_CURSO').update(
+                            latido=timezone.now()
+                        )
+                        Trabajo.recuperar_abandonados(abandono)
+                        ultimo_latido = time.monotonic()
+                    if len(en_curso) < capacidad:
+                        for pk in Trabajo.tomar(nombre, capacidad - len(en_curso), options['tipos']):
+                            en_curso[pool.submit(ejecutar_en_pool, pk)] = pk
+                except DatabaseError as e:
+                    # Por ejemplo, SQLite bloqueada por la transacción larga de una tarea
+                    self.stderr.write(f'Error al consultar la cola: {e}')
+
+                if not en_curso:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                listos, _ = wait(en_curso, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                terminados += self._recoger(listos, en_curso)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Lo que ya empezó termina; lo no tomado queda en la cola
+            pool.shutdown(wait=True)
+            terminados += self._recoger(list(en_curso), en_curso)
+        self.stdout.write(self.style.SUCCESS(f'{terminados} trabajos ejecutados'))
+
+    def _detener(self, signum, frame):
+        self.detener = True
+
+    def _recoger(self, listos, en_curso):
+        for futuro in listos:
+            pk = en_curso.pop(futuro)
+            error = futuro.exception()
+            if error is not None:
+                # ejecutar ya registra las fallas de la tarea; esto es un error del propio trabajador
+                self.stderr.write(f'Trabajo {pk}: {error!r}')
+        return len(listos)
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importacion import TAMANO_LOTE, ImportadorEstudiantes, leer_filas
+
+
+class Command(BaseCommand):
+    help = 'Importa estudiantes desde un padrón CSV o XLSX (username, email, first_name, last_name, dni, carrera, ciclo, password)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta', help='Ruta del archivo CSV o XLSX')
+        parser.add_argument('--procesos', type=int, default=None,
+                            help='Procesos para hashear contraseñas (por defecto, uno por CPU)')
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help='Filas por lote de inserción')
+        parser.add_argument('--dni-como-password', action='store_true',
+                            help='Usar el DNI como contraseña inicial de las filas sin password')
+
+    def handle(self, *args, **options):
+        if not options['ruta'].lower().endswith(('.csv', '.xlsx')):
+            raise CommandError('El padrón debe ser un archivo CSV o XLSX')
+
+        importador = ImportadorEstudiantes(
+            procesos=options['procesos'], tamano_lote=options['lote'],
+            dni_como_password=options['dni_como_password']
+        )
+        with open(options['ruta'], 'rb') as archivo:
+            reporte = importador.importar(leer_filas(archivo, options['ruta']))
+
+        for error in reporte['errores']:
+            self.stderr.write(f"Fila {error['fila']}: {json.dumps(error['errores'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{reporte['creados']} estudiantes creados, {len(reporte['errores'])} filas con errores"
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.metricas import limpiar_directorio
+
+
+class Command(BaseCommand):
+    help = ('Vacía METRICAS_DIRECTORIO. Debe correr al iniciar el servicio, antes de '
+            'levantar los procesos: los archivos de los procesos que terminaron se '
+            'conservan mientras el servicio sigue en marcha')
+
+    def handle(self, *args, **options):
+        borrados = limpiar_directorio()
+        self.stdout.write(self.style.SUCCESS(f'{borrados} archivos de métricas borrados'))
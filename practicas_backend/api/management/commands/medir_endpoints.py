@@ -0,0 +1,175 @@
+import json
+import math
+import subprocess
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.authentication import RefreshTokenConRol
+from api.models import AsignacionJurado, Informe, ModuloPracticas, Practica, Usuario
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano sobre valores ya ordenados."""
+    if not valores:
+        return None
+    return valores[max(0, math.ceil(p / 100 * len(valores)) - 1)]
+
+
+def _usuario(**filtros):
+    return Usuario.objects.filter(**filtros).order_by('id').first()
+
+
+def catalogo():
+    """
+    (rol, usuario, [(nombre, url)]): los endpoints que más usa el frontend,
+    con usuarios y filas de muestra tomados de la base.
+    """
+    practica = Practica.objects.order_by('id').first()
+    modulo = ModuloPracticas.objects.order_by('id').first()
+    estudiante = _usuario(rol='ESTUDIANTE', practicas__isnull=False)
+    docente = _usuario(rol='DOCENTE', practicas_supervisadas__isnull=False)
+    jurado = Usuario.objects.filter(
+        pk=AsignacionJurado.objects.order_by('id').values('jurado_id')[:1]
+    ).first()
+    termino = Informe.objects.order_by('id').values_list('contenido', flat=True).first()
+    termino = (termino or 'informe').split()[0]
+
+    comunes = [('practicas.list', '/api/practicas/'), ('informes.list', '/api/informes/')]
+    roles = [
+        ('PRACTICAS', _usuario(rol='PRACTICAS'), comunes + [
+            ('practicas.search', '/api/practicas/?search=quispe'),
+            ('practicas.filtro_modulo', '/api/practicas/?modulo__tipo_modulo=MODULO1&estado=EN_CURSO'),
+            ('practicas.retrieve', f'/api/practicas/{practica.pk}/' if practica else None),
+            ('informes.busqueda', f'/api/informes/?q={termino}'),
+            ('informes.pendientes_evaluacion', '/api/informes/pendientes_evaluacion/'),
+            ('modulos.list', '/api/modulos/'),
+            ('modulos.listar_jurados', f'/api/modulos/{modulo.pk}/listar-jurados/' if modulo else None),
+            ('gestionar_docentes.list', '/api/gestionar-docentes/'),
+        ]),
+        ('DOCENTE', docente, comunes + [('asistencias.list', '/api/asistencias/')]),
+        ('ESTUDIANTE', estudiante, comunes + [('informes.mis_informes', '/api/informes/mis_informes/')]),
+        ('JURADO', jurado, [('practicas.list', '/api/practicas/'), ('evaluaciones.list', '/api/evaluaciones/')]),
+        ('SECRETARIA', _usuario(rol='SECRETARIA'), [
+            ('gestionar_estudiantes.list', '/api/gestionar-estudiantes/'),
+        ]),
+    ]
+    return [(rol, usuario, [(n, u) for n, u in endpoints if u]) for rol, usuario, endpoints in roles]
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Mide los endpoints principales por rol (p50/p95/p99 de latencia y consultas SQL) '
+            'y escribe el resultado en JSON para compararlo entre commits. Usar sobre una base '
+            'poblada con sembrar_datos.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=30)
+        parser.add_argument('--calentamiento', type=int, default=2,
+                            help='Solicitudes previas descartadas por endpoint')
+        parser.add_argument('--sin-cache', action='store_true',
+                            help='Vacía la caché de respuestas antes de cada solicitud')
+        parser.add_argument('--rol', action='append', dest='roles', help='Solo estos roles (repetible)')
+        parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto, la salida estándar)')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior para mostrar las diferencias')
+
+    def handle(self, *args, **options):
+        cache = caches[getattr(settings, 'CACHE_RESPUESTAS_ALIAS', 'default')]
+        cliente = Client()
+        resultados = []
+
+        # El cliente de pruebas usa el host 'testserver'
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for rol, usuario, endpoints in catalogo():
+                if options['roles'] and rol not in options['roles']:
+                    continue
+                if usuario is None:
+                    self.stderr.write(f'Sin usuarios {rol} en la base; se omite')
+                    continue
+                token = str(RefreshTokenConRol.for_user(usuario).access_token)
+                encabezados = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+                for nombre, url in endpoints:
+                    for _ in range(options['calentamiento']):
+                        cliente.get(url, **encabezados)
+                    tiempos, consultas, estados = [], [], set()
+                    for _ in range(options['repeticiones']):
+                        if options['sin_cache']:
+                            cache.clear()
+                        with CaptureQueriesContext(connection) as capturadas:
+                            inicio = time.perf_counter()
+                            response = cliente.get(url, **encabezados)
+                            tiempos.append((time.perf_counter() - inicio) * 1000)
+                        consultas.append(len(capturadas))
+                        estados.add(response.status_code)
+                    tiempos.sort()
+                    consultas.sort()
+                    resultados.append({
+                        'rol': rol,
+                        'endpoint': nombre,
+                        'url': url,
+                        'estados': sorted(estados),
+                        'p50_ms': round(percentil(tiempos, 50), 2),
+                        'p95_ms': round(percentil(tiempos, 95), 2),
+                        'p99_ms': round(percentil(tiempos, 99), 2),
+                        'consultas_p50': percentil(consultas, 50),
+                        'consultas_max': consultas[-1],
+                        'bytes': len(response.content),
+                    })
+                    self.stderr.write(
+                        f"{rol:<11} {nombre:<32} p50 {resultados[-1]['p50_ms']:>8} ms  "
+                        f"p95 {resultados[-1]['p95_ms']:>8} ms  consultas {resultados[-1]['consultas_p50']}"
+                    )
+
+        informe = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit(),
+            'motor': connection.vendor,
+            'repeticiones': options['repeticiones'],
+            'sin_cache': options['sin_cache'],
+            'filas': {
+                'usuarios': Usuario.objects.count(),
+                'practicas': Practica.objects.count(),
+                'informes': Informe.objects.count(),
+            },
+            'resultados': resultados,
+        }
+        texto = json.dumps(informe, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as destino:
+                destino.write(texto)
+        else:
+            self.stdout.write(texto)
+
+        if options['comparar']:
+            self.comparar(options['comparar'], resultados)
+
+    def comparar(self, ruta, resultados):
+        try:
+            with open(ruta, encoding='utf-8') as origen:
+                anteriores = {(r['rol'], r['endpoint']): r for r in json.load(origen)['resultados']}
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'No se pudo leer {ruta}: {e}')
+        for actual in resultados:
+            anterior = anteriores.get((actual['rol'], actual['endpoint']))
+            if anterior is None:
+                continue
+            cambio = (actual['p95_ms'] - anterior['p95_ms']) / anterior['p95_ms'] * 100 if anterior['p95_ms'] else 0
+            self.stderr.write(
+                f"{actual['rol']:<11} {actual['endpoint']:<32} p95 {anterior['p95_ms']} -> {actual['p95_ms']} ms "
+                f"({cambio:+.0f}%)  consultas {anterior['consultas_p50']} -> {actual['consultas_p50']}"
+            )
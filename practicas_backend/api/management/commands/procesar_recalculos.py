@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.models import RecalculoNota
+
+
+class Command(BaseCommand):
+    help = ('Trabajador de recálculo de notas finales: ejecuta los recálculos programados '
+            'que ya vencieron (ver RecalculoNota). Se pueden correr varios a la vez.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100)
+        parser.add_argument('--intervalo', type=float, default=1.0,
+                            help='Segundos de espera cuando no hay nada vencido')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesa lo vencido y termina, para usarlo desde cron')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                procesadas, errores = RecalculoNota.procesar_vencidos(options['lote'])
+                total += procesadas
+                for practica_id, error in errores:
+                    self.stderr.write(f'Práctica {practica_id}: {error!r} (se reprogramó)')
+                if options['una_vez'] and not procesadas:
+                    break
+                if not procesadas:
+                    time.sleep(options['intervalo'])
+                # Solo en el trabajador de larga duración: con --una-vez la conexión
+                # es la de quien llamó al comando (cron, pruebas) y se deja abierta
+                if not options['una_vez']:
+                    close_old_connections()
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'{total} notas recalculadas'))
@@ -0,0 +1,30 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import SubidaFragmentada
+from api.subidas import ruta_parcial
+
+
+class Command(BaseCommand):
+    help = ('Elimina las subidas fragmentadas sin actividad desde hace más de '
+            'SUBIDA_VIGENCIA_HORAS, junto con sus archivos parciales')
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(hours=settings.SUBIDA_VIGENCIA_HORAS)
+        vencidas = SubidaFragmentada.objects.filter(actualizado__lt=limite)
+
+        archivos = 0
+        for subida in vencidas.filter(estado='EN_CURSO').only('id').iterator():
+            try:
+                os.remove(ruta_parcial(subida))
+                archivos += 1
+            except FileNotFoundError:
+                pass
+        total, _ = vencidas.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} subidas eliminadas, {archivos} archivos parciales borrados'
+        ))
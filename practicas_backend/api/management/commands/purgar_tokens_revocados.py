@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.revocacion import RegistroRevocaciones
+
+
+class Command(BaseCommand):
+    help = 'Elimina en bloque las revocaciones de tokens que ya expiraron'
+
+    def handle(self, *args, **options):
+        tokens, cortes = RegistroRevocaciones.purgar_expirados()
+        self.stdout.write(self.style.SUCCESS(
+            f'{tokens} tokens revocados y {cortes} cortes por usuario eliminados'
+        ))
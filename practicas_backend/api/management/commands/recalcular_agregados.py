@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Practica
+
+
+class Command(BaseCommand):
+    help = ('Reconstruye los agregados de asistencia y los componentes de la nota '
+            '(asistencia, jurado, informe) de las prácticas a partir de las filas')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--practica', type=int, action='append', dest='practicas',
+            help='ID de la práctica a reparar (puede repetirse). Por defecto, todas.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = Practica.recalcular_agregados_asistencia(options['practicas'])
+            Practica.recalcular_notas(options['practicas'])
+        self.stdout.write(self.style.SUCCESS(f'Agregados recalculados para {total} prácticas'))
@@ -0,0 +1,114 @@
+import os
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.almacenamiento import PREFIJO_CONTENIDO, es_nombre_por_contenido
+from api.cache_respuestas import etiqueta, invalidar
+from api.models import Estudiante, Informe, ModeloVersionado, ModuloPracticas, campos_version
+from api.subidas import HashContenido
+
+CAMPOS = [
+    (Informe, 'documento'),
+    (Estudiante, 'boleta_pago'),
+    (Estudiante, 'fut'),
+    (ModuloPracticas, 'estructura_informe'),
+]
+TAMANO_LECTURA = 1024 * 1024
+
+
+def hashear(nombre):
+    ruta = default_storage.path(nombre)
+    if not os.path.isfile(ruta):
+        return nombre, None
+    hash_contenido = HashContenido()
+    with open(ruta, 'rb') as archivo:
+        for datos in iter(lambda: archivo.read(TAMANO_LECTURA), b''):
+            hash_contenido.update(datos)
+    return nombre, hash_contenido.hexdigest()
+
+
+class Command(BaseCommand):
+    help = ('Mueve los archivos de informes/, boletas_pago/, futs/ y estructura-informe-pdfs/ '
+            'al almacenamiento por contenido, deduplicando copias idénticas')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=None,
+                            help='Hilos para calcular hashes en paralelo (por defecto, según CPUs)')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo calcula hashes e informa, sin mover archivos')
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'adoptar'):
+            raise CommandError('El almacenamiento por defecto no es AlmacenamientoPorContenido')
+
+        # nombre anterior -> filas que lo referencian
+        referencias = defaultdict(list)
+        for modelo, campo in CAMPOS:
+            filas = modelo.objects.exclude(**{f'{campo}__isnull': True}).exclude(**{campo: ''}).exclude(
+                **{f'{campo}__startswith': PREFIJO_CONTENIDO}
+            ).values_list('pk', campo)
+            for pk, nombre in filas.iterator():
+                referencias[nombre].append((modelo, campo, pk))
+
+        migrados, faltantes, hashes = 0, 0, set()
+        # Hashear es lectura de disco y hashlib suelta el GIL: los hilos alcanzan
+        with ThreadPoolExecutor(max_workers=options['hilos']) as ejecutor:
+            for nombre, hash_contenido in ejecutor.map(hashear, list(referencias)):
+                if hash_contenido is None:
+                    faltantes += 1
+                    self.stderr.write(f'No existe el archivo {nombre}')
+                    continue
+                hashes.add(hash_contenido)
+                if not options['simular']:
+                    self._migrar(nombre, hash_contenido, referencias[nombre])
+                migrados += 1
+
+        sin_referencia = self._contar_sin_referencia(referencias)
+        self.stdout.write(self.style.SUCCESS(
+            f'{migrados} archivos {"analizados" if options["simular"] else "migrados"} '
+            f'({len(hashes)} contenidos distintos), {faltantes} faltantes, '
+            f'{sin_referencia} sin referencias que se dejaron en su lugar'
+        ))
+
+    def _migrar(self, nombre, hash_contenido, filas):
+        ruta = default_storage.path(nombre)
+        # Enlace duro al archivo original: si algo falla, el original sigue intacto
+        temporal = default_storage.path(f'{PREFIJO_CONTENIDO}tmp/{uuid.uuid4().hex}')
+        os.makedirs(os.path.dirname(temporal), exist_ok=True)
+        os.link(ruta, temporal)
+        try:
+            with transaction.atomic():
+                nuevo = default_storage.adoptar(
+                    temporal, hash_contenido, os.path.splitext(nombre)[1].lower()[:10], referencias=len(filas)
+                )
+                por_campo = defaultdict(list)
+                for modelo, campo, pk in filas:
+                    por_campo[(modelo, campo)].append(pk)
+                for (modelo, campo), pks in por_campo.items():
+                    cambios = {campo: nuevo}
+                    if issubclass(modelo, ModeloVersionado):
+                        cambios.update(campos_version())
+                    modelo.objects.filter(pk__in=pks).update(**cambios)
+                    invalidar(*(etiqueta(modelo, pk) for pk in pks))
+                transaction.on_commit(lambda: os.remove(ruta))
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+    def _contar_sin_referencia(self, referencias):
+        total = 0
+        for modelo, campo in CAMPOS:
+            directorio = modelo._meta.get_field(campo).upload_to
+            raiz = default_storage.path(directorio)
+            for carpeta, _, archivos in os.walk(raiz):
+                for archivo in archivos:
+                    nombre = os.path.relpath(os.path.join(carpeta, archivo), default_storage.location)
+                    nombre = nombre.replace(os.sep, '/')
+                    if nombre not in referencias and not es_nombre_por_contenido(nombre):
+                        total += 1
+        return total
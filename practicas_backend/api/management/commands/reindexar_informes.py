@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.busqueda import extractor_pdf_disponible, reindexar
+from api.models import EntradaIndice, Informe, InformeIndexado
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de los informes, por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=200, help='Informes por lote (por defecto 200)')
+        parser.add_argument(
+            '--desde-cero', action='store_true',
+            help='Vacía el índice y reindexa todo, aunque el informe no haya cambiado'
+        )
+        parser.add_argument(
+            '--sin-pdf', action='store_true',
+            help='Reindexa aunque pypdf no esté instalado; de los PDF solo se indexa el contenido escrito'
+        )
+
+    def handle(self, *args, **options):
+        if (not options['sin_pdf'] and not extractor_pdf_disponible()
+                and Informe.objects.filter(documento__iendswith='.pdf').exists()):
+            raise CommandError(
+                'pypdf no está instalado y hay informes en PDF cuyo texto no se indexaría. '
+                'Instale los requirements o use --sin-pdf.'
+            )
+        if options['desde_cero']:
+            EntradaIndice.objects.all().delete()
+            InformeIndexado.objects.all().delete()
+        revisados, reindexados = reindexar(
+            lote=options['lote'], forzar=options['desde_cero'],
+            salida=self.stdout.write if options['verbosity'] > 1 else None
+        )
+        self.stdout.write(self.style.SUCCESS(f'{reindexados} de {revisados} informes reindexados'))
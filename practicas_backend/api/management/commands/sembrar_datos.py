@@ -0,0 +1,240 @@
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from api.busqueda import reindexar
+from api.cache_respuestas import etiqueta, invalidar
+from api.models import (
+    AsignacionDocente, AsignacionJurado, Asistencia, Estudiante, Evaluacion, Informe,
+    ModuloPracticas, Practica, Usuario
+)
+
+NOMBRES = ['Ana', 'Luis', 'María', 'José', 'Rosa', 'Carlos', 'Lucía', 'Jorge', 'Elena', 'Miguel',
+           'Carmen', 'Pedro', 'Sofía', 'Diego', 'Valeria', 'Raúl', 'Patricia', 'Andrés', 'Gabriela', 'Hugo']
+APELLIDOS = ['Quispe', 'Mamani', 'García', 'Flores', 'Rodríguez', 'Huamán', 'Chávez', 'Torres', 'Ramos',
+             'Vargas', 'Castillo', 'Rojas', 'Mendoza', 'Gutiérrez', 'Sánchez', 'Espinoza', 'Díaz', 'Cruz']
+CARRERAS = ['Computación e Informática', 'Contabilidad', 'Enfermería Técnica', 'Electrónica Industrial',
+            'Mecánica Automotriz', 'Administración de Empresas']
+PALABRAS_INFORME = ('instalación mantenimiento red datos servidor inventario almacén atención cliente '
+                    'contabilidad balance reporte diagnóstico equipo laboratorio soporte usuario sistema '
+                    'base procedimiento seguridad cableado estructurado facturación caja planilla '
+                    'paciente triaje motor frenos circuito medición calibración').split()
+CRITERIOS = ('CONCEPTUAL', 'PROCEDIMENTAL', 'ACTITUDINAL')
+LOTE = 1000
+
+
+class Command(BaseCommand):
+    help = ('Genera una institución sintética a escala de producción: usuarios, estudiantes, '
+            'módulos, prácticas con supervisores y jurados, asistencias diarias, informes y '
+            'evaluaciones. Los usuarios llevan el prefijo indicado para poder borrarlos.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, default=2000)
+        parser.add_argument('--docentes', type=int, default=80)
+        parser.add_argument('--jurados', type=int, default=40)
+        parser.add_argument('--modulos', type=int, default=4, help='Módulos por tipo (MODULO1..3)')
+        parser.add_argument('--dias', type=int, default=30, help='Asistencias por práctica en curso')
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--prefijo', default='sint_')
+        parser.add_argument('--password', default='efsrt1234',
+                            help='Contraseña de todos los usuarios generados')
+        parser.add_argument('--limpiar', action='store_true',
+                            help='Borra antes los datos generados con el mismo prefijo')
+
+    def handle(self, *args, **options):
+        self.azar = random.Random(options['semilla'])
+        self.prefijo = options['prefijo']
+        self.hoy = date.today()
+
+        with transaction.atomic():
+            if options['limpiar']:
+                borrados, _ = Usuario.objects.filter(username__startswith=self.prefijo).delete()
+                ModuloPracticas.objects.filter(nombre__startswith=self.prefijo).delete()
+                self.stdout.write(f'{borrados} filas borradas')
+
+            # Se hashea una sola vez: hashear miles de contraseñas domina el tiempo
+            clave = make_password(options['password'])
+            estudiantes = self.crear_usuarios('ESTUDIANTE', options['estudiantes'], clave)
+            docentes = self.crear_usuarios('DOCENTE', options['docentes'], clave)
+            jurados = self.crear_usuarios('JURADO', options['jurados'], clave)
+            for rol in ('PRACTICAS', 'SECRETARIA', 'COORDINADOR', 'ADMIN'):
+                self.crear_usuarios(rol, 1, clave)
+            self.crear_perfiles(estudiantes)
+
+            modulos = self.crear_modulos(options['modulos'])
+            practicas = self.crear_practicas(estudiantes, modulos)
+            self.asignar_supervisores(practicas, docentes)
+            self.asignar_jurados(practicas, jurados)
+            self.crear_asistencias(practicas, options['dias'])
+            self.crear_informes(practicas)
+
+            ids = [practica['id'] for practica in practicas]
+            Practica.recalcular_agregados_asistencia(ids)
+            Practica.recalcular_notas(ids)
+            self.completar_notas(ids)
+
+        # bulk_create no dispara señales: índice de búsqueda y caché se actualizan aquí
+        reindexar()
+        invalidar(*(etiqueta(modelo) for modelo in (Usuario, ModuloPracticas, Practica)))
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(estudiantes)} estudiantes, {len(docentes)} docentes, {len(jurados)} jurados, '
+            f'{len(modulos)} módulos, {len(practicas)} prácticas'
+        ))
+
+    def crear_usuarios(self, rol, cantidad, clave):
+        base = Usuario.objects.filter(username__startswith=f'{self.prefijo}{rol.lower()}').count()
+        usuarios = []
+        for i in range(base, base + cantidad):
+            nombre, apellido = self.azar.choice(NOMBRES), self.azar.choice(APELLIDOS)
+            username = f'{self.prefijo}{rol.lower()}{i:05d}'
+            usuarios.append(Usuario(
+                username=username, password=clave, rol=rol,
+                first_name=nombre, last_name=f'{apellido} {self.azar.choice(APELLIDOS)}',
+                email=f'{username}@efsrt.test', telefono=f'9{self.azar.randrange(10**8):08d}',
+                edad=self.azar.randint(17, 60) if rol != 'ESTUDIANTE' else self.azar.randint(17, 30),
+            ))
+        Usuario.objects.bulk_create(usuarios, batch_size=LOTE)
+        if not usuarios:
+            return []
+        # En MySQL bulk_create no devuelve los ids: se vuelven a leer por el rango de nombres
+        return list(
+            Usuario.objects.filter(username__range=(usuarios[0].username, usuarios[-1].username))
+            .order_by('id').values_list('id', flat=True)
+        )
+
+    def crear_perfiles(self, estudiantes):
+        Estudiante.objects.bulk_create([
+            Estudiante(usuario_id=usuario_id, carrera=self.azar.choice(CARRERAS), ciclo=self.azar.randint(1, 6))
+            for usuario_id in estudiantes
+        ], batch_size=LOTE)
+
+    def crear_modulos(self, por_tipo):
+        base = ModuloPracticas.objects.filter(nombre__startswith=self.prefijo).count()
+        modulos = [
+            ModuloPracticas(
+                nombre=f'{self.prefijo}{etiqueta_tipo} - grupo {base + i + 1}',
+                descripcion=f'Experiencia formativa en situación real de trabajo, {etiqueta_tipo}',
+                tipo_modulo=tipo, horas_requeridas=self.azar.choice([120, 160, 240]),
+                fecha_inicio=self.hoy - timedelta(days=180), fecha_fin=self.hoy + timedelta(days=180),
+            )
+            for tipo, etiqueta_tipo in ModuloPracticas.TIPO_CHOICES
+            for i in range(por_tipo)
+        ]
+        ModuloPracticas.objects.bulk_create(modulos)
+        return list(
+            ModuloPracticas.objects.filter(nombre__in=[m.nombre for m in modulos]).values('id', 'tipo_modulo')
+        )
+
+    def crear_practicas(self, estudiantes, modulos):
+        por_tipo = {}
+        for modulo in modulos:
+            por_tipo.setdefault(modulo['tipo_modulo'], []).append(modulo['id'])
+        tipos = sorted(por_tipo)
+
+        practicas = []
+        for estudiante_id in estudiantes:
+            # Cada estudiante avanza por los módulos en orden; el último cursado puede seguir abierto
+            avance = self.azar.choices(range(1, len(tipos) + 1), weights=[5, 3, 2][:len(tipos)])[0]
+            for n, tipo in enumerate(tipos[:avance]):
+                ultimo = n == avance - 1
+                estado = self.azar.choice(['PENDIENTE', 'EN_CURSO', 'EN_CURSO', 'COMPLETADO']) if ultimo else 'EVALUADO'
+                inicio = self.hoy - timedelta(days=120 * (avance - n) + self.azar.randint(0, 20))
+                practicas.append(Practica(
+                    estudiante_id=estudiante_id, modulo_id=self.azar.choice(por_tipo[tipo]),
+                    fecha_inicio=inicio, fecha_fin=inicio + timedelta(days=100),
+                    estado=estado, horas_completadas=self.azar.randint(0, 240),
+                ))
+        Practica.objects.bulk_create(practicas, batch_size=LOTE)
+        return list(
+            Practica.objects.filter(estudiante_id__gte=estudiantes[0], estudiante_id__lte=estudiantes[-1])
+            .filter(estudiante__username__startswith=self.prefijo)
+            .values('id', 'modulo_id', 'estado', 'fecha_inicio')
+        ) if estudiantes else []
+
+    def asignar_supervisores(self, practicas, docentes):
+        Supervision = Practica.supervisores.through
+        filas, asignaciones = [], []
+        for practica in practicas:
+            for docente_id in self.azar.sample(docentes, k=min(len(docentes), self.azar.choice([1, 1, 2]))):
+                filas.append(Supervision(practica_id=practica['id'], usuario_id=docente_id))
+                asignaciones.append(AsignacionDocente(
+                    docente_id=docente_id, modulo_id=practica['modulo_id'], practica_id=practica['id'],
+                    fecha_asignacion=practica['fecha_inicio'],
+                ))
+        Supervision.objects.bulk_create(filas, batch_size=LOTE)
+        AsignacionDocente.objects.bulk_create(asignaciones, batch_size=LOTE)
+
+    def asignar_jurados(self, practicas, jurados):
+        asignaciones, evaluaciones = [], []
+        for practica in practicas:
+            if practica['estado'] not in ('COMPLETADO', 'EVALUADO'):
+                continue
+            for jurado_id in self.azar.sample(jurados, k=min(len(jurados), 3)):
+                asignaciones.append(AsignacionJurado(practica_id=practica['id'], jurado_id=jurado_id))
+                if practica['estado'] == 'EVALUADO' or self.azar.random() < 0.5:
+                    evaluaciones.append(Evaluacion(
+                        practica_id=practica['id'], jurado_id=jurado_id,
+                        calificacion=Decimal(self.azar.randint(80, 200)) / 10,
+                        observaciones='Sustentación revisada',
+                        criterios_evaluados={c: self.azar.randint(8, 20) for c in CRITERIOS},
+                    ))
+        AsignacionJurado.objects.bulk_create(asignaciones, batch_size=LOTE)
+        Evaluacion.objects.bulk_create(evaluaciones, batch_size=LOTE)
+
+    def crear_asistencias(self, practicas, dias):
+        asistencias = []
+        for practica in practicas:
+            if practica['estado'] == 'PENDIENTE':
+                continue
+            for dia in range(dias):
+                asistencia = Asistencia(
+                    practica_id=practica['id'], fecha=practica['fecha_inicio'] + timedelta(days=dia),
+                    asistio='FALTA' if self.azar.random() < 0.05 else 'ASISTIO',
+                    puntualidad='TARDANZA' if self.azar.random() < 0.1 else 'PUNTUAL',
+                    criterios_asistencia={c: self.azar.randint(10, 20) for c in CRITERIOS},
+                )
+                # Lo mismo que hace save(), que bulk_create no llama
+                asistencia.preparar_puntajes()
+                asistencias.append(asistencia)
+            if len(asistencias) >= 10 * LOTE:
+                Asistencia.objects.bulk_create(asistencias, batch_size=LOTE)
+                asistencias = []
+        Asistencia.objects.bulk_create(asistencias, batch_size=LOTE)
+
+    def crear_informes(self, practicas):
+        informes = []
+        for practica in practicas:
+            if practica['estado'] in ('PENDIENTE',):
+                continue
+            calificado = practica['estado'] == 'EVALUADO' or self.azar.random() < 0.3
+            calificacion = Decimal(self.azar.randint(80, 200)) / 10 if calificado else None
+            informes.append(Informe(
+                practica_id=practica['id'],
+                contenido=' '.join(self.azar.choices(PALABRAS_INFORME, k=self.azar.randint(80, 400))),
+                calificacion=calificacion,
+                aprobado=calificacion is not None and calificacion >= Decimal('12.5'),
+                fecha_evaluacion=timezone.make_aware(
+                    datetime.combine(practica['fecha_inicio'] + timedelta(days=110), time(12))
+                ) if calificado else None,
+            ))
+        Informe.objects.bulk_create(informes, batch_size=LOTE)
+
+    def completar_notas(self, ids):
+        # puntaje_general de cada asistencia es el promedio vigente de su práctica
+        Asistencia.objects.filter(practica_id__in=ids).update(puntaje_general=Subquery(
+            Practica.objects.filter(pk=OuterRef('practica_id')).values('nota_asistencia')[:1]
+        ))
+        cero = Value(Decimal('0'))
+        Practica.objects.filter(id__in=ids, estado='EVALUADO').update(nota_final=ExpressionWrapper(
+            Coalesce(F('nota_asistencia'), cero) * Decimal('0.3')
+            + Coalesce(F('nota_jurado'), cero) * Decimal('0.4')
+            + Coalesce(F('nota_informe'), cero) * Decimal('0.3'),
+            output_field=DecimalField(max_digits=4, decimal_places=2)
+        ))
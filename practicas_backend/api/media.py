@@ -0,0 +1,139 @@
+"""
+Entrega de archivos subidos con control de acceso.
+
+La vista de descarga decide si el usuario puede ver el archivo y delega el
+envío de los bytes según MEDIA_ENTREGA:
+
+- 'x-accel': responde con X-Accel-Redirect hacia la ubicación interna de nginx
+  (MEDIA_URL_INTERNA), que sirve el archivo, los rangos y la caché.
+- 'x-sendfile': responde con X-Sendfile (Apache mod_xsendfile, lighttpd).
+- 'django': FileResponse desde el proceso, con soporte de Range; solo para
+  desarrollo.
+
+Las URLs que arman los serializers llevan una firma con vencimiento
+(MEDIA_FIRMA_VIGENCIA) para que un enlace directo del navegador funcione sin
+encabezado Authorization; sin firma se exige un JWT válido. Las respuestas que
+las contienen cambian de ETag y de clave de caché con el periodo de las firmas
+(`periodo_firma` en api/cache_respuestas.py), para no servir enlaces vencidos.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+
+from .almacenamiento import es_nombre_por_contenido
+
+SAL_FIRMA = 'api.media.descarga'
+TAMANO_LECTURA = 64 * 1024
+RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def url_descarga(tipo, pk, request=None):
+    """URL firmada de descarga; absoluta si se pasa el request."""
+    firma = signing.TimestampSigner(salt=SAL_FIRMA).sign(f'{tipo}:{pk}')
+    url = f"{reverse('descarga_archivo', args=(tipo, pk))}?{urlencode({'firma': firma})}"
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def firma_valida(firma, tipo, pk):
+    try:
+        valor = signing.TimestampSigner(salt=SAL_FIRMA).unsign(
+            firma, max_age=settings.MEDIA_FIRMA_VIGENCIA
+        )
+    except signing.BadSignature:
+        return False
+    return valor == f'{tipo}:{pk}'
+
+
+def _etag(archivo, ruta):
+    if es_nombre_por_contenido(archivo.name):
+        return '"%s"' % os.path.splitext(os.path.basename(archivo.name))[0]
+    estado = os.stat(ruta)
+    return '"%x-%x"' % (int(estado.st_mtime), estado.st_size)
+
+
+def _leer(ruta, inicio, longitud):
+    with open(ruta, 'rb') as origen:
+        origen.seek(inicio)
+        while longitud > 0:
+            datos = origen.read(min(TAMANO_LECTURA, longitud))
+            if not datos:
+                break
+            longitud -= len(datos)
+            yield datos
+
+
+def _rango(encabezado, tamano):
+    """(inicio, fin) de un Range de un solo tramo, None si no aplica, o False si no se puede satisfacer."""
+    coincidencia = RANGO.match(encabezado.strip()) if encabezado else None
+    if coincidencia is None:
+        # Sin Range, o con varios tramos: se envía el archivo completo
+        return None
+    inicio, fin = coincidencia.groups()
+    if not inicio:
+        if not fin:
+            return None
+        inicio, fin = max(tamano - int(fin), 0), tamano - 1
+    else:
+        inicio, fin = int(inicio), min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+def respuesta_archivo(request, archivo, nombre_descarga):
+    """Respuesta para un FieldFile ya autorizado."""
+    ruta = archivo.path
+    if not os.path.isfile(ruta):
+        return HttpResponse(status=404)
+    content_type = mimetypes.guess_type(nombre_descarga)[0] or 'application/octet-stream'
+    entrega = getattr(settings, 'MEDIA_ENTREGA', 'django')
+
+    if entrega == 'x-accel':
+        respuesta = HttpResponse(content_type=content_type)
+        respuesta['X-Accel-Redirect'] = settings.MEDIA_URL_INTERNA + quote(archivo.name)
+    elif entrega == 'x-sendfile':
+        respuesta = HttpResponse(content_type=content_type)
+        respuesta['X-Sendfile'] = ruta
+    else:
+        respuesta = _respuesta_local(request, archivo, ruta, content_type)
+
+    respuesta['Content-Disposition'] = f"inline; filename*=UTF-8''{quote(nombre_descarga)}"
+    # La URL es la del objeto y no la del contenido: si el archivo se reemplaza
+    # sigue siendo la misma, así que siempre se revalida contra el ETag
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+def _respuesta_local(request, archivo, ruta, content_type):
+    etag = _etag(archivo, ruta)
+    if etag in request.headers.get('If-None-Match', ''):
+        respuesta = HttpResponseNotModified()
+        respuesta['ETag'] = etag
+        return respuesta
+
+    tamano = os.path.getsize(ruta)
+    # If-Range: si el archivo cambió, se envía completo
+    rango = None
+    if request.headers.get('If-Range', etag) == etag:
+        rango = _rango(request.headers.get('Range'), tamano)
+    if rango is False:
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f'bytes */{tamano}'
+    elif rango is None:
+        respuesta = FileResponse(open(ruta, 'rb'), content_type=content_type)
+    else:
+        inicio, fin = rango
+        respuesta = StreamingHttpResponse(
+            _leer(ruta, inicio, fin - inicio + 1), status=206, content_type=content_type
+        )
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+        respuesta['Content-Length'] = str(fin - inicio + 1)
+    respuesta['Accept-Ranges'] = 'bytes'
+    respuesta['ETag'] = etag
+    return respuesta
@@ -0,0 +1,307 @@
+"""
+Métricas de la API en formato de texto de Prometheus.
+
+MetricasMiddleware registra por vista y acción la latencia, la cantidad y el
+tiempo de las consultas SQL, el tamaño de la respuesta y el código de estado.
+`span(nombre)` mide tramos pesados (cálculo de notas, evaluación de prácticas)
+como decorador o como `with`.
+
+Cada proceso acumula sus métricas en memoria y, si METRICAS_DIRECTORIO está
+configurado, las vuelca cada METRICAS_INTERVALO_ESCRITURA segundos a un
+archivo propio de ese directorio. /metrics suma los archivos de todos los
+procesos del host, así que no hace falta un servicio externo. Los archivos de
+los procesos que terminaron se conservan para que los contadores no
+retrocedan; `manage.py limpiar_metricas` vacía el directorio y debe correr al
+iniciar el servicio, antes de levantar los procesos.
+
+/metrics exige "Authorization: Bearer <METRICAS_TOKEN>" o, si no hay token
+configurado, un usuario ADMIN autenticado con el JWT de la API.
+"""
+import atexit
+import functools
+import glob
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+PREFIJO = 'efsrt_'
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+METRICAS = {
+    'http_solicitud_segundos': ('histogram', 'Latencia de la solicitud', BUCKETS_SEGUNDOS),
+    'http_solicitudes_total': ('counter', 'Solicitudes atendidas por código de estado', None),
+    'http_respuesta_bytes': ('histogram', 'Tamaño del cuerpo de la respuesta', BUCKETS_BYTES),
+    'db_consultas_por_solicitud': ('histogram', 'Consultas SQL por solicitud', BUCKETS_CONSULTAS),
+    'db_segundos_por_solicitud': ('histogram', 'Tiempo en consultas SQL por solicitud', BUCKETS_SEGUNDOS),
+    'span_segundos': ('histogram', 'Duración de los tramos instrumentados', BUCKETS_SEGUNDOS),
+}
+
+
+class Registro:
+    """Métricas del proceso: contadores e histogramas indexados por (métrica, etiquetas)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.valores = {}
+            self._pid = os.getpid()
+            self._archivo = None
+            self._ultima_escritura = 0.0
+
+    def _verificar_proceso(self):
+        # Tras un fork el hijo no debe volver a reportar lo que acumuló el padre
+        if self._pid != os.getpid():
+            self.valores = {}
+            self._pid = os.getpid()
+            self._archivo = None
+
+    def incrementar(self, metrica, etiquetas, valor=1):
+        clave = (metrica, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._verificar_proceso()
+            self.valores[clave] = self.valores.get(clave, 0) + valor
+
+    def observar(self, metrica, etiquetas, valor):
+        buckets = METRICAS[metrica][2]
+        clave = (metrica, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            self._verificar_proceso()
+            datos = self.valores.get(clave)
+            if datos is None:
+                datos = self.valores[clave] = {'buckets': [0] * len(buckets), 'suma': 0.0, 'cuenta': 0}
+            for i, limite in enumerate(buckets):
+                if valor <= limite:
+                    datos['buckets'][i] += 1
+                    break
+            datos['suma'] += valor
+            datos['cuenta'] += 1
+
+    # Persistencia compartida entre procesos
+
+    def _directorio(self):
+        return getattr(settings, 'METRICAS_DIRECTORIO', None)
+
+    def _ruta_archivo(self):
+        if self._archivo is None:
+            # pid + aleatorio: un pid reutilizado no pisa el archivo de un proceso anterior
+            self._archivo = os.path.join(self._directorio(), f'metricas-{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+        return self._archivo
+
+    def _serializar(self):
+        return [[metrica, list(etiquetas), valor] for (metrica, etiquetas), valor in self.valores.items()]
+
+    def volcar(self, forzar=False):
+        if not self._directorio():
+            return
+        ahora = time.monotonic()
+        intervalo = getattr(settings, 'METRICAS_INTERVALO_ESCRITURA', 1.0)
+        if not forzar and ahora - self._ultima_escritura < intervalo:
+            return
+        with self._lock:
+            self._verificar_proceso()
+            self._ultima_escritura = ahora
+            datos = json.dumps(self._serializar())
+            ruta = self._ruta_archivo()
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as destino:
+            destino.write(datos)
+        os.replace(temporal, ruta)
+
+    def combinado(self):
+        """Métricas de todos los procesos: las propias en memoria más los archivos de los demás."""
+        with self._lock:
+            self._verificar_proceso()
+            entradas = self._serializar()
+            propio = self._archivo
+        directorio = self._directorio()
+        if directorio:
+            for ruta in glob.glob(os.path.join(directorio, 'metricas-*.json')):
+                if ruta == propio:
+                    continue
+                try:
+                    with open(ruta) as origen:
+                        entradas.extend(json.load(origen))
+                except (OSError, ValueError):
+                    # Archivo de otro proceso a medio escribir o ya borrado
+                    continue
+
+        total = {}
+        for metrica, etiquetas, valor in entradas:
+            clave = (metrica, tuple(tuple(par) for par in etiquetas))
+            if isinstance(valor, dict):
+                actual = total.setdefault(clave, {'buckets': [0] * len(valor['buckets']), 'suma': 0.0, 'cuenta': 0})
+                actual['buckets'] = [a + b for a, b in zip(actual['buckets'], valor['buckets'])]
+                actual['suma'] += valor['suma']
+                actual['cuenta'] += valor['cuenta']
+            else:
+                total[clave] = total.get(clave, 0) + valor
+        return total
+
+
+def limpiar_directorio():
+    """Borra los archivos de METRICAS_DIRECTORIO; devuelve cuántos había."""
+    directorio = getattr(settings, 'METRICAS_DIRECTORIO', None)
+    if not directorio:
+        return 0
+    borrados = 0
+    for patron in ('metricas-*.json', '*.tmp'):
+        for ruta in glob.glob(os.path.join(directorio, patron)):
+            try:
+                os.remove(ruta)
+                borrados += 1
+            except FileNotFoundError:
+                pass
+    return borrados
+
+
+registro = Registro()
+atexit.register(lambda: registro.volcar(forzar=True))
+
+
+def _etiquetas_texto(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ''
+    escapar = lambda v: str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return '{' + ','.join(f'{k}="{escapar(v)}"' for k, v in pares) + '}'
+
+
+def exposicion():
+    """Texto en formato de exposición de Prometheus (versión 0.0.4)."""
+    por_metrica = {}
+    for (metrica, etiquetas), valor in registro.combinado().items():
+        por_metrica.setdefault(metrica, []).append((etiquetas, valor))
+
+    lineas = []
+    for metrica in sorted(por_metrica):
+        tipo, ayuda, buckets = METRICAS[metrica]
+        nombre = PREFIJO + metrica
+        lineas.append(f'# HELP {nombre} {ayuda}')
+        lineas.append(f'# TYPE {nombre} {tipo}')
+        for etiquetas, valor in sorted(por_metrica[metrica]):
+            if tipo == 'counter':
+                lineas.append(f'{nombre}{_etiquetas_texto(etiquetas)} {valor}')
+                continue
+            acumulado = 0
+            for limite, cantidad in zip(buckets, valor['buckets']):
+                acumulado += cantidad
+                lineas.append(f'{nombre}_bucket{_etiquetas_texto(etiquetas, [("le", limite)])} {acumulado}')
+            lineas.append(f'{nombre}_bucket{_etiquetas_texto(etiquetas, [("le", "+Inf")])} {valor["cuenta"]}')
+            lineas.append(f'{nombre}_sum{_etiquetas_texto(etiquetas)} {valor["suma"]}')
+            lineas.append(f'{nombre}_count{_etiquetas_texto(etiquetas)} {valor["cuenta"]}')
+    return '\n'.join(lineas) + '\n'
+
+
+class span:
+    """Mide un tramo con nombre; sirve como decorador o como `with span('...')`."""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        registro.observar('span_segundos', {'span': self.nombre}, time.perf_counter() - self._inicio)
+        return False
+
+    def __call__(self, funcion):
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            with span(self.nombre):
+                return funcion(*args, **kwargs)
+        return envuelta
+
+
+class _ContadorConsultas:
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.cantidad += 1
+            self.segundos += time.perf_counter() - inicio
+
+
+class MetricasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        contador = _ContadorConsultas()
+        with ExitStack() as pila:
+            for alias in connections:
+                pila.enter_context(connections[alias].execute_wrapper(contador))
+            response = self.get_response(request)
+        duracion = time.perf_counter() - inicio
+
+        etiquetas = self._etiquetas(request)
+        registro.observar('http_solicitud_segundos', etiquetas, duracion)
+        registro.incrementar('http_solicitudes_total', {**etiquetas, 'estado': response.status_code})
+        registro.observar('db_consultas_por_solicitud', etiquetas, contador.cantidad)
+        registro.observar('db_segundos_por_solicitud', etiquetas, contador.segundos)
+        if not response.streaming:
+            registro.observar('http_respuesta_bytes', etiquetas, len(response.content))
+        elif response.has_header('Content-Length'):
+            registro.observar('http_respuesta_bytes', etiquetas, int(response['Content-Length']))
+        registro.volcar()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Los ViewSets guardan en `actions` qué método atiende cada verbo HTTP
+        acciones = getattr(view_func, 'actions', None) or {}
+        request._accion_metricas = acciones.get(request.method.lower(), request.method.lower())
+        return None
+
+    def _etiquetas(self, request):
+        # Se usa el nombre de la ruta y no la URL, para no crear una serie por cada id
+        coincidencia = getattr(request, 'resolver_match', None)
+        return {
+            'vista': coincidencia.view_name if coincidencia else 'sin_ruta',
+            'accion': getattr(request, '_accion_metricas', ''),
+            'metodo': request.method,
+        }
+
+
+def _autorizado(request):
+    token = getattr(settings, 'METRICAS_TOKEN', None)
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    # Sin token, solo administradores; la vista no es de DRF y autentica por su cuenta
+    autenticadores = [clase() for clase in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        usuario = Request(request, authenticators=autenticadores).user
+    except APIException:
+        return False
+    return usuario.is_authenticated and getattr(usuario, 'rol', None) == 'ADMIN'
+
+
+def vista_metricas(request):
+    if not _autorizado(request):
+        return HttpResponseForbidden()
+    registro.volcar(forzar=True)
+    return HttpResponse(exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,47 @@
+# Generated by Django 4.2 on 2026-10-18 10:04
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def poblar_agregados(apps, schema_editor):
+    Practica = apps.get_model('api', 'Practica')
+    Asistencia = apps.get_model('api', 'Asistencia')
+    validos = Q(puntaje_diario__isnull=False) & ~Q(puntaje_diario=0)
+    agregados = Asistencia.objects.order_by().values('practica_id').annotate(
+        suma=Sum('puntaje_diario', filter=validos),
+        total=Count('id', filter=validos),
+        ultima=Max('fecha')
+    )
+    for fila in agregados:
+        Practica.objects.filter(pk=fila['practica_id']).update(
+            asistencia_suma=fila['suma'] or 0,
+            asistencia_total=fila['total'],
+            asistencia_ultima_fecha=fila['ultima']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_alter_asignacionjurado_fecha_asignacion_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practica',
+            name='asistencia_suma',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=9),
+        ),
+        migrations.AddField(
+            model_name='practica',
+            name='asistencia_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='practica',
+            name='asistencia_ultima_fecha',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.RunPython(poblar_agregados, migrations.RunPython.noop),
+    ]
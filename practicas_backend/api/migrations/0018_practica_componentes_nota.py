@@ -0,0 +1,55 @@
+# Generated by Django 4.2 on 2026-10-18 10:05
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Avg
+
+
+def _redondear(valor):
+    if valor is None:
+        return None
+    return Decimal(str(valor)).quantize(Decimal('0.01'))
+
+
+def poblar_notas(apps, schema_editor):
+    Practica = apps.get_model('api', 'Practica')
+    Evaluacion = apps.get_model('api', 'Evaluacion')
+    Informe = apps.get_model('api', 'Informe')
+
+    for practica in Practica.objects.filter(asistencia_total__gt=0):
+        practica.nota_asistencia = _redondear(practica.asistencia_suma / practica.asistencia_total)
+        practica.save(update_fields=['nota_asistencia'])
+
+    for fila in Evaluacion.objects.order_by().values('practica_id').annotate(promedio=Avg('calificacion')):
+        Practica.objects.filter(pk=fila['practica_id']).update(nota_jurado=_redondear(fila['promedio']))
+
+    informes = Informe.objects.filter(calificacion__isnull=False).order_by()
+    for fila in informes.values('practica_id').annotate(promedio=Avg('calificacion')):
+        Practica.objects.filter(pk=fila['practica_id']).update(nota_informe=_redondear(fila['promedio']))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_practica_agregados_asistencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practica',
+            name='nota_asistencia',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True),
+        ),
+        migrations.AddField(
+            model_name='practica',
+            name='nota_informe',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True),
+        ),
+        migrations.AddField(
+            model_name='practica',
+            name='nota_jurado',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True),
+        ),
+        migrations.RunPython(poblar_notas, migrations.RunPython.noop),
+    ]
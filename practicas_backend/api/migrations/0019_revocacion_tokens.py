@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-18 10:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_practica_componentes_nota'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=255, unique=True)),
+                ('expira', models.DateTimeField(db_index=True)),
+                ('creado', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CorteTokens',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('emitidos_antes', models.DateTimeField()),
+                ('expira', models.DateTimeField(db_index=True)),
+                ('actualizado', models.DateTimeField(auto_now=True, db_index=True)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='corte_tokens', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 10:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_versionado_filas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaFragmentada',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('destino', models.CharField(choices=[('informe', 'Documento de informe'), ('boleta_pago', 'Boleta de pago'), ('fut', 'FUT'), ('estructura_informe', 'Estructura de informe')], max_length=20)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('nombre', models.CharField(max_length=255)),
+                ('tamano', models.PositiveBigIntegerField()),
+                ('recibido', models.PositiveBigIntegerField(default=0)),
+                ('hashes_bloques', models.TextField(blank=True, default='')),
+                ('hash_contenido', models.CharField(blank=True, max_length=64)),
+                ('estado', models.CharField(choices=[('EN_CURSO', 'En curso'), ('COMPLETADA', 'Completada')], default='EN_CURSO', max_length=20)),
+                ('creado', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subidas', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-18 10:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_archivos_por_contenido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InformeIndexado',
+            fields=[
+                ('informe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='indexado', serialize=False, to='api.informe')),
+                ('longitud', models.PositiveIntegerField(default=0)),
+                ('firma', models.CharField(max_length=64)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EntradaIndice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termino', models.CharField(max_length=64)),
+                ('frecuencia', models.PositiveIntegerField()),
+                ('posiciones', models.JSONField(default=list)),
+                ('informe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entradas_indice', to='api.informe')),
+            ],
+            options={
+                'unique_together': {('termino', 'informe')},
+            },
+        ),
+    ]
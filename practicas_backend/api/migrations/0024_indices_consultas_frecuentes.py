@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_indice_busqueda_informes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asignacionjurado',
+            index=models.Index(fields=['jurado', 'practica'], name='asignjurado_jurado_prac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['practica', 'fecha'], name='asistencia_practica_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evaluacion',
+            index=models.Index(fields=['practica', 'calificacion'], name='evaluacion_practica_calif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='informe',
+            index=models.Index(fields=['practica', 'calificacion'], name='informe_practica_calif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='informe',
+            index=models.Index(fields=['calificacion', 'fecha_evaluacion', 'fecha_entrega'], name='informe_pendientes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['rol'], name='usuario_rol_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 10:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecalculoNota',
+            fields=[
+                ('practica', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recalculo_nota', serialize=False, to='api.practica')),
+                ('programado_para', models.DateTimeField(db_index=True)),
+                ('limite', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -1,10 +1,18 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from rest_framework.validators import ValidationError
 from django.utils import timezone
-from django.db.models import Avg
+from django.db.models import Avg, Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Least
+from rest_framework.exceptions import PermissionDenied
+import uuid
+from datetime import timedelta
 from decimal import Decimal
 
+from .cache_respuestas import etiqueta, invalidar
+from .metricas import span
+
 class Usuario(AbstractUser):
     ROL_CHOICES = [
         ('ADMIN', 'Administrador General'),
@@ -21,6 +29,18 @@ class Usuario(AbstractUser):
     telefono = models.CharField(max_length=15, null=True, blank=True)
     direccion = models.TextField(null=True, blank=True)
     edad = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [models.Index(fields=['rol'], name='usuario_rol_idx')]
+
+    def refresh_from_db(self, using=None, fields=None):
+        # Al acceder a un campo diferido (p. ej. un usuario armado desde el JWT)
+        # se cargan todos los pendientes en una sola consulta
+        diferidos = self.get_deferred_fields()
+        if fields is not None and diferidos and set(fields) <= diferidos:
+            fields = list(diferidos)
+        super().refresh_from_db(using=using, fields=fields)
+
     def clean(self):
         if self.rol not in [choice[0] for choice in self.ROL_CHOICES]:
             raise ValidationError('Rol no válido')
@@ -62,7 +82,50 @@ class ModuloPracticas(models.Model):
         if self.horas_requeridas and self.horas_requeridas <= 0:
             raise ValidationError('Las horas requeridas deben ser positivas')
 
-class Practica(models.Model):
+# Nota mínima para aprobar un informe o una práctica
+NOTA_APROBATORIA = Decimal('12.5')
+
+
+class ModeloVersionado(models.Model):
+    """
+    Fecha de última modificación y número de versión de la fila, usados para
+    responder GET condicionales (ETag / Last-Modified) sin serializar.
+    """
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        incrementar = not self._state.adding
+        if incrementar:
+            # En la base, como campos_version(): sumado desde una instancia
+            # desactualizada, la versión podría retroceder o repetirse
+            self.version = F('version') + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'updated_at', 'version'}
+        super().save(*args, **kwargs)
+        if incrementar:
+            self.refresh_from_db(fields=['version'])
+
+
+def campos_version():
+    """Valores para marcar como modificadas las filas de un update() en bloque."""
+    return {'updated_at': timezone.now(), 'version': F('version') + 1}
+
+
+def _redondear(valor):
+    if valor is None:
+        return None
+    return Decimal(str(valor)).quantize(Decimal('0.01'))
+
+
+def _promedio(queryset, campo):
+    return _redondear(queryset.aggregate(promedio=Avg(campo))['promedio'])
+
+
+class Practica(ModeloVersionado):
     class Meta:
         unique_together = ['estudiante', 'modulo']
 
@@ -92,12 +155,178 @@ class Practica(models.Model):
     horas_completadas = models.IntegerField(default=0)
     nota_final = models.DecimalField(max_digits=4, decimal_places=2, null=True)
 
+    # Agregados de asistencia mantenidos de forma incremental por Asistencia
+    asistencia_suma = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    asistencia_total = models.PositiveIntegerField(default=0)
+    asistencia_ultima_fecha = models.DateField(null=True, blank=True)
+
+    # Componentes de la nota, actualizados al cambiar Asistencia, Evaluacion o Informe
+    nota_asistencia = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    nota_jurado = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+    nota_informe = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
+
+    CAMPOS_AGREGADOS = (
+        'asistencia_suma', 'asistencia_total', 'asistencia_ultima_fecha',
+        'nota_asistencia', 'nota_jurado', 'nota_informe',
+    )
+
     def __str__(self):
         return f"{self.estudiante.username} - {self.modulo.nombre}"
 
+    def save(self, *args, **kwargs):
+        # Los agregados se escriben con UPDATE propios; un save() completo hecho
+        # con una instancia desactualizada no debe pisarlos.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            diferidos = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.attname not in diferidos
+                and field.name not in self.CAMPOS_AGREGADOS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def puntaje_asistencia(self):
+        """Promedio de los puntajes diarios válidos, leído de los agregados."""
+        if not self.asistencia_total:
+            return None
+        return (self.asistencia_suma / self.asistencia_total).quantize(Decimal('0.01'))
+
+    def actualizar_agregados_asistencia(self, quitar=None, agregar=None, excluir_pk=None):
+        """
+        Aplica a los agregados el efecto de quitar y/o agregar una asistencia,
+        cada una como tupla (puntaje_diario, fecha), sin recorrer las filas.
+        La práctica debe haberse obtenido con select_for_update.
+        """
+        a_fecha = Asistencia._meta.get_field('fecha').to_python
+        recalcular_fecha = False
+        if quitar:
+            puntaje, fecha = quitar[0], a_fecha(quitar[1])
+            if puntaje:
+                self.asistencia_suma -= Decimal(str(puntaje))
+                self.asistencia_total -= 1
+            recalcular_fecha = fecha == self.asistencia_ultima_fecha
+
+        if recalcular_fecha:
+            self.asistencia_ultima_fecha = Asistencia.objects.filter(
+                practica=self
+            ).exclude(pk=excluir_pk).aggregate(Max('fecha'))['fecha__max']
+
+        if agregar:
+            puntaje, fecha = agregar[0], a_fecha(agregar[1])
+            if puntaje:
+                self.asistencia_suma += Decimal(str(puntaje))
+                self.asistencia_total += 1
+            if self.asistencia_ultima_fecha is None or fecha > self.asistencia_ultima_fecha:
+                self.asistencia_ultima_fecha = fecha
+
+        self.nota_asistencia = self.puntaje_asistencia
+        Practica.objects.filter(pk=self.pk).update(
+            asistencia_suma=self.asistencia_suma,
+            asistencia_total=self.asistencia_total,
+            asistencia_ultima_fecha=self.asistencia_ultima_fecha,
+            nota_asistencia=self.nota_asistencia,
+            **campos_version()
+        )
+        # update() no emite post_save: la caché de respuestas se invalida aquí
+        invalidar(etiqueta(Practica, self.pk))
+
+    def actualizar_nota_jurado(self):
+        self.nota_jurado = _promedio(
+            Evaluacion.objects.filter(practica_id=self.pk), 'calificacion'
+        )
+        Practica.objects.filter(pk=self.pk).update(nota_jurado=self.nota_jurado, **campos_version())
+        invalidar(etiqueta(Practica, self.pk))
+
+    def actualizar_nota_informe(self):
+        self.nota_informe = _promedio(
+            Informe.objects.filter(practica_id=self.pk, calificacion__isnull=False), 'calificacion'
+        )
+        Practica.objects.filter(pk=self.pk).update(nota_informe=self.nota_informe, **campos_version())
+        invalidar(etiqueta(Practica, self.pk))
+
+    @classmethod
+    def recalcular_agregados_asistencia(cls, practica_ids=None):
+        """Reconstruye los agregados de asistencia a partir de las filas."""
+        asistencias = Asistencia.objects.all()
+        practicas = cls.objects.all()
+        if practica_ids is not None:
+            asistencias = asistencias.filter(practica_id__in=practica_ids)
+            practicas = practicas.filter(id__in=practica_ids)
+
+        validos = Q(puntaje_diario__isnull=False) & ~Q(puntaje_diario=0)
+        agregados = {
+            fila['practica_id']: fila
+            for fila in asistencias.order_by().values('practica_id').annotate(
+                suma=Sum('puntaje_diario', filter=validos),
+                total=Count('id', filter=validos),
+                ultima=Max('fecha')
+            )
+        }
+
+        actualizadas = []
+        version = campos_version()
+        for practica in practicas.only('id').iterator(chunk_size=500):
+            practica.updated_at, practica.version = version['updated_at'], version['version']
+            fila = agregados.get(practica.id, {})
+            practica.asistencia_suma = fila.get('suma') or Decimal('0')
+            practica.asistencia_total = fila.get('total') or 0
+            practica.asistencia_ultima_fecha = fila.get('ultima')
+            practica.nota_asistencia = practica.puntaje_asistencia
+            actualizadas.append(practica)
+
+        cls.objects.bulk_update(
+            actualizadas,
+            ['asistencia_suma', 'asistencia_total', 'asistencia_ultima_fecha', 'nota_asistencia',
+             'updated_at', 'version'],
+            batch_size=500
+        )
+        invalidar(*(etiqueta(cls, practica.pk) for practica in actualizadas))
+        return len(actualizadas)
+
+    @classmethod
+    def recalcular_notas(cls, practica_ids=None):
+        """Reconstruye nota_jurado y nota_informe con dos consultas agrupadas."""
+        evaluaciones = Evaluacion.objects.all()
+        informes = Informe.objects.filter(calificacion__isnull=False)
+        practicas = cls.objects.all()
+        if practica_ids is not None:
+            evaluaciones = evaluaciones.filter(practica_id__in=practica_ids)
+            informes = informes.filter(practica_id__in=practica_ids)
+            practicas = practicas.filter(id__in=practica_ids)
+
+        notas_jurado = dict(
+            evaluaciones.order_by().values('practica_id').annotate(
+                promedio=Avg('calificacion')
+            ).values_list('practica_id', 'promedio')
+        )
+        notas_informe = dict(
+            informes.order_by().values('practica_id').annotate(
+                promedio=Avg('calificacion')
+            ).values_list('practica_id', 'promedio')
+        )
+
+        actualizadas = []
+        version = campos_version()
+        for practica in practicas.only('id').iterator(chunk_size=500):
+            practica.updated_at, practica.version = version['updated_at'], version['version']
+            practica.nota_jurado = _redondear(notas_jurado.get(practica.id))
+            practica.nota_informe = _redondear(notas_informe.get(practica.id))
+            actualizadas.append(practica)
+
+        cls.objects.bulk_update(
+            actualizadas, ['nota_jurado', 'nota_informe', 'updated_at', 'version'], batch_size=500
+        )
+        invalidar(*(etiqueta(cls, practica.pk) for practica in actualizadas))
+        return len(actualizadas)
+
+    @span('Practica.calcular_nota_final')
     def calcular_nota_final(self):
+        # Los agregados de asistencia pudieron cambiar después de cargar la instancia
+        self.refresh_from_db(fields=self.CAMPOS_AGREGADOS)
+
         # Obtener todas las evaluaciones necesarias
-        asistencias = Asistencia.objects.filter(practica=self)
         evaluaciones_jurado = Evaluacion.objects.filter(
             practica=self,
             jurado__rol='JURADO'
@@ -108,9 +337,7 @@ class Practica(models.Model):
         )
 
         # Calcular nota de asistencia (30%)
-        nota_asistencia = asistencias.aggregate(
-            Avg('puntaje_general')
-        )['puntaje_general__avg'] or Decimal('0')
+        nota_asistencia = self.puntaje_asistencia or Decimal('0')
 
         # Calcular nota de jurados (40%) - Promedio de los 3 jurados
         nota_jurado = evaluaciones_jurado.aggregate(
@@ -132,7 +359,7 @@ class Practica(models.Model):
         # Verificar si todas las evaluaciones están completas
         jurados_count = evaluaciones_jurado.count()
         todas_evaluaciones_completas = (
-            asistencias.exists() and
+            self.asistencia_ultima_fecha is not None and
             jurados_count == 3 and
             informes.exists()
         )
@@ -172,7 +399,7 @@ class Practica(models.Model):
             raise ValidationError('No se pueden asignar más de 3 jurados por práctica')
 
 
-class Asistencia(models.Model):
+class Asistencia(ModeloVersionado):
     practica = models.ForeignKey(Practica, on_delete=models.CASCADE)
     fecha = models.DateField()
     asistio = models.CharField(
@@ -189,37 +416,133 @@ class Asistencia(models.Model):
     puntaje_diario = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     puntaje_general = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
 
+    class Meta:
+        # Asistencias de una práctica por fecha (listados, rangos y agregados)
+        indexes = [models.Index(fields=['practica', 'fecha'], name='asistencia_practica_fecha_idx')]
+
     def calcular_puntaje_diario(self):
         if self.criterios_asistencia:
             conceptual = Decimal(str(self.criterios_asistencia.get('CONCEPTUAL', 0)))
             procedimental = Decimal(str(self.criterios_asistencia.get('PROCEDIMENTAL', 0)))
             actitudinal = Decimal(str(self.criterios_asistencia.get('ACTITUDINAL', 0)))
             
-            self.puntaje_diario = (conceptual + procedimental + actitudinal) / 3
+            # Redondeado igual que en la base de datos para que los agregados cuadren
+            self.puntaje_diario = ((conceptual + procedimental + actitudinal) / 3).quantize(Decimal('0.01'))
             return self.puntaje_diario
         return Decimal('0.00')
 
+    @span('Asistencia.calcular_puntaje_general')
     def calcular_puntaje_general(self):
-        asistencias = Asistencia.objects.filter(practica=self.practica)
-        puntajes_validos = [a.puntaje_diario for a in asistencias if a.puntaje_diario]
-        
-        if puntajes_validos:
-            self.puntaje_general = sum(puntajes_validos) / len(puntajes_validos)
+        practica = Practica.objects.only(*Practica.CAMPOS_AGREGADOS).get(pk=self.practica_id)
+        if practica.puntaje_asistencia is not None:
+            self.puntaje_general = practica.puntaje_asistencia
             return self.puntaje_general
         return Decimal('0.00')
 
-    def save(self, *args, **kwargs):
+    def preparar_puntajes(self):
         if self.asistio == 'FALTA':
             self.puntualidad = 'FALTA'
         if self.criterios_asistencia:
             self.puntaje_diario = self.calcular_puntaje_diario()
-        super().save(*args, **kwargs)
-        self.puntaje_general = self.calcular_puntaje_general()
-        if self.pk:  # Only update if record exists
-            Asistencia.objects.filter(pk=self.pk).update(puntaje_general=self.puntaje_general)
 
-
-class Informe(models.Model):
+    def save(self, *args, **kwargs):
+        self.preparar_puntajes()
+
+        with transaction.atomic():
+            # Primero se bloquean las prácticas y recién después se leen los
+            # valores anteriores: leídos antes, dos ediciones simultáneas
+            # descontarían el mismo puntaje viejo. La práctica de origen se
+            # consulta sin bloqueo solo para saber cuáles bloquear.
+            bloquear = {self.practica_id}
+            if self.pk:
+                bloquear.update(Asistencia.objects.filter(pk=self.pk).values_list('practica_id', flat=True))
+            # En orden de id, como registrar_lote, para no cruzar bloqueos
+            practicas = {
+                p.pk: p for p in Practica.objects.select_for_update().filter(pk__in=bloquear).order_by('pk')
+            }
+
+            anterior = None
+            if self.pk:
+                anterior = Asistencia.objects.filter(pk=self.pk).values(
+                    'practica_id', 'puntaje_diario', 'fecha'
+                ).first()
+            if anterior and anterior['practica_id'] not in practicas:
+                # Otra edición la movió de práctica entre la consulta y el bloqueo
+                practicas[anterior['practica_id']] = Practica.objects.select_for_update().get(
+                    pk=anterior['practica_id']
+                )
+
+            # Si la asistencia cambió de práctica, se descuenta de la anterior
+            if anterior and anterior['practica_id'] != self.practica_id:
+                practicas[anterior['practica_id']].actualizar_agregados_asistencia(
+                    quitar=(anterior['puntaje_diario'], anterior['fecha']),
+                    excluir_pk=self.pk
+                )
+                anterior = None
+
+            practica = practicas.get(self.practica_id)
+            if practica is None:
+                raise Practica.DoesNotExist
+            practica.actualizar_agregados_asistencia(
+                quitar=(anterior['puntaje_diario'], anterior['fecha']) if anterior else None,
+                agregar=(self.puntaje_diario, self.fecha),
+                excluir_pk=self.pk
+            )
+            self.puntaje_general = practica.puntaje_asistencia or Decimal('0.00')
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def registrar_lote(cls, registros):
+        """
+        Inserta o actualiza en bloque asistencias ya validadas, identificadas por
+        (practica, fecha), y recalcula una sola vez los agregados de cada práctica.
+        Devuelve la cantidad de filas creadas y actualizadas.
+        """
+        campos = ['asistio', 'puntualidad', 'criterios_asistencia', 'puntaje_diario', 'updated_at', 'version']
+        practica_ids = {registro['practica_id'] for registro in registros}
+        fechas = {registro['fecha'] for registro in registros}
+
+        with transaction.atomic():
+            # Bloquea las prácticas para no competir con Asistencia.save
+            list(Practica.objects.select_for_update().filter(
+                id__in=practica_ids
+            ).order_by('id').values_list('id', flat=True))
+
+            existentes = {}
+            for asistencia in cls.objects.filter(practica_id__in=practica_ids, fecha__in=fechas).order_by('id'):
+                existentes.setdefault((asistencia.practica_id, asistencia.fecha), asistencia)
+
+            nuevas, modificadas = [], []
+            version = campos_version()
+            for registro in registros:
+                asistencia = existentes.get((registro['practica_id'], registro['fecha']))
+                if asistencia is None:
+                    asistencia = cls(**registro)
+                    nuevas.append(asistencia)
+                else:
+                    for campo, valor in registro.items():
+                        setattr(asistencia, campo, valor)
+                    asistencia.updated_at, asistencia.version = version['updated_at'], version['version']
+                    modificadas.append(asistencia)
+                asistencia.preparar_puntajes()
+
+            cls.objects.bulk_create(nuevas, batch_size=500)
+            cls.objects.bulk_update(modificadas, campos, batch_size=500)
+
+            Practica.recalcular_agregados_asistencia(practica_ids)
+            cls.objects.filter(practica_id__in=practica_ids, fecha__in=fechas).update(
+                puntaje_general=Coalesce(
+                    Subquery(Practica.objects.filter(pk=OuterRef('practica_id')).values('nota_asistencia')[:1]),
+                    Value(Decimal('0.00')),
+                    output_field=models.DecimalField(max_digits=5, decimal_places=2)
+                ),
+                **campos_version()
+            )
+
+        return len(nuevas), len(modificadas)
+
+
+class Informe(ModeloVersionado):
     practica = models.ForeignKey(Practica, on_delete=models.CASCADE)
     documento = models.FileField(upload_to='informes/', null=True, blank=True)
     contenido = models.TextField()
@@ -230,19 +553,26 @@ class Informe(models.Model):
     fecha_evaluacion = models.DateTimeField(null=True, blank=True)
     aprobado = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # Promedio de informes calificados de una práctica, sin leer la tabla
+            models.Index(fields=['practica', 'calificacion'], name='informe_practica_calif_idx'),
+            # pendientes_evaluacion: filtra por ambos nulos y ordena por fecha de entrega
+            models.Index(fields=['calificacion', 'fecha_evaluacion', 'fecha_entrega'], name='informe_pendientes_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Si el informe tiene calificación, actualizar el estado de aprobado
         if self.calificacion is not None:
-            self.aprobado = self.calificacion >= 12.5
+            self.aprobado = self.calificacion >= NOTA_APROBATORIA
         super().save(*args, **kwargs)
 
-        # Actualizar nota final de la práctica
+        # La nota final se recalcula fuera de la solicitud (ver RecalculoNota)
         if self.calificacion is not None:
-            self.practica.calcular_nota_final()
+            RecalculoNota.programar(self.practica_id)
 
 
-class Evaluacion(models.Model):
+class Evaluacion(ModeloVersionado):
     practica = models.ForeignKey(Practica, on_delete=models.CASCADE)
     jurado = models.ForeignKey(Usuario, on_delete=models.CASCADE, limit_choices_to={'rol': 'JURADO'})
     fecha_evaluacion = models.DateTimeField(default=timezone.now)
@@ -252,8 +582,62 @@ class Evaluacion(models.Model):
     class Meta:
         # Asegura que un jurado solo pueda evaluar una vez la misma práctica
         unique_together = ['practica', 'jurado']
-
-class AsignacionDocente(models.Model):
+        # El único ya sirve para buscar por práctica; este cubre el promedio de calificaciones
+        indexes = [models.Index(fields=['practica', 'calificacion'], name='evaluacion_practica_calif_idx')]
+
+    @classmethod
+    def registrar(cls, practica_id, jurado, calificacion, observaciones='', criterios_evaluados=None):
+        """
+        Registra la evaluación de un jurado y recalcula la nota del jurado en una
+        sola transacción corta. Con la tercera evaluación la práctica queda
+        EVALUADO con el promedio de los jurados como nota final.
+        """
+        with transaction.atomic():
+            # El UPDATE inicial bloquea la fila de la práctica (en SQLite, la base)
+            # antes de leer: dos jurados que envían a la vez se serializan y el
+            # segundo ve la evaluación del primero. Un SELECT ... FOR UPDATE no
+            # alcanza en SQLite, donde dos lectores no pueden luego escribir.
+            if not Practica.objects.filter(pk=practica_id).update(**campos_version()):
+                raise Practica.DoesNotExist
+            estado = Practica.objects.filter(pk=practica_id).annotate(
+                asignado=models.Exists(AsignacionJurado.objects.filter(practica=OuterRef('pk'), jurado=jurado)),
+                evaluaciones=Count('evaluacion'),
+                propias=Count('evaluacion', filter=Q(evaluacion__jurado=jurado)),
+            ).values('estudiante_id', 'asignado', 'evaluaciones', 'propias').get()
+
+            if not estado['asignado']:
+                raise PermissionDenied('No estás asignado a esta práctica')
+            if estado['propias']:
+                raise ValidationError('Ya has evaluado esta práctica')
+            if estado['evaluaciones'] >= 3:
+                raise ValidationError('Esta práctica ya tiene el máximo de evaluaciones')
+
+            evaluacion = cls(
+                practica_id=practica_id, jurado=jurado, calificacion=calificacion,
+                observaciones=observaciones, criterios_evaluados=criterios_evaluados or {}
+            )
+            # bulk_create no emite post_save: la nota se recalcula abajo junto con
+            # el estado y no otra vez en la señal
+            cls.objects.bulk_create([evaluacion])
+            if evaluacion.pk is None:
+                # MySQL no devuelve las claves de bulk_create
+                evaluacion.pk = cls.objects.filter(practica_id=practica_id, jurado=jurado).values_list(
+                    'pk', flat=True
+                ).get()
+
+            promedio = _promedio(cls.objects.filter(practica_id=practica_id), 'calificacion')
+            cambios = {'nota_jurado': promedio}
+            etiquetas = [etiqueta(Practica, practica_id)]
+            if estado['evaluaciones'] + 1 == 3:
+                cambios.update(nota_final=promedio, estado='EVALUADO')
+                # El estado cambia lo que muestran los listados
+                etiquetas += [etiqueta(Practica), etiqueta(Usuario, estado['estudiante_id'])]
+            Practica.objects.filter(pk=practica_id).update(**cambios)
+
+        invalidar(*etiquetas)
+        return evaluacion
+
+class AsignacionDocente(ModeloVersionado):
     docente = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='asignaciones')
     modulo = models.ForeignKey(ModuloPracticas, on_delete=models.CASCADE)
     practica = models.ForeignKey(Practica, on_delete=models.CASCADE, null=True)
@@ -263,7 +647,7 @@ class AsignacionDocente(models.Model):
         unique_together = ['docente', 'practica']
 
 
-class AsignacionJurado(models.Model):
+class AsignacionJurado(ModeloVersionado):
     practica = models.ForeignKey(Practica, on_delete=models.CASCADE)
     jurado = models.ForeignKey(Usuario, on_delete=models.CASCADE, limit_choices_to={'rol': 'JURADO'})
     fecha_asignacion = models.DateField(auto_now_add=True)
@@ -271,6 +655,8 @@ class AsignacionJurado(models.Model):
 
     class Meta:
         unique_together = ['practica', 'jurado']
+        # Prácticas de un jurado: el único empieza por práctica y no sirve para esta búsqueda
+        indexes = [models.Index(fields=['jurado', 'practica'], name='asignjurado_jurado_prac_idx')]
 
     def clean(self):
         # Verificar límite de 3 jurados por práctica
@@ -280,3 +666,278 @@ class AsignacionJurado(models.Model):
         
         if jurados_count >= 3:
             raise ValidationError('No se pueden asignar más de 3 jurados por práctica')
+
+
+class TokenRevocado(models.Model):
+    # Tokens JWT invalidados (logout); se purgan al pasar su expiración
+    jti = models.CharField(max_length=255, unique=True)
+    expira = models.DateTimeField(db_index=True)
+    creado = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class CorteTokens(models.Model):
+    # Invalida todos los tokens del usuario emitidos antes de `emitidos_antes`
+    usuario = models.OneToOneField(Usuario, on_delete=models.CASCADE, related_name='corte_tokens')
+    emitidos_antes = models.DateTimeField()
+    expira = models.DateTimeField(db_index=True)
+    actualizado = models.DateTimeField(auto_now=True, db_index=True)
+
+
+class SubidaFragmentada(models.Model):
+    """Subida reanudable en curso; el contenido parcial vive en SUBIDAS_DIRECTORIO."""
+    DESTINO_CHOICES = [
+        ('informe', 'Documento de informe'),
+        ('boleta_pago', 'Boleta de pago'),
+        ('fut', 'FUT'),
+        ('estructura_informe', 'Estructura de informe'),
+    ]
+    ESTADO_CHOICES = [
+        ('EN_CURSO', 'En curso'),
+        ('COMPLETADA', 'Completada'),
+    ]
+    # destino -> (modelo, FileField)
+    DESTINOS = {
+        'informe': ('Informe', 'documento'),
+        'boleta_pago': ('Estudiante', 'boleta_pago'),
+        'fut': ('Estudiante', 'fut'),
+        'estructura_informe': ('ModuloPracticas', 'estructura_informe'),
+    }
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='subidas')
+    destino = models.CharField(max_length=20, choices=DESTINO_CHOICES)
+    objeto_id = models.PositiveIntegerField()
+    nombre = models.CharField(max_length=255)
+    tamano = models.PositiveBigIntegerField()
+    recibido = models.PositiveBigIntegerField(default=0)
+    # Hashes (hex) de los bloques ya cerrados, concatenados
+    hashes_bloques = models.TextField(blank=True, default='')
+    hash_contenido = models.CharField(max_length=64, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='EN_CURSO')
+    creado = models.DateTimeField(auto_now_add=True, db_index=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def bloques(self):
+        return [self.hashes_bloques[i:i + 64] for i in range(0, len(self.hashes_bloques), 64)]
+
+    def modelo_destino(self):
+        nombre_modelo, campo = self.DESTINOS[self.destino]
+        return self._meta.apps.get_model('api', nombre_modelo), campo
+
+
+class ArchivoContenido(models.Model):
+    """Archivo del almacenamiento por contenido y cuántos FileField lo referencian."""
+    nombre = models.CharField(max_length=255, unique=True)
+    hash_contenido = models.CharField(max_length=64, db_index=True)
+    tamano = models.PositiveBigIntegerField()
+    referencias = models.PositiveIntegerField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+
+
+class InformeIndexado(models.Model):
+    """Estado del índice de búsqueda de un informe (ver api/busqueda.py)."""
+    informe = models.OneToOneField(Informe, on_delete=models.CASCADE, primary_key=True, related_name='indexado')
+    # Cantidad de términos indexados, para normalizar el puntaje por largo
+    longitud = models.PositiveIntegerField(default=0)
+    # Hash del contenido y del nombre del documento: si no cambió, no se reindexa
+    firma = models.CharField(max_length=64)
+    actualizado = models.DateTimeField(auto_now=True)
+
+
+class EntradaIndice(models.Model):
+    """Posting del índice invertido: un término en un informe, con sus posiciones."""
+    termino = models.CharField(max_length=64)
+    informe = models.ForeignKey(Informe, on_delete=models.CASCADE, related_name='entradas_indice')
+    frecuencia = models.PositiveIntegerField()
+    posiciones = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = ['termino', 'informe']
+
+
+class RecalculoNota(models.Model):
+    """
+    Recálculo pendiente de la nota final de una práctica. Cada disparo dentro de
+    RECALCULO_NOTAS_ESPERA segundos posterga el anterior en vez de sumar otro,
+    sin pasar de RECALCULO_NOTAS_ESPERA_MAXIMA desde el primero; el comando
+    procesar_recalculos ejecuta los vencidos.
+    """
+    practica = models.OneToOneField(Practica, on_delete=models.CASCADE, primary_key=True, related_name='recalculo_nota')
+    programado_para = models.DateTimeField(db_index=True)
+    # Tope de las postergaciones: una práctica muy activa igual se recalcula
+    limite = models.DateTimeField()
+
+    @classmethod
+    def programar(cls, practica_id):
+        if not getattr(settings, 'RECALCULO_NOTAS_ASINCRONO', False):
+            Practica.objects.get(pk=practica_id).calcular_nota_final()
+            return
+        ahora = timezone.now()
+        programado_para = ahora + timedelta(seconds=getattr(settings, 'RECALCULO_NOTAS_ESPERA', 5))
+        if cls.objects.filter(pk=practica_id).update(programado_para=Least(Value(programado_para), F('limite'))):
+            return
+        limite = ahora + timedelta(seconds=getattr(settings, 'RECALCULO_NOTAS_ESPERA_MAXIMA', 60))
+        # Otro proceso pudo crearlo entre el update y el insert; el suyo sirve igual
+        cls.objects.bulk_create(
+            [cls(practica_id=practica_id, programado_para=min(programado_para, limite), limite=limite)],
+            ignore_conflicts=True
+        )
+
+    @classmethod
+    def _ejecutar(cls, pendientes):
+        """
+        Recalcula las prácticas de `pendientes` [(practica_id, programado_para)].
+        Cada una se toma borrando su fila solo si no se volvió a programar: si
+        dos trabajadores compiten, uno solo la recalcula, y un disparo posterior
+        al borrado crea otra fila que verá los datos nuevos.
+        """
+        procesadas, errores = 0, []
+        for practica_id, programado_para in pendientes:
+            if not cls.objects.filter(pk=practica_id, programado_para=programado_para).delete()[0]:
+                continue
+            try:
+                Practica.objects.get(pk=practica_id).calcular_nota_final()
+                procesadas += 1
+            except Practica.DoesNotExist:
+                continue
+            except Exception as e:
+                cls._reponer(practica_id)
+                errores.append((practica_id, e))
+        return procesadas, errores
+
+    @classmethod
+    def _reponer(cls, practica_id):
+        # Sin programar(): con RECALCULO_NOTAS_ASINCRONO apagado recalcularía aquí
+        # mismo y la falla saldría de _ejecutar con la fila ya borrada
+        reintento = timezone.now() + timedelta(seconds=getattr(settings, 'RECALCULO_NOTAS_ESPERA_MAXIMA', 60))
+        cls.objects.bulk_create(
+            [cls(practica_id=practica_id, programado_para=reintento, limite=reintento)], ignore_conflicts=True
+        )
+
+    @classmethod
+    def procesar_vencidos(cls, lote=100):
+        pendientes = cls.objects.filter(programado_para__lte=timezone.now()).order_by('programado_para')
+        return cls._ejecutar(pendientes.values_list('practica_id', 'programado_para')[:lote])
+
+    @classmethod
+    def procesar(cls, practicas, limite=None):
+        """
+        Recalcula ya, sin esperar al trabajador, lo pendiente de `practicas`
+        (ids o queryset), a lo sumo `limite` filas. Sirve para que quien acaba
+        de escribir lea sus notas. Devuelve (procesadas, errores) como
+        procesar_vencidos; las que fallan quedan reprogramadas.
+        """
+        pendientes = cls.objects.filter(practica__in=practicas).order_by('programado_para')
+        pendientes = pendientes.values_list('practica_id', 'programado_para')
+        if limite is not None:
+            pendientes = pendientes[:limite]
+        return cls._ejecutar(pendientes)
+
+
+class Trabajo(models.Model):
+    """
+    Trabajo en segundo plano (ver api/tareas.py). Los trabajadores lo toman con
+    un UPDATE condicionado al estado, así que no hace falta un broker: basta la
+    base de datos. Cada transición de estado se filtra por `intentos`, de modo
+    que un trabajador que perdió el trabajo (por darse por abandonado) no pisa
+    lo que escribe el que lo retomó.
+    """
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_CURSO', 'En curso'),
+        ('COMPLETADO', 'Completado'),
+        ('FALLIDO', 'Fallido'),
+        ('CANCELADO', 'Cancelado'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tipo = models.CharField(max_length=64)
+    parametros = models.JSONField(default=dict)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
+    # Mayor número, antes se ejecuta
+    prioridad = models.SmallIntegerField(default=0)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    ejecutar_desde = models.DateTimeField(default=timezone.now)
+    # Progreso informado por la tarea: `avance` de `total` (si se conoce)
+    avance = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    mensaje = models.CharField(max_length=255, blank=True)
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='trabajos')
+    trabajador = models.CharField(max_length=100, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+    latido = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Cola: pendientes vencidos por prioridad; también los EN_CURSO sin latido
+            models.Index(fields=['estado', 'prioridad', 'ejecutar_desde'], name='trabajo_cola_idx'),
+            models.Index(fields=['usuario', 'creado'], name='trabajo_usuario_idx'),
+        ]
+
+    def _en_curso(self):
+        return Trabajo.objects.filter(pk=self.pk, estado='EN_CURSO', intentos=self.intentos)
+
+    @classmethod
+    def tomar(cls, trabajador, cantidad=1, tipos=None):
+        """Marca EN_CURSO hasta `cantidad` trabajos vencidos y devuelve sus ids."""
+        ahora = timezone.now()
+        candidatos = cls.objects.filter(estado='PENDIENTE', ejecutar_desde__lte=ahora)
+        if tipos:
+            candidatos = candidatos.filter(tipo__in=tipos)
+        # Se leen de más por si otro trabajador se adelanta con algunos
+        ids = candidatos.order_by('-prioridad', 'ejecutar_desde', 'creado').values_list('pk', flat=True)[:cantidad * 2]
+
+        tomados = []
+        for pk in ids:
+            if len(tomados) == cantidad:
+                break
+            if cls.objects.filter(pk=pk, estado='PENDIENTE').update(
+                estado='EN_CURSO', trabajador=trabajador, intentos=F('intentos') + 1,
+                iniciado=ahora, latido=ahora, error=''
+            ):
+                tomados.append(pk)
+        return tomados
+
+    @classmethod
+    def recuperar_abandonados(cls, segundos):
+        """Devuelve a la cola los trabajos EN_CURSO cuyo trabajador dejó de dar latidos."""
+        limite = timezone.now() - timedelta(seconds=segundos)
+        abandonados = cls.objects.filter(estado='EN_CURSO', latido__lt=limite)
+        agotados = abandonados.filter(intentos__gte=F('max_intentos')).update(
+            estado='FALLIDO', terminado=timezone.now(), error='El trabajador dejó de responder'
+        )
+        return agotados + abandonados.update(estado='PENDIENTE', ejecutar_desde=timezone.now())
+
+    def informar(self, avance, total=None, mensaje=None):
+        """Progreso para el frontend; también cuenta como latido."""
+        self.avance = avance
+        cambios = {'avance': avance, 'latido': timezone.now()}
+        if total is not None:
+            self.total = cambios['total'] = total
+        if mensaje is not None:
+            self.mensaje = cambios['mensaje'] = mensaje[:255]
+        self._en_curso().update(**cambios)
+
+    def completar(self, resultado=None):
+        return self._en_curso().update(
+            estado='COMPLETADO', resultado=resultado, terminado=timezone.now(), mensaje=''
+        )
+
+    def fallar(self, error, espera):
+        """Reprograma el trabajo tras `espera` segundos, o lo da por fallido si no quedan intentos."""
+        if self.intentos < self.max_intentos:
+            return self._en_curso().update(
+                estado='PENDIENTE', error=error, ejecutar_desde=timezone.now() + timedelta(seconds=espera)
+            )
+        return self._en_curso().update(estado='FALLIDO', error=error, terminado=timezone.now())
+
+    def cancelar(self):
+        """Solo se cancela lo que todavía no empezó."""
+        return Trabajo.objects.filter(pk=self.pk, estado='PENDIENTE').update(
+            estado='CANCELADO', terminado=timezone.now()
+        )
@@ -0,0 +1,112 @@
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+def estimar_total(queryset):
+    """
+    Devuelve una estimación del número de filas de la consulta a partir del
+    plan del motor (EXPLAIN), sin ejecutar un COUNT(*). En motores sin
+    estimaciones (SQLite) cuenta de forma exacta hasta LIMITE_CONTEO_ESTIMADO.
+    """
+    connection = connections[queryset.db]
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+
+    if connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + sql, params)
+            columnas = [col[0] for col in cursor.description]
+            filas = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+        # Estimación de un nested loop: producto de filas * filtrado de cada tabla
+        total = 1.0
+        for fila in filas:
+            total *= float(fila.get('rows') or 1) * float(fila.get('filtered') or 100) / 100
+        return int(total)
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    limite = getattr(settings, 'LIMITE_CONTEO_ESTIMADO', 10000)
+    return queryset.order_by()[:limite].count()
+
+
+class PaginacionCursor(CursorPagination):
+    """
+    Paginación por cursor (keyset) sobre un orden estable. Para no romper a los
+    clientes que esperan la lista completa, solo pagina cuando la petición trae
+    `cursor` o `page_size`, salvo que PAGINACION_OBLIGATORIA esté activo.
+
+    `?total=exacto` agrega un COUNT(*) a la respuesta y `?total=estimado` una
+    estimación obtenida del plan de la consulta.
+    """
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    total_query_param = 'total'
+
+    def solicitada(self, request):
+        if getattr(settings, 'PAGINACION_OBLIGATORIA', False):
+            return True
+        return (
+            self.cursor_query_param in request.query_params or
+            self.page_size_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.solicitada(request):
+            return None
+
+        self.total = None
+        self.total_estimado = False
+        modo = request.query_params.get(self.total_query_param)
+        if modo == 'exacto':
+            self.total = queryset.count()
+        elif modo == 'estimado':
+            self.total = estimar_total(queryset)
+            self.total_estimado = True
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        respuesta = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.total is not None:
+            respuesta['total'] = self.total
+            respuesta['total_estimado'] = self.total_estimado
+        respuesta['results'] = data
+        return Response(respuesta)
+
+
+class PaginacionUsuarios(PaginacionCursor):
+    page_size = 100
+
+
+class PaginacionPracticas(PaginacionCursor):
+    page_size = 50
+
+
+class PaginacionAsistencias(PaginacionCursor):
+    ordering = ('-fecha', '-id')
+    page_size = 100
+
+
+class PaginacionInformes(PaginacionCursor):
+    ordering = '-id'
+    page_size = 25
+
+
+class PaginacionJurados(PaginacionCursor):
+    ordering = 'jurado_id'
+    page_size = 50
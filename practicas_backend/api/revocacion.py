@@ -0,0 +1,152 @@
+"""
+Revocación de tokens JWT por `jti` y por usuario ("emitidos antes de").
+
+Cada proceso mantiene en memoria un filtro de Bloom con los jti revocados y
+un diccionario con los cortes por usuario, y se sincroniza con la base de datos
+de forma incremental cada REVOCACION_INTERVALO_SYNC segundos. Verificar un
+token no consulta la base en el camino común: solo un positivo del filtro de
+Bloom (un jti revocado o un falso positivo) se confirma contra la tabla.
+"""
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import CorteTokens, TokenRevocado
+
+
+class FiltroBloom:
+    def __init__(self, bits=2 ** 20, funciones=4):
+        self.bits = bits
+        self.funciones = funciones
+        self.arreglo = bytearray(bits // 8)
+
+    def _posiciones(self, valor):
+        digest = hashlib.blake2b(valor.encode(), digest_size=8 * self.funciones).digest()
+        for i in range(self.funciones):
+            yield int.from_bytes(digest[i * 8:(i + 1) * 8], 'big') % self.bits
+
+    def agregar(self, valor):
+        for posicion in self._posiciones(valor):
+            self.arreglo[posicion // 8] |= 1 << (posicion % 8)
+
+    def __contains__(self, valor):
+        return all(self.arreglo[posicion // 8] & (1 << (posicion % 8)) for posicion in self._posiciones(valor))
+
+
+class RegistroRevocaciones:
+    # Tras purgar expirados, el filtro se reconstruye para no acumular bits viejos
+    RECONSTRUIR_CADA = 3600
+    MAX_CONFIRMADOS = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self._bloom = FiltroBloom()
+            self._cortes = {}
+            self._confirmados = set()
+            self._descartados = {}
+            self._ultima_sync = None
+            self._proxima_sync = 0
+            self._proxima_reconstruccion = 0
+
+    def sincronizar(self, forzar=False):
+        ahora = time.monotonic()
+        if not forzar and ahora < self._proxima_sync:
+            return
+        intervalo = getattr(settings, 'REVOCACION_INTERVALO_SYNC', 5)
+        with self._lock:
+            if not forzar and ahora < self._proxima_sync:
+                return
+            if ahora >= self._proxima_reconstruccion:
+                self._bloom = FiltroBloom()
+                self._cortes = {}
+                self._ultima_sync = None
+                self._proxima_reconstruccion = ahora + self.RECONSTRUIR_CADA
+
+            inicio = timezone.now()
+            tokens = TokenRevocado.objects.filter(expira__gt=inicio)
+            cortes = CorteTokens.objects.filter(expira__gt=inicio)
+            if self._ultima_sync is not None:
+                # Margen para filas confirmadas tarde por transacciones más largas
+                desde = self._ultima_sync - timedelta(seconds=2 * intervalo)
+                tokens = tokens.filter(creado__gte=desde)
+                cortes = cortes.filter(actualizado__gte=desde)
+
+            for jti in tokens.values_list('jti', flat=True):
+                self._bloom.agregar(jti)
+            for usuario_id, emitidos_antes in cortes.values_list('usuario_id', 'emitidos_antes'):
+                self._cortes[usuario_id] = int(emitidos_antes.timestamp())
+
+            self._ultima_sync = inicio
+            self._proxima_sync = ahora + intervalo
+
+    def revocado(self, token):
+        self.sincronizar()
+
+        corte = self._cortes.get(token.get(api_settings.USER_ID_CLAIM))
+        if corte is not None and token.get('iat', 0) < corte:
+            return True
+
+        jti = token.get(api_settings.JTI_CLAIM)
+        if jti is None or jti not in self._bloom:
+            return False
+
+        # Positivo del filtro de Bloom: se confirma en la base. Un revocado se
+        # recuerda siempre; un falso positivo solo por un intervalo de
+        # sincronización, porque otro proceso puede revocar ese jti después
+        if jti in self._confirmados:
+            return True
+        ahora = time.monotonic()
+        if self._descartados.get(jti, 0) > ahora:
+            return False
+        revocado = TokenRevocado.objects.filter(jti=jti).exists()
+        if revocado:
+            if len(self._confirmados) >= self.MAX_CONFIRMADOS:
+                self._confirmados.clear()
+            self._confirmados.add(jti)
+            self._descartados.pop(jti, None)
+        else:
+            if len(self._descartados) >= self.MAX_CONFIRMADOS:
+                self._descartados.clear()
+            self._descartados[jti] = ahora + getattr(settings, 'REVOCACION_INTERVALO_SYNC', 5)
+        return revocado
+
+    def revocar_token(self, token):
+        jti = token[api_settings.JTI_CLAIM]
+        expira = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+        TokenRevocado.objects.get_or_create(jti=jti, defaults={'expira': expira})
+        with self._lock:
+            self._bloom.agregar(jti)
+            self._confirmados.add(jti)
+            self._descartados.pop(jti, None)
+
+    def revocar_usuario(self, usuario_id):
+        """Invalida todos los tokens del usuario emitidos hasta este segundo."""
+        ahora = timezone.now().replace(microsecond=0)
+        CorteTokens.objects.update_or_create(
+            usuario_id=usuario_id,
+            defaults={
+                'emitidos_antes': ahora,
+                'expira': ahora + api_settings.REFRESH_TOKEN_LIFETIME
+            }
+        )
+        with self._lock:
+            self._cortes[usuario_id] = int(ahora.timestamp())
+
+    @staticmethod
+    def purgar_expirados():
+        ahora = timezone.now()
+        tokens, _ = TokenRevocado.objects.filter(expira__lte=ahora).delete()
+        cortes, _ = CorteTokens.objects.filter(expira__lte=ahora).delete()
+        return tokens, cortes
+
+
+registro_revocaciones = RegistroRevocaciones()
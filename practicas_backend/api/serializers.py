@@ -1,11 +1,123 @@
 from rest_framework import serializers
-from .models import Usuario, Estudiante,ModuloPracticas, Practica, Asistencia, Informe, Evaluacion, AsignacionDocente, AsignacionJurado
+from rest_framework.permissions import SAFE_METHODS
+from .models import Usuario, Estudiante,ModuloPracticas, Practica, Asistencia, Informe, Evaluacion, AsignacionDocente, AsignacionJurado, SubidaFragmentada, Trabajo
+from django.conf import settings
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 from django.utils import timezone
-from django.db.models import Avg
 
-class UsuarioSerializer(serializers.ModelSerializer):
+from .media import url_descarga
+
+
+class ArchivoProtegidoField(serializers.FileField):
+    """FileField que se lee como URL firmada de la descarga con control de acceso."""
+
+    def __init__(self, tipo, **kwargs):
+        self.tipo = tipo
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return url_descarga(self.tipo, value.instance.pk, self.context.get('request'))
+
+
+class FormaRespuesta:
+    """
+    Forma de la respuesta pedida con `?fields=` y `?expand=`, ambos listas
+    separadas por comas de rutas con punto (p. ej. `estudiante.username`).
+    Sin ninguno de los dos parámetros la respuesta mantiene su forma completa.
+    """
+
+    def __init__(self, request):
+        self.campos = self._leer(request, 'fields')
+        self.expandir = self._leer(request, 'expand')
+        self.compacta = self.campos is not None or self.expandir is not None
+
+    @staticmethod
+    def _leer(request, parametro):
+        if request is None:
+            return None
+        valor = request.query_params.get(parametro)
+        if not valor:
+            return None
+        return {ruta.strip() for ruta in valor.split(',') if ruta.strip()}
+
+    def incluye(self, ruta):
+        """Indica si el campo en `ruta` aparece en la respuesta."""
+        if self.campos is None:
+            return True
+        return any(
+            campo == ruta or campo.startswith(ruta + '.') or ruta.startswith(campo + '.')
+            for campo in self.campos
+        )
+
+    def expande(self, ruta):
+        """Indica si el objeto anidado en `ruta` se serializa completo y no como id."""
+        if not self.compacta:
+            return True
+        expandido = self.expandir is not None and any(
+            ruta_expandida == ruta or ruta_expandida.startswith(ruta + '.')
+            for ruta_expandida in self.expandir
+        )
+        return expandido and self.incluye(ruta)
+
+
+class CamposDinamicosMixin:
+    """
+    Aplica `?fields=` y `?expand=` al serializer. Los anidados listados en
+    Meta.expandibles se reducen a su id cuando la petición usa cualquiera de
+    los dos parámetros y no los expande. Los campos de solo escritura no se tocan,
+    y en POST/PUT/PATCH los campos escribibles siguen leyendo su entrada: la
+    selección solo se quita de la respuesta.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        self._ocultos = set()
+        request = self.context.get('request')
+        forma = FormaRespuesta(request)
+        if not forma.compacta:
+            return fields
+
+        ruta = self._ruta_anidada()
+        expandibles = getattr(self.Meta, 'expandibles', ())
+        lectura = request.method in SAFE_METHODS
+        for nombre, field in list(fields.items()):
+            if field.write_only:
+                continue
+            ruta_campo = f'{ruta}.{nombre}' if ruta else nombre
+            if not forma.incluye(ruta_campo):
+                if lectura or field.read_only:
+                    del fields[nombre]
+                else:
+                    self._ocultos.add(nombre)
+            elif nombre in expandibles and not forma.expande(ruta_campo):
+                fields[nombre] = serializers.PrimaryKeyRelatedField(
+                    read_only=True,
+                    source=field.source,
+                    many=isinstance(field, serializers.ListSerializer)
+                )
+        return fields
+
+    def to_representation(self, instance):
+        datos = super().to_representation(instance)
+        for nombre in self._ocultos:
+            datos.pop(nombre, None)
+        return datos
+
+    def _ruta_anidada(self):
+        partes = []
+        nodo = self
+        while nodo is not None:
+            if nodo.field_name:
+                partes.append(nodo.field_name)
+            nodo = nodo.parent
+        return '.'.join(reversed(partes))
+
+
+class UsuarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
     estudiante_data = serializers.SerializerMethodField(read_only=True)
     carrera = serializers.CharField(write_only=True, required=False)
@@ -31,13 +143,15 @@ class UsuarioSerializer(serializers.ModelSerializer):
 
 
     def get_estudiante_data(self, obj):
+        # Las vistas cargan el perfil con select_related('perfil_estudiante'),
+        # así que acceder a la relación no genera una consulta por usuario
         try:
-            estudiante = Estudiante.objects.get(usuario=obj)
+            estudiante = obj.perfil_estudiante
             return {
                 'carrera': estudiante.carrera,
                 'ciclo': estudiante.ciclo,
-                'boleta_pago': estudiante.boleta_pago.url if estudiante.boleta_pago else None,
-                'fut': estudiante.fut.url if estudiante.fut else None
+                'boleta_pago': url_descarga('boleta_pago', estudiante.pk) if estudiante.boleta_pago else None,
+                'fut': url_descarga('fut', estudiante.pk) if estudiante.fut else None
             }
         except Estudiante.DoesNotExist:
             return None
@@ -88,12 +202,14 @@ class UsuarioSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
-class ModuloPracticasSerializer(serializers.ModelSerializer):
+class ModuloPracticasSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    estructura_informe = ArchivoProtegidoField('estructura_informe', required=False, allow_null=True)
+
     class Meta:
         model = ModuloPracticas
         fields = '__all__'
 
-class PracticaSerializer(serializers.ModelSerializer):
+class PracticaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     estudiante = UsuarioSerializer(read_only=True)
     supervisores = UsuarioSerializer(many=True, read_only=True)
     modulo = ModuloPracticasSerializer(read_only=True)
@@ -106,9 +222,10 @@ class PracticaSerializer(serializers.ModelSerializer):
     )
     modulo_id = serializers.IntegerField(write_only=True)
    
-    nota_asistencia = serializers.SerializerMethodField()
-    nota_jurado = serializers.SerializerMethodField()
-    nota_informe = serializers.SerializerMethodField()
+    # Componentes de la nota guardados en la práctica; se serializan sin consultas extra
+    nota_asistencia = serializers.DecimalField(max_digits=4, decimal_places=2, read_only=True, coerce_to_string=False)
+    nota_jurado = serializers.DecimalField(max_digits=4, decimal_places=2, read_only=True, coerce_to_string=False)
+    nota_informe = serializers.DecimalField(max_digits=4, decimal_places=2, read_only=True, coerce_to_string=False)
     nota_final = serializers.DecimalField(
         max_digits=4,
         decimal_places=2,
@@ -131,6 +248,7 @@ class PracticaSerializer(serializers.ModelSerializer):
             'nota_informe',
             'horas_completadas'
         ]
+        expandibles = ['estudiante', 'supervisores', 'modulo']
 
     def create(self, validated_data):
         supervisores_ids = validated_data.pop('supervisores_ids')
@@ -143,27 +261,10 @@ class PracticaSerializer(serializers.ModelSerializer):
             supervisores_ids = validated_data.pop('supervisores_ids')
             instance.supervisores.set(supervisores_ids)
         return super().update(instance, validated_data)
-    def get_nota_asistencia(self, obj):
-        asistencias = Asistencia.objects.filter(practica=obj)
-        if asistencias.exists():
-            return asistencias.aggregate(Avg('puntaje_general'))['puntaje_general__avg']
-        return None
 
-    def get_nota_jurado(self, obj):
-        evaluaciones = Evaluacion.objects.filter(practica=obj)
-        if evaluaciones.exists():
-            return evaluaciones.aggregate(Avg('calificacion'))['calificacion__avg']
-        return None
-
-    def get_nota_informe(self, obj):
-        informes = Informe.objects.filter(practica=obj, calificacion__isnull=False)
-        if informes.exists():
-            return informes.aggregate(Avg('calificacion'))['calificacion__avg']
-        return None
 
 
-
-class AsistenciaSerializer(serializers.ModelSerializer):
+class AsistenciaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Asistencia
         fields = [
@@ -210,10 +311,8 @@ class AsistenciaSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        asistencia = Asistencia.objects.create(**validated_data)
-        asistencia.calcular_puntaje_diario()
-        asistencia.calcular_puntaje_general()
-        return asistencia
+        # Asistencia.save calcula el puntaje diario y actualiza los agregados
+        return Asistencia.objects.create(**validated_data)
 
     def update(self, instance, validated_data):
         for attr, value in validated_data.items():
@@ -222,13 +321,25 @@ class AsistenciaSerializer(serializers.ModelSerializer):
         return instance
 
 
-class InformeSerializer(serializers.ModelSerializer):
+class AsistenciaLoteSerializer(AsistenciaSerializer):
+    # En el registro masivo la práctica se valida en bloque desde la vista
+    practica = serializers.IntegerField(min_value=1)
+
+    class Meta(AsistenciaSerializer.Meta):
+        fields = ['practica', 'fecha', 'asistio', 'puntualidad', 'criterios_asistencia']
+        read_only_fields = []
+
+
+class InformeSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     estudiante_nombre = serializers.CharField(source='practica.estudiante.get_full_name', read_only=True)
+    documento = ArchivoProtegidoField('informe', required=False, allow_null=True)
     documento_url = serializers.SerializerMethodField()
     evaluador_nombre = serializers.CharField(source='evaluado_por.get_full_name', read_only=True)
     modulo_nombre = serializers.CharField(source='practica.modulo.nombre', read_only=True)
     modulo_tipo = serializers.CharField(source='practica.modulo.tipo_modulo', read_only=True)
     supervisores_nombres = serializers.SerializerMethodField()
+    # Solo en búsquedas con ?q=
+    relevancia = serializers.SerializerMethodField()
 
     class Meta:
         model = Informe
@@ -241,11 +352,15 @@ class InformeSerializer(serializers.ModelSerializer):
 
     def get_documento_url(self, obj):
         if obj.documento:
-            return self.context['request'].build_absolute_uri(obj.documento.url)
+            return url_descarga('informe', obj.pk, self.context['request'])
         return None
 
+    def get_relevancia(self, obj):
+        relevancia = getattr(obj, 'relevancia', None)
+        return round(relevancia, 4) if relevancia is not None else None
+
 
-class EvaluacionSerializer(serializers.ModelSerializer):
+class EvaluacionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     jurado = UsuarioSerializer(read_only=True)
     practica_details = PracticaSerializer(source='practica', read_only=True)
     
@@ -262,6 +377,7 @@ class EvaluacionSerializer(serializers.ModelSerializer):
             'criterios_evaluados'
         ]
         read_only_fields = ['fecha_evaluacion', 'jurado']
+        expandibles = ['jurado', 'practica_details']
 
     def validate(self, data):
         if 'calificacion' in data and not 0 <= data['calificacion'] <= 20:
@@ -297,14 +413,15 @@ class EvaluacionSerializer(serializers.ModelSerializer):
     
     
     
-class AsignacionDocenteSerializer(serializers.ModelSerializer):
+class AsignacionDocenteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     docente = UsuarioSerializer(read_only=True)
     
     class Meta:
         model = AsignacionDocente
         fields = ['id', 'docente', 'modulo', 'fecha_asignacion']
+        expandibles = ['docente']
 
-class AsignacionJuradoSerializer(serializers.ModelSerializer):
+class AsignacionJuradoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = AsignacionJurado
         fields = ['id', 'practica', 'jurado', 'fecha_asignacion', 'fecha_evaluacion']
@@ -329,7 +446,10 @@ class AsignacionJuradoSerializer(serializers.ModelSerializer):
         return data
 
 
-class EstudianteSerializer(serializers.ModelSerializer):
+class EstudianteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    boleta_pago = ArchivoProtegidoField('boleta_pago', required=False, allow_null=True)
+    fut = ArchivoProtegidoField('fut', required=False, allow_null=True)
+
     class Meta:
         model = Estudiante
         fields = ['id', 'usuario', 'carrera', 'ciclo', 'boleta_pago', 'fut']
@@ -340,4 +460,68 @@ class EstudianteSerializer(serializers.ModelSerializer):
     def validate_codigo_estudiante(self, value):
         if not value.isalnum():
             raise serializers.ValidationError("El código debe ser alfanumérico")
-        return value
\ No newline at end of file
+        return value
+
+class EstudianteImportacionSerializer(serializers.Serializer):
+    # Una fila del padrón de estudiantes; reutiliza las reglas de DNI y ciclo existentes
+    username = serializers.CharField(max_length=150, validators=[UnicodeUsernameValidator()])
+    email = serializers.EmailField()
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    dni = serializers.CharField(max_length=8)
+    carrera = serializers.CharField(max_length=Estudiante._meta.get_field('carrera').max_length)
+    ciclo = serializers.IntegerField()
+    password = serializers.CharField(required=False, allow_blank=True, default='')
+
+    validate_dni = UsuarioSerializer.validate_dni
+    validate_ciclo = EstudianteSerializer.validate_ciclo
+
+
+class SubidaFragmentadaSerializer(serializers.ModelSerializer):
+    tamano_fragmento = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SubidaFragmentada
+        fields = ['id', 'destino', 'objeto_id', 'nombre', 'tamano', 'recibido', 'estado',
+                  'hash_contenido', 'tamano_fragmento']
+        read_only_fields = ['recibido', 'estado', 'hash_contenido']
+
+    def get_tamano_fragmento(self, obj):
+        return settings.SUBIDA_TAMANO_FRAGMENTO
+
+    def validate_nombre(self, value):
+        # Solo el nombre del archivo, sin rutas del cliente
+        value = value.replace('\\', '/').rsplit('/', 1)[-1]
+        if not value or value in ('.', '..'):
+            raise serializers.ValidationError("Nombre de archivo inválido")
+        return value
+
+    def validate_tamano(self, value):
+        if not 0 < value <= settings.SUBIDA_TAMANO_MAXIMO:
+            raise serializers.ValidationError(
+                f"El tamaño debe estar entre 1 y {settings.SUBIDA_TAMANO_MAXIMO} bytes"
+            )
+        return value
+
+
+class TrabajoSerializer(serializers.ModelSerializer):
+    porcentaje = serializers.SerializerMethodField()
+    error = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Trabajo
+        fields = ['id', 'tipo', 'estado', 'prioridad', 'intentos', 'max_intentos', 'avance', 'total',
+                  'porcentaje', 'mensaje', 'resultado', 'error', 'creado', 'iniciado', 'terminado']
+        read_only_fields = fields
+
+    def get_porcentaje(self, obj):
+        if obj.estado == 'COMPLETADO':
+            return 100
+        if not obj.total:
+            return None
+        return min(100, round(obj.avance * 100 / obj.total))
+
+    def get_error(self, obj):
+        # La traza completa queda en la base; al cliente solo la excepción
+        lineas = obj.error.strip().splitlines()
+        return lineas[-1] if lineas else ''
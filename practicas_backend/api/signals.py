@@ -0,0 +1,164 @@
+from django.db import transaction
+from django.core.files.storage import default_storage
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .almacenamiento import es_nombre_por_contenido
+from .busqueda import indexar_informe
+from .cache_respuestas import etiqueta, invalidar
+from .models import (
+    AsignacionDocente, AsignacionJurado, Asistencia, Estudiante, Evaluacion, Informe,
+    ModuloPracticas, Practica, Usuario, campos_version
+)
+
+
+@receiver(post_delete, sender=Asistencia)
+def descontar_asistencia(sender, instance, **kwargs):
+    # Mantiene los agregados de la práctica al eliminar una asistencia
+    with transaction.atomic():
+        practica = Practica.objects.select_for_update().filter(pk=instance.practica_id).first()
+        if practica is None:
+            return
+        practica.actualizar_agregados_asistencia(
+            quitar=(instance.puntaje_diario, instance.fecha)
+        )
+
+
+@receiver(post_save, sender=Evaluacion)
+@receiver(post_delete, sender=Evaluacion)
+def actualizar_nota_jurado(sender, instance, **kwargs):
+    instance.practica.actualizar_nota_jurado()
+
+
+@receiver(post_save, sender=Informe)
+@receiver(post_delete, sender=Informe)
+def actualizar_nota_informe(sender, instance, **kwargs):
+    instance.practica.actualizar_nota_informe()
+
+
+@receiver(post_save, sender=Informe)
+def indexar_informe_guardado(sender, instance, update_fields=None, **kwargs):
+    # Calificar o versionar el informe no cambia su texto
+    if update_fields is not None and not {'contenido', 'documento'} & set(update_fields):
+        return
+    indexar_informe(instance)
+
+
+# Invalidación de la caché de respuestas: cada escritura vence la etiqueta de la
+# instancia, la de su colección y las de las instancias que la incluyen
+
+@receiver(post_save, sender=ModuloPracticas)
+@receiver(post_delete, sender=ModuloPracticas)
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_cache_instancia(sender, instance, **kwargs):
+    invalidar(etiqueta(sender, instance.pk), etiqueta(sender))
+
+
+@receiver(post_save, sender=Practica)
+@receiver(post_delete, sender=Practica)
+def invalidar_cache_practica(sender, instance, **kwargs):
+    invalidar(
+        etiqueta(Practica, instance.pk), etiqueta(Practica),
+        # Alcance del estudiante: solo ve la última práctica de cada módulo
+        etiqueta(Usuario, instance.estudiante_id)
+    )
+
+
+@receiver(m2m_changed, sender=Practica.supervisores.through)
+def invalidar_cache_supervisores(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('pre_clear', 'post_add', 'post_remove'):
+        return
+    if reverse:
+        practica_ids, docente_ids = pk_set or set(), {instance.pk}
+    else:
+        practica_ids, docente_ids = {instance.pk}, pk_set
+    if action == 'pre_clear':
+        # pk_set no viene en clear: se leen las filas antes de borrarlas
+        filas = sender.objects.filter(**{'usuario_id' if reverse else 'practica_id': instance.pk})
+        practica_ids = practica_ids | set(filas.values_list('practica_id', flat=True))
+        docente_ids = set(docente_ids or ()) | set(filas.values_list('usuario_id', flat=True))
+    # Los supervisores son parte de la práctica: cambia su versión (ETag)
+    Practica.objects.filter(pk__in=practica_ids).update(**campos_version())
+    invalidar(
+        *(etiqueta(Practica, pk) for pk in practica_ids),
+        *(etiqueta(Usuario, pk) for pk in docente_ids or ())
+    )
+
+
+@receiver(post_save, sender=Estudiante)
+@receiver(post_delete, sender=Estudiante)
+def invalidar_cache_perfil(sender, instance, **kwargs):
+    # El perfil se serializa dentro del usuario (estudiante_data)
+    invalidar(etiqueta(Estudiante, instance.pk), etiqueta(Usuario, instance.usuario_id))
+
+
+@receiver(post_save, sender=AsignacionJurado)
+@receiver(post_delete, sender=AsignacionJurado)
+def invalidar_cache_asignacion_jurado(sender, instance, **kwargs):
+    invalidar(
+        etiqueta(AsignacionJurado, instance.pk), etiqueta(AsignacionJurado),
+        etiqueta(Practica, instance.practica_id), etiqueta(Usuario, instance.jurado_id)
+    )
+
+
+@receiver(post_save, sender=AsignacionDocente)
+@receiver(post_delete, sender=AsignacionDocente)
+def invalidar_cache_asignacion_docente(sender, instance, **kwargs):
+    etiquetas = [
+        etiqueta(AsignacionDocente, instance.pk), etiqueta(AsignacionDocente),
+        etiqueta(Usuario, instance.docente_id), etiqueta(ModuloPracticas, instance.modulo_id)
+    ]
+    if instance.practica_id:
+        etiquetas.append(etiqueta(Practica, instance.practica_id))
+    invalidar(*etiquetas)
+
+
+# Conteo de referencias del almacenamiento por contenido: se recuerda el nombre
+# cargado de cada FileField y, al reemplazarlo o borrar la fila, se libera el
+# anterior una vez confirmada la transacción. Sumar la referencia nueva le toca
+# al almacenamiento cuando guarda el archivo.
+CAMPOS_ARCHIVO = {
+    Informe: ('documento',),
+    Estudiante: ('boleta_pago', 'fut'),
+    ModuloPracticas: ('estructura_informe',),
+}
+
+
+def _liberar(nombres):
+    nombres = [nombre for nombre in nombres if es_nombre_por_contenido(nombre)]
+    if nombres and hasattr(default_storage, 'liberar'):
+        transaction.on_commit(lambda: [default_storage.liberar(nombre) for nombre in nombres])
+
+
+def recordar_archivos(sender, instance, **kwargs):
+    # Los campos diferidos no están en __dict__: quedan sin recordar
+    instance._archivos_cargados = {
+        campo: instance.__dict__[campo] for campo in CAMPOS_ARCHIVO[sender] if campo in instance.__dict__
+    }
+
+
+def liberar_archivos_reemplazados(sender, instance, created, update_fields=None, **kwargs):
+    cargados = getattr(instance, '_archivos_cargados', {})
+    anteriores = []
+    for campo in CAMPOS_ARCHIVO[sender]:
+        if update_fields is not None and campo not in update_fields:
+            continue
+        actual = getattr(instance, campo).name or ''
+        anterior = cargados.get(campo)
+        anterior = getattr(anterior, 'name', anterior) or ''
+        if anterior and anterior != actual:
+            anteriores.append(anterior)
+        cargados[campo] = actual
+    instance._archivos_cargados = cargados
+    _liberar(anteriores)
+
+
+def liberar_archivos_borrados(sender, instance, **kwargs):
+    _liberar([getattr(instance, campo).name for campo in CAMPOS_ARCHIVO[sender]])
+
+
+for _modelo in CAMPOS_ARCHIVO:
+    post_init.connect(recordar_archivos, sender=_modelo)
+    post_save.connect(liberar_archivos_reemplazados, sender=_modelo)
+    post_delete.connect(liberar_archivos_borrados, sender=_modelo)
@@ -0,0 +1,133 @@
+"""
+Subidas fragmentadas y reanudables de archivos grandes (informes, boletas,
+FUTs y estructuras de informe).
+
+El cliente inicia una subida, envía los fragmentos en orden (cada uno se
+escribe directo al archivo parcial mientras se calcula su hash) y la completa;
+el archivo parcial se mueve al destino del FileField sin volver a leerlo. Si la
+conexión se corta, GET de la subida devuelve los bytes ya recibidos y el
+cliente continúa desde ahí.
+
+El hash del contenido se calcula por bloques de HASH_TAMANO_BLOQUE bytes:
+sha256 de la concatenación de los sha256 de cada bloque. A diferencia de un
+sha256 corrido, su estado (la lista de hashes de bloques) se puede guardar en
+la base entre fragmentos y en procesos distintos.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+
+TAMANO_LECTURA = 64 * 1024
+
+
+def tamano_bloque():
+    return getattr(settings, 'HASH_TAMANO_BLOQUE', 4 * 1024 * 1024)
+
+
+class HashContenido:
+    """Hash por bloques; `bloques` guarda los hashes de los bloques ya cerrados."""
+
+    def __init__(self, bloques=None):
+        self.bloques = list(bloques or [])
+        self._bloque = hashlib.sha256()
+        self._pendiente = 0
+
+    def update(self, datos):
+        tamano = tamano_bloque()
+        vista = memoryview(datos)
+        while vista:
+            parte = vista[:tamano - self._pendiente]
+            self._bloque.update(parte)
+            self._pendiente += len(parte)
+            vista = vista[len(parte):]
+            if self._pendiente == tamano:
+                self._cerrar_bloque()
+
+    def _cerrar_bloque(self):
+        self.bloques.append(self._bloque.hexdigest())
+        self._bloque = hashlib.sha256()
+        self._pendiente = 0
+
+    def hexdigest(self):
+        bloques = list(self.bloques)
+        if self._pendiente:
+            bloques.append(self._bloque.hexdigest())
+        return hashlib.sha256(b''.join(bytes.fromhex(b) for b in bloques)).hexdigest()
+
+
+def directorio_parciales():
+    return getattr(settings, 'SUBIDAS_DIRECTORIO', os.path.join(settings.MEDIA_ROOT, 'subidas_parciales'))
+
+
+def ruta_parcial(subida):
+    return os.path.join(directorio_parciales(), f'{subida.id}.part')
+
+
+class FragmentoInvalido(Exception):
+    pass
+
+
+def escribir_fragmento(subida, flujo, longitud, checksum=None):
+    """
+    Escribe en el archivo parcial, a partir de subida.recibido, los `longitud`
+    bytes de `flujo`, leyendo de a TAMANO_LECTURA. Devuelve los hashes de los
+    bloques completados. Si el fragmento no llega completo o su sha256 no
+    coincide con `checksum`, el archivo vuelve a su largo anterior.
+    """
+    hash_contenido = HashContenido(subida.bloques())
+    hash_fragmento = hashlib.sha256()
+    escritos = 0
+
+    os.makedirs(directorio_parciales(), exist_ok=True)
+    with open(ruta_parcial(subida), 'r+b' if subida.recibido else 'wb') as destino:
+        destino.seek(subida.recibido)
+        try:
+            while escritos < longitud:
+                datos = flujo.read(min(TAMANO_LECTURA, longitud - escritos))
+                if not datos:
+                    raise FragmentoInvalido('El fragmento llegó incompleto')
+                destino.write(datos)
+                hash_contenido.update(datos)
+                hash_fragmento.update(datos)
+                escritos += len(datos)
+            if checksum and hash_fragmento.hexdigest() != checksum.lower():
+                raise FragmentoInvalido('El checksum del fragmento no coincide')
+        except FragmentoInvalido:
+            destino.truncate(subida.recibido)
+            raise
+
+    # Los fragmentos intermedios son múltiplos del bloque; solo el último deja uno abierto
+    return hash_contenido.bloques, hash_contenido.hexdigest()
+
+
+def adjuntar_archivo(instancia, campo, ruta, nombre, hash_contenido):
+    """
+    Asigna el archivo ya escrito en `ruta` al FileField `campo` de la instancia.
+    En almacenamiento local se mueve (mismo disco) en lugar de copiarse.
+    """
+    field = instancia._meta.get_field(campo)
+    storage = field.storage
+    if hasattr(storage, 'adoptar'):
+        # Almacenamiento por contenido: el hash ya se calculó al recibir los fragmentos
+        nombre = storage.adoptar(ruta, hash_contenido, os.path.splitext(nombre)[1].lower()[:10])
+        setattr(instancia, field.attname, nombre)
+        instancia.save(update_fields=[field.name])
+        return nombre
+
+    nombre = storage.get_available_name(field.generate_filename(instancia, nombre))
+    try:
+        destino = storage.path(nombre)
+    except NotImplementedError:
+        # Almacenamiento remoto: no queda otra que enviar el contenido
+        with open(ruta, 'rb') as archivo:
+            nombre = storage.save(nombre, File(archivo))
+        os.remove(ruta)
+    else:
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(ruta, destino)
+
+    setattr(instancia, field.attname, nombre)
+    instancia.save(update_fields=[field.name])
+    return nombre
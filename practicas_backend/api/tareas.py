@@ -0,0 +1,145 @@
+"""
+Trabajos en segundo plano sobre la base de datos, sin broker.
+
+Una tarea es una función registrada con `@tarea('nombre')` que recibe el
+Trabajo y sus parámetros (JSON) y devuelve un resultado serializable en JSON.
+`encolar('nombre', ...)` crea el Trabajo y el comando ejecutar_trabajos lo
+toma y lo corre en un pool de hilos o de procesos. Si la tarea falla se
+reintenta con espera exponencial hasta `max_intentos`; mientras corre puede
+informar su avance con `trabajo.informar(...)`, que el frontend consulta en
+/api/trabajos/{id}/.
+"""
+import os
+import random
+import traceback
+import uuid
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from .busqueda import reindexar
+from .importacion import ImportadorEstudiantes, leer_filas
+from .metricas import span
+from .models import Informe, Practica, Trabajo
+
+TAREAS = {}
+LOTE_REINDEXADO = 200
+
+
+def tarea(nombre, max_intentos=3):
+    def registrar(funcion):
+        funcion.max_intentos = max_intentos
+        TAREAS[nombre] = funcion
+        return funcion
+    return registrar
+
+
+def encolar(tipo, parametros=None, prioridad=0, usuario=None, ejecutar_desde=None):
+    if tipo not in TAREAS:
+        raise LookupError(f'Tarea no registrada: {tipo}')
+    trabajo = Trabajo(
+        tipo=tipo, parametros=parametros or {}, prioridad=prioridad,
+        usuario=usuario, max_intentos=TAREAS[tipo].max_intentos
+    )
+    if ejecutar_desde is not None:
+        trabajo.ejecutar_desde = ejecutar_desde
+    trabajo.save()
+    return trabajo
+
+
+def espera_reintento(intentos):
+    """Segundos antes del siguiente intento: exponencial con tope y algo de azar."""
+    base = getattr(settings, 'TRABAJOS_REINTENTO_BASE', 30)
+    espera = min(base * 2 ** (intentos - 1), getattr(settings, 'TRABAJOS_REINTENTO_MAXIMO', 3600))
+    # El azar evita que los reintentos de una misma falla lleguen todos juntos
+    return espera * random.uniform(0.8, 1.2)
+
+
+def guardar_archivo(archivo, prefijo):
+    """
+    Copia un archivo subido a TRABAJOS_DIRECTORIO para que la tarea lo lea
+    después de la solicitud; devuelve el nombre a pasar en los parámetros.
+    """
+    os.makedirs(settings.TRABAJOS_DIRECTORIO, exist_ok=True)
+    nombre = f'{prefijo}-{uuid.uuid4().hex}{os.path.splitext(archivo.name)[1].lower()[:10]}'
+    with open(ruta_archivo(nombre), 'wb') as destino:
+        for fragmento in archivo.chunks():
+            destino.write(fragmento)
+    return nombre
+
+
+def ruta_archivo(nombre):
+    # Solo el nombre: los parámetros no pueden apuntar fuera del directorio
+    return os.path.join(settings.TRABAJOS_DIRECTORIO, os.path.basename(nombre))
+
+
+def inicializar_proceso():
+    # Con el método 'spawn' el proceso hijo no hereda la configuración de Django
+    import django
+    django.setup()
+
+
+def ejecutar(pk):
+    """Corre un Trabajo ya tomado (EN_CURSO) y registra su resultado o su falla."""
+    trabajo = Trabajo.objects.get(pk=pk)
+    try:
+        funcion = TAREAS.get(trabajo.tipo)
+        if funcion is None:
+            raise LookupError(f'Tarea no registrada: {trabajo.tipo}')
+        with span(f'Trabajo.{trabajo.tipo}'):
+            resultado = funcion(trabajo, **trabajo.parametros)
+    except Exception:
+        trabajo.fallar(traceback.format_exc(limit=5), espera_reintento(trabajo.intentos))
+    else:
+        trabajo.completar(resultado)
+    return trabajo.pk
+
+
+def ejecutar_en_pool(pk):
+    try:
+        return ejecutar(pk)
+    finally:
+        # Cada hilo del pool abre su propia conexión; no debe quedar abierta
+        connections.close_all()
+
+
+# Tareas
+
+@tarea('importar_estudiantes', max_intentos=1)
+def importar_estudiantes(trabajo, archivo, nombre, dni_como_password=False):
+    # Un solo intento: los lotes ya importados quedan confirmados y repetirlos
+    # solo produciría errores de duplicados
+    def informando(filas):
+        for leidas, fila in enumerate(filas, start=1):
+            if leidas % 100 == 0:
+                trabajo.informar(leidas, mensaje=f'{leidas} filas leídas')
+            yield fila
+
+    try:
+        with open(ruta_archivo(archivo), 'rb') as origen:
+            importador = ImportadorEstudiantes(dni_como_password=dni_como_password)
+            return importador.importar(informando(leer_filas(origen, nombre)))
+    finally:
+        os.remove(ruta_archivo(archivo))
+
+
+@tarea('recalcular_agregados')
+def recalcular_agregados(trabajo, practicas=None):
+    with transaction.atomic():
+        total = Practica.recalcular_agregados_asistencia(practicas)
+        Practica.recalcular_notas(practicas)
+    return {'practicas': total}
+
+
+@tarea('reindexar_informes')
+def reindexar_informes(trabajo, desde_cero=False):
+    total = Informe.objects.count()
+    lotes = []
+
+    def informar(mensaje):
+        # reindexar avisa al cerrar cada lote; todos están completos salvo el último
+        lotes.append(mensaje)
+        trabajo.informar(min(len(lotes) * LOTE_REINDEXADO, total), total=total, mensaje=mensaje)
+
+    revisados, reindexados = reindexar(lote=LOTE_REINDEXADO, forzar=desde_cero, salida=informar)
+    return {'revisados': revisados, 'reindexados': reindexados}
@@ -1,8 +1,39 @@
-from django.test import TestCase
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Usuario, Estudiante, ModuloPracticas, Practica, Asistencia, Informe, Evaluacion
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import RefreshTokenConRol
+from .models import (
+    Usuario, Estudiante, ModuloPracticas, Practica, Asistencia, Informe, Evaluacion, AsignacionJurado,
+    TokenRevocado, ArchivoContenido, EntradaIndice, InformeIndexado, RecalculoNota, Trabajo
+)
+from .revocacion import registro_revocaciones
+from .serializers import PracticaSerializer
+from .subidas import HashContenido
+from .almacenamiento import nombre_por_contenido
+from .busqueda import buscar, extractor_pdf_disponible, terminos
+from .metricas import registro as registro_metricas, span
+from .tareas import encolar, ejecutar, tarea
 
 class UsuarioTests(TestCase):
     def setUp(self):
@@ -29,12 +60,11 @@ class EstudianteTests(TestCase):
         self.estudiante = Estudiante.objects.create(
             usuario=self.usuario,
             carrera="Ingeniería de Sistemas",
-            ciclo=6,
-            codigo_estudiante="2024001"
+            ciclo=6
         )
 
     def test_estudiante_creation(self):
-        estudiante = Estudiante.objects.get(codigo_estudiante="2024001")
+        estudiante = Estudiante.objects.get(usuario__username="estudiante2")
         self.assertEqual(estudiante.carrera, "Ingeniería de Sistemas")
         self.assertEqual(estudiante.usuario.rol, "ESTUDIANTE")
 
@@ -76,42 +106,1475 @@ class PracticaTests(TestCase):
         self.practica = Practica.objects.create(
             estudiante=self.estudiante_usuario,
             modulo=self.modulo,
-            supervisor=self.supervisor,
             fecha_inicio="2024-01-01",
             fecha_fin="2024-06-30",
             estado="EN_CURSO",
             horas_completadas=0
         )
+        self.practica.supervisores.add(self.supervisor)
 
     def test_practica_creation(self):
         practica = Practica.objects.get(estudiante=self.estudiante_usuario)
         self.assertEqual(practica.estado, "EN_CURSO")
-        self.assertEqual(practica.supervisor, self.supervisor)
+        self.assertEqual(list(practica.supervisores.all()), [self.supervisor])
 
     def test_calculo_nota_final(self):
         # Crear asistencia
         Asistencia.objects.create(
             practica=self.practica,
             fecha="2024-01-01",
-            presente="ASISTIO",
-            puntaje_general=18.5
+            asistio="ASISTIO",
+            criterios_asistencia={'CONCEPTUAL': 18, 'PROCEDIMENTAL': 18, 'ACTITUDINAL': 18}
         )
         
         # Crear evaluación
+        jurado = Usuario.objects.create(username="jurado_nota", rol="JURADO")
         Evaluacion.objects.create(
             practica=self.practica,
-            jurado=self.supervisor,
-            calificacion=17.5
+            jurado=jurado,
+            calificacion=16
         )
         
         # Crear informe
         Informe.objects.create(
             practica=self.practica,
             contenido="Contenido de prueba",
-            aprobado=True
+            calificacion=14
         )
 
         nota_final = self.practica.calcular_nota_final()
-        self.assertIsNotNone(nota_final)
-        self.assertTrue(0 <= nota_final <= 20)
+        # 18 * 0.3 + 16 * 0.4 + 14 * 0.3
+        self.assertEqual(nota_final, Decimal('16.0'))
+
+
+class AsistenciaAgregadosTests(TestCase):
+    def setUp(self):
+        estudiante = Usuario.objects.create(username="estudiante4", rol="ESTUDIANTE")
+        modulo = ModuloPracticas.objects.create(nombre="Módulo Asistencia", tipo_modulo="MODULO1")
+        self.practica = Practica.objects.create(
+            estudiante=estudiante,
+            modulo=modulo,
+            fecha_inicio="2024-01-01",
+            fecha_fin="2024-06-30",
+            estado="EN_CURSO"
+        )
+
+    def crear_asistencia(self, fecha, puntaje):
+        return Asistencia.objects.create(
+            practica=self.practica,
+            fecha=fecha,
+            criterios_asistencia={'CONCEPTUAL': puntaje, 'PROCEDIMENTAL': puntaje, 'ACTITUDINAL': puntaje}
+        )
+
+    def test_agregados_incrementales(self):
+        self.crear_asistencia("2024-01-02", 12)
+        asistencia = self.crear_asistencia("2024-01-03", 18)
+        self.practica.refresh_from_db()
+        self.assertEqual(self.practica.asistencia_total, 2)
+        self.assertEqual(self.practica.puntaje_asistencia, Decimal('15.00'))
+        self.assertEqual(asistencia.puntaje_general, Decimal('15.00'))
+        self.assertEqual(str(self.practica.asistencia_ultima_fecha), "2024-01-03")
+
+        asistencia.criterios_asistencia = {'CONCEPTUAL': 16, 'PROCEDIMENTAL': 16, 'ACTITUDINAL': 16}
+        asistencia.save()
+        self.practica.refresh_from_db()
+        self.assertEqual(self.practica.asistencia_total, 2)
+        self.assertEqual(self.practica.puntaje_asistencia, Decimal('14.00'))
+
+        asistencia.delete()
+        self.practica.refresh_from_db()
+        self.assertEqual(self.practica.asistencia_total, 1)
+        self.assertEqual(self.practica.puntaje_asistencia, Decimal('12.00'))
+        self.assertEqual(str(self.practica.asistencia_ultima_fecha), "2024-01-02")
+
+    def test_comando_reparacion(self):
+        self.crear_asistencia("2024-01-02", 10)
+        self.crear_asistencia("2024-01-03", 20)
+        Practica.objects.filter(pk=self.practica.pk).update(asistencia_suma=0, asistencia_total=0)
+
+        call_command('recalcular_agregados', stdout=StringIO())
+        self.practica.refresh_from_db()
+        self.assertEqual(self.practica.asistencia_total, 2)
+        self.assertEqual(self.practica.puntaje_asistencia, Decimal('15.00'))
+
+class PracticaNotasTests(TestCase):
+    def setUp(self):
+        estudiante = Usuario.objects.create(username="estudiante5", rol="ESTUDIANTE")
+        self.jurado = Usuario.objects.create(username="jurado1", rol="JURADO")
+        modulo = ModuloPracticas.objects.create(nombre="Módulo Notas", tipo_modulo="MODULO1")
+        self.practica = Practica.objects.create(
+            estudiante=estudiante,
+            modulo=modulo,
+            fecha_inicio="2024-01-01",
+            fecha_fin="2024-06-30",
+            estado="EN_CURSO"
+        )
+
+    def test_notas_guardadas_en_practica(self):
+        evaluacion = Evaluacion.objects.create(practica=self.practica, jurado=self.jurado, calificacion=16)
+        Informe.objects.create(practica=self.practica, contenido="Informe", calificacion=14)
+        self.practica.refresh_from_db()
+        self.assertEqual(self.practica.nota_jurado, Decimal('16.00'))
+        self.assertEqual(self.practica.nota_informe, Decimal('14.00'))
+
+        evaluacion.delete()
+        self.practica.refresh_from_db()
+        self.assertIsNone(self.practica.nota_jurado)
+        self.assertEqual(self.practica.nota_informe, Decimal('14.00'))
+
+    def test_serializer_lee_columnas(self):
+        Practica.objects.filter(pk=self.practica.pk).update(
+            nota_asistencia=Decimal('15.00'), nota_jurado=Decimal('17.00')
+        )
+        data = PracticaSerializer(Practica.objects.get(pk=self.practica.pk)).data
+        self.assertEqual(data['nota_asistencia'], Decimal('15.00'))
+        self.assertEqual(data['nota_jurado'], Decimal('17.00'))
+        self.assertIsNone(data['nota_informe'])
+
+class RegistroMasivoAsistenciaTests(APITestCase):
+    def setUp(self):
+        self.docente = Usuario.objects.create(username="docente1", rol="DOCENTE")
+        modulo = ModuloPracticas.objects.create(nombre="Módulo Masivo", tipo_modulo="MODULO1")
+        self.practicas = []
+        for i in range(40):
+            estudiante = Usuario.objects.create(username=f"masivo{i}", rol="ESTUDIANTE")
+            practica = Practica.objects.create(
+                estudiante=estudiante,
+                modulo=modulo,
+                fecha_inicio="2024-01-01",
+                fecha_fin="2024-06-30",
+                estado="EN_CURSO"
+            )
+            practica.supervisores.add(self.docente)
+            self.practicas.append(practica)
+        self.client.force_authenticate(self.docente)
+        self.url = reverse('asistencia-registro-masivo')
+
+    def fila(self, practica, dia, puntaje=15):
+        return {
+            'practica': practica.id,
+            'fecha': f"2024-03-{dia:02d}",
+            'asistio': 'ASISTIO',
+            'puntualidad': 'PUNTUAL',
+            'criterios_asistencia': {'CONCEPTUAL': puntaje, 'PROCEDIMENTAL': puntaje, 'ACTITUDINAL': puntaje}
+        }
+
+    def test_registro_grilla_completa(self):
+        filas = [self.fila(p, dia) for p in self.practicas for dia in range(1, 31)]
+        response = self.client.post(self.url, {'asistencias': filas}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['creadas'], 1200)
+        self.assertEqual(Asistencia.objects.count(), 1200)
+
+        practica = Practica.objects.get(pk=self.practicas[0].pk)
+        self.assertEqual(practica.asistencia_total, 30)
+        self.assertEqual(practica.nota_asistencia, Decimal('15.00'))
+
+    def test_actualiza_y_reporta_errores_por_fila(self):
+        self.client.post(self.url, [self.fila(self.practicas[0], 1, 10)], format='json')
+        otra = Practica.objects.create(
+            estudiante=Usuario.objects.create(username="ajeno", rol="ESTUDIANTE"),
+            modulo=self.practicas[0].modulo,
+            fecha_inicio="2024-01-01",
+            fecha_fin="2024-06-30",
+            estado="EN_CURSO"
+        )
+        invalida = self.fila(self.practicas[1], 1)
+        invalida['asistio'] = 'TAL_VEZ'
+        filas = [self.fila(self.practicas[0], 1, 20), invalida, self.fila(otra, 1)]
+
+        response = self.client.post(self.url, filas, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['actualizadas'], 1)
+        self.assertEqual([e['indice'] for e in response.data['errores']], [1, 2])
+        self.assertEqual(Asistencia.objects.filter(practica=self.practicas[0]).count(), 1)
+        self.assertEqual(Practica.objects.get(pk=self.practicas[0].pk).nota_asistencia, Decimal('20.00'))
+
+class ConsultasListadoTests(APITestCase):
+    def setUp(self):
+        self.encargado = Usuario.objects.create(username="encargado1", rol="PRACTICAS")
+        modulo = ModuloPracticas.objects.create(nombre="Módulo Listado", tipo_modulo="MODULO1")
+        docentes = [Usuario.objects.create(username=f"docente_l{i}", rol="DOCENTE") for i in range(2)]
+        for i in range(10):
+            estudiante = Usuario.objects.create(username=f"listado{i}", rol="ESTUDIANTE")
+            Estudiante.objects.create(usuario=estudiante, carrera="Computación", ciclo=3)
+            practica = Practica.objects.create(
+                estudiante=estudiante,
+                modulo=modulo,
+                fecha_inicio="2024-01-01",
+                fecha_fin="2024-06-30",
+                estado="EN_CURSO"
+            )
+            practica.supervisores.set(docentes)
+        self.client.force_authenticate(self.encargado)
+
+    def test_listado_practicas_consultas_constantes(self):
+        # Firma del ETag + prácticas + supervisores
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/practicas/')
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(response.data[0]['estudiante']['estudiante_data']['carrera'], "Computación")
+
+    def test_paginacion_por_cursor(self):
+        response = self.client.get('/api/practicas/', {'page_size': 4, 'total': 'exacto'})
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual(response.data['total'], 10)
+        self.assertFalse(response.data['total_estimado'])
+
+        ids = [p['id'] for p in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids += [p['id'] for p in response.data['results']]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), 10)
+
+    def test_total_estimado(self):
+        response = self.client.get('/api/practicas/', {'page_size': 4, 'total': 'estimado'})
+        self.assertEqual(response.data['total'], 10)
+        self.assertTrue(response.data['total_estimado'])
+
+    def test_campos_y_expansion(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/practicas/', {'fields': 'id,estado,estudiante'})
+        self.assertEqual(set(response.data[0]), {'id', 'estado', 'estudiante'})
+        self.assertIsInstance(response.data[0]['estudiante'], int)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/practicas/', {
+                'fields': 'id,estudiante.username', 'expand': 'estudiante'
+            })
+        self.assertEqual(response.data[0]['estudiante'], {'username': 'listado0'})
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/practicas/', {'expand': 'supervisores'})
+        self.assertEqual(len(response.data[0]['supervisores']), 2)
+        self.assertIsInstance(response.data[0]['modulo'], int)
+
+    def test_campos_no_descartan_la_entrada(self):
+        practica = Practica.objects.first()
+        response = self.client.patch(
+            f'/api/practicas/{practica.id}/?fields=id', {'estado': 'COMPLETADO'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {'id'})
+        practica.refresh_from_db()
+        self.assertEqual(practica.estado, 'COMPLETADO')
+
+    def test_expansion_anidada_en_evaluaciones(self):
+        jurado = Usuario.objects.create(username="jurado_l", rol="JURADO")
+        for practica in Practica.objects.all():
+            Evaluacion.objects.create(practica=practica, jurado=jurado, calificacion=15)
+        self.client.force_authenticate(jurado)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/evaluaciones/', {
+                'fields': 'id,practica_details.estudiante.username',
+                'expand': 'practica_details.estudiante'
+            })
+        self.assertEqual(len(response.data), 10)
+        self.assertEqual(set(response.data[0]['practica_details']), {'estudiante'})
+
+    def test_exportacion_csv_y_jsonl(self):
+        response = self.client.get('/api/practicas/exportar/', {'formato': 'csv', 'estado': 'EN_CURSO'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lineas = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lineas), 11)
+        self.assertTrue(lineas[0].startswith('id,estudiante,'))
+
+        response = self.client.get('/api/practicas/exportar/', {'formato': 'jsonl'})
+        filas = [json.loads(linea) for linea in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(filas[0]['estudiante'], 'listado0')
+        self.assertEqual(len(filas), 10)
+
+    def test_listado_estudiantes_consultas_constantes(self):
+        secretaria = Usuario.objects.create(username="secretaria1", rol="SECRETARIA")
+        self.client.force_authenticate(secretaria)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/gestionar-estudiantes/')
+        self.assertEqual(len(response.data), 10)
+
+class ImportacionEstudiantesTests(APITestCase):
+    CSV = (
+        "username,email,first_name,last_name,dni,carrera,ciclo\n"
+        "alumno1,alumno1@test.com,Ana,Pérez,12345678,Computación,3\n"
+        "alumno2,alumno2@test.com,Luis,Rojas,1234,Computación,3\n"
+        "alumno3,alumno3@test.com,Rosa,Díaz,87654321,Contabilidad,9\n"
+        "alumno1,otro@test.com,Ana,Pérez,11112222,Computación,3\n"
+        "existente,existente@test.com,Eva,Soto,33334444,Computación,2\n"
+        "alumno4,alumno4@test.com,Juan,Vega,55556666,Enfermería,1\n"
+        "alumno 5,alumno5@test.com,Eva,Ruiz,77778888,Enfermería,1\n"
+    )
+
+    def setUp(self):
+        Usuario.objects.create(username="existente", rol="ESTUDIANTE")
+        self.client.force_authenticate(Usuario.objects.create(username="secretaria2", rol="SECRETARIA"))
+
+    @override_settings(IMPORTACION_PROCESOS=2)
+    def test_importa_padron_con_reporte_de_errores(self):
+        archivo = SimpleUploadedFile("padron.csv", self.CSV.encode('utf-8'), content_type="text/csv")
+        response = self.client.post(
+            '/api/gestionar-estudiantes/importar/', {'archivo': archivo, 'dni_como_password': 'true'}, format='multipart'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['creados'], 2)
+        self.assertEqual([e['fila'] for e in response.data['errores']], [3, 4, 5, 6, 8])
+        alumno = Usuario.objects.get(username="alumno1")
+        self.assertEqual(alumno.rol, "ESTUDIANTE")
+        self.assertEqual(alumno.perfil_estudiante.ciclo, 3)
+        self.assertTrue(alumno.check_password("12345678"))
+
+    def test_sin_password_exige_la_opcion_del_dni(self):
+        csv_padron = (
+            "username,email,dni,carrera,ciclo,password\n"
+            "alumno1,alumno1@test.com,12345678,Computación,3,\n"
+            "alumno2,alumno2@test.com,87654321,Computación,3,clave-propia-1\n"
+        )
+        archivo = SimpleUploadedFile("padron.csv", csv_padron.encode('utf-8'), content_type="text/csv")
+        response = self.client.post('/api/gestionar-estudiantes/importar/', {'archivo': archivo}, format='multipart')
+        self.assertEqual(response.data['creados'], 1)
+        self.assertEqual(response.data['errores'][0]['fila'], 2)
+        self.assertIn('password', response.data['errores'][0]['errores'])
+        self.assertTrue(Usuario.objects.get(username="alumno2").check_password("clave-propia-1"))
+
+class EstadisticasModuloTests(APITestCase):
+    def setUp(self):
+        self.modulo = ModuloPracticas.objects.create(nombre="Módulo Estadísticas", tipo_modulo="MODULO2")
+        ModuloPracticas.objects.create(nombre="Módulo Vacío", tipo_modulo="MODULO3")
+        for i, (estado, nota) in enumerate([('EVALUADO', 15), ('EVALUADO', 10), ('EN_CURSO', None)]):
+            practica = Practica.objects.create(
+                estudiante=Usuario.objects.create(username=f"estadistica{i}", rol="ESTUDIANTE"),
+                modulo=self.modulo,
+                fecha_inicio="2024-01-01",
+                fecha_fin="2024-06-30",
+                estado=estado,
+                nota_final=nota
+            )
+            Asistencia.objects.create(practica=practica, fecha="2024-02-01", asistio='ASISTIO')
+            Informe.objects.create(practica=practica, contenido="Informe")
+        Asistencia.objects.create(practica=practica, fecha="2024-02-02", asistio='FALTA')
+        self.client.force_authenticate(Usuario.objects.create(username="coordinador1", rol="COORDINADOR"))
+
+    def test_estadisticas_por_modulo(self):
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/modulos/estadisticas/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        datos, vacio = response.data['data']
+        self.assertEqual(datos['total_practicas'], 3)
+        self.assertEqual(datos['practicas_por_estado']['EVALUADO'], 2)
+        self.assertEqual(datos['promedio_nota_final'], 12.5)
+        self.assertEqual(datos['tasa_aprobacion'], 50.0)
+        self.assertEqual(datos['tasa_asistencia'], 75.0)
+        self.assertEqual(datos['informes_pendientes'], 3)
+        self.assertEqual(vacio['total_practicas'], 0)
+        self.assertIsNone(vacio['tasa_asistencia'])
+
+        response = self.client.get('/api/modulos/estadisticas/', {'modulo': self.modulo.id})
+        self.assertEqual(len(response.data['data']), 1)
+
+        response = self.client.get('/api/modulos/estadisticas/', {'modulo': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ListarJuradosTests(APITestCase):
+    def setUp(self):
+        self.modulo = ModuloPracticas.objects.create(nombre="Módulo Jurados", tipo_modulo="MODULO1")
+        self.jurados = [Usuario.objects.create(username=f"jurado_m{i}", rol="JURADO") for i in range(3)]
+        for i in range(4):
+            practica = Practica.objects.create(
+                estudiante=Usuario.objects.create(username=f"evaluado{i}", first_name="E", last_name=f"{i}", rol="ESTUDIANTE"),
+                modulo=self.modulo,
+                fecha_inicio="2024-01-01",
+                fecha_fin="2024-06-30",
+                estado="EN_CURSO"
+            )
+            for jurado in self.jurados[:i % 3 + 1]:
+                AsignacionJurado.objects.create(practica=practica, jurado=jurado)
+        self.client.force_authenticate(Usuario.objects.create(username="encargado2", rol="PRACTICAS"))
+        self.url = f'/api/modulos/{self.modulo.id}/listar-jurados/'
+
+    def test_listado_agrupado_y_ordenado(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        data = response.data['data']
+        self.assertEqual([j['jurado__id'] for j in data], [j.id for j in self.jurados])
+        self.assertEqual([len(j['estudiantes']) for j in data], [4, 2, 1])
+        self.assertEqual(data[0]['estudiantes'][0]['nombre'], "E 0")
+
+    def test_paginacion_y_solo_conteo(self):
+        response = self.client.get(self.url, {'page_size': 2, 'solo_conteo': 'true'})
+        self.assertEqual([j['total_estudiantes'] for j in response.data['data']], [4, 2])
+        self.assertNotIn('estudiantes', response.data['data'][0])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([j['jurado__id'] for j in response.data['data']], [self.jurados[2].id])
+        self.assertIsNone(response.data['next'])
+
+class JWTSinEstadoTests(APITestCase):
+    def setUp(self):
+        # La lista de revocaciones se sincroniza antes para no contar sus consultas
+        registro_revocaciones.reiniciar()
+        registro_revocaciones.sincronizar(forzar=True)
+        self.docente = Usuario.objects.create_user(
+            username="docente_jwt", password="clave-segura-123", email="docente@test.com", rol="DOCENTE"
+        )
+        response = self.client.post('/api/token/', {'username': 'docente_jwt', 'password': 'clave-segura-123'})
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_token_lleva_rol(self):
+        token = AccessToken(self.client._credentials['HTTP_AUTHORIZATION'].split()[1])
+        self.assertEqual(token['rol'], 'DOCENTE')
+        self.assertEqual(token['username'], 'docente_jwt')
+
+    @override_settings(JWT_SIN_ESTADO=True)
+    def test_sin_consulta_de_usuario(self):
+        # Firma del ETag y prácticas; el usuario sale de los claims
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/practicas/', {'fields': 'id'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(JWT_SIN_ESTADO=True)
+    def test_carga_diferida_del_usuario(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/usuarios/me/', {'fields': 'id,email,rol,estudiante_data'})
+        self.assertEqual(response.data['email'], 'docente@test.com')
+        self.assertEqual(response.data['rol'], 'DOCENTE')
+
+    def test_modo_por_defecto_consulta_usuario(self):
+        with self.assertNumQueries(3):
+            self.client.get('/api/practicas/', {'fields': 'id'})
+
+
+class RevocacionTokensTests(APITestCase):
+    def setUp(self):
+        registro_revocaciones.reiniciar()
+        self.usuario = Usuario.objects.create_user(
+            username="docente_revocacion", password="clave-segura-123", rol="DOCENTE"
+        )
+        response = self.client.post('/api/token/', {'username': 'docente_revocacion', 'password': 'clave-segura-123'})
+        self.access = response.data['access']
+        self.refresh = response.data['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.access}")
+
+    def test_logout_revoca_access_y_refresh(self):
+        response = self.client.post('/api/usuarios/logout/', {'refresh_token': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get('/api/usuarios/me/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        response = self.client.post('/api/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cambio_de_contrasena_invalida_tokens_anteriores(self):
+        # El corte es por segundo: se simula un token emitido antes
+        anterior = RefreshTokenConRol.for_user(self.usuario)
+        anterior['iat'] -= 10
+        acceso_anterior = anterior.access_token
+
+        response = self.client.post('/api/usuarios/change_password/', {
+            'old_password': 'clave-segura-123', 'new_password': 'otra-clave-456'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {acceso_anterior}")
+        self.assertEqual(self.client.get('/api/usuarios/me/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['tokens']['access']}")
+        self.assertEqual(self.client.get('/api/usuarios/me/').status_code, status.HTTP_200_OK)
+
+    def test_refresh_actualiza_el_rol(self):
+        Usuario.objects.filter(pk=self.usuario.pk).update(rol='JURADO')
+        response = self.client.post('/api/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AccessToken(response.data['access'])['rol'], 'JURADO')
+
+    @override_settings(JWT_SIN_ESTADO=True)
+    def test_verificacion_sin_consultas(self):
+        registro_revocaciones.sincronizar(forzar=True)
+        # Firma del ETag y prácticas: ni usuario ni tabla de revocaciones
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/practicas/', {'fields': 'id'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(REVOCACION_INTERVALO_SYNC=0)
+    def test_falso_positivo_no_oculta_revocaciones_posteriores(self):
+        token = AccessToken(self.access)
+        registro_revocaciones.sincronizar(forzar=True)
+        registro_revocaciones._bloom.agregar(token['jti'])
+        self.assertFalse(registro_revocaciones.revocado(token))
+
+        # Revocado por otro proceso: la fila aparece sin pasar por este registro
+        TokenRevocado.objects.create(jti=token['jti'], expira=timezone.now() + timedelta(hours=1))
+        self.assertTrue(registro_revocaciones.revocado(token))
+
+    def test_purgar_tokens_revocados(self):
+        registro_revocaciones.revocar_token(AccessToken(self.access))
+        TokenRevocado.objects.update(expira='2000-01-01T00:00:00Z')
+        call_command('purgar_tokens_revocados', stdout=StringIO())
+        self.assertFalse(TokenRevocado.objects.exists())
+
+
+class CacheRespuestasTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.encargado = Usuario.objects.create(username="encargado_cache", rol="PRACTICAS")
+        self.modulo = ModuloPracticas.objects.create(nombre="Módulo Cache", tipo_modulo="MODULO1")
+        self.estudiante = Usuario.objects.create(username="estudiante_cache", first_name="Ana", rol="ESTUDIANTE")
+        self.practica = Practica.objects.create(
+            estudiante=self.estudiante,
+            modulo=self.modulo,
+            fecha_inicio="2024-01-01",
+            fecha_fin="2024-06-30",
+            estado="EN_CURSO"
+        )
+        self.client.force_authenticate(self.encargado)
+
+    def test_listado_de_modulos_desde_cache(self):
+        self.client.get('/api/modulos/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/modulos/')
+        self.assertEqual(response.data[0]['nombre'], "Módulo Cache")
+
+        self.client.patch(f'/api/modulos/{self.modulo.id}/', {'nombre': "Renombrado"}, format='json')
+        response = self.client.get('/api/modulos/')
+        self.assertEqual(response.data[0]['nombre'], "Renombrado")
+
+    def test_detalle_se_invalida_con_asistencias_y_usuarios(self):
+        url = f'/api/practicas/{self.practica.id}/'
+        self.assertIsNone(self.client.get(url).data['nota_asistencia'])
+
+        Asistencia.objects.create(
+            practica=self.practica, fecha="2024-01-02",
+            criterios_asistencia={'CONCEPTUAL': 15, 'PROCEDIMENTAL': 15, 'ACTITUDINAL': 15}
+        )
+        response = self.client.get(url)
+        self.assertIsNotNone(response.data['nota_asistencia'])
+
+        # Desde la caché solo queda la consulta de la firma del ETag
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        self.estudiante.first_name = "Beatriz"
+        self.estudiante.save()
+        self.assertEqual(self.client.get(url).data['estudiante']['first_name'], "Beatriz")
+
+    def test_invalidacion_solo_de_las_etiquetas_afectadas(self):
+        otra = Practica.objects.create(
+            estudiante=Usuario.objects.create(username="otro_cache", rol="ESTUDIANTE"),
+            modulo=ModuloPracticas.objects.create(nombre="Otro", tipo_modulo="MODULO2"),
+            fecha_inicio="2024-01-01",
+            fecha_fin="2024-06-30",
+            estado="EN_CURSO"
+        )
+        self.client.get(f'/api/practicas/{otra.id}/')
+        self.practica.actualizar_nota_jurado()
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/practicas/{otra.id}/')
+
+    def test_alcance_por_usuario(self):
+        docente = Usuario.objects.create(username="docente_cache", rol="DOCENTE")
+        self.client.force_authenticate(docente)
+        self.assertEqual(self.client.get('/api/practicas/').data, [])
+
+        self.practica.supervisores.add(docente)
+        self.assertEqual(len(self.client.get('/api/practicas/').data), 1)
+        self.client.force_authenticate(Usuario.objects.create(username="docente_cache2", rol="DOCENTE"))
+        self.assertEqual(self.client.get('/api/practicas/').data, [])
+
+    def test_plantilla_de_docentes(self):
+        docente = Usuario.objects.create(username="docente_plantilla", rol="DOCENTE")
+        self.assertEqual(len(self.client.get('/api/gestionar-docentes/').data), 1)
+        with self.assertNumQueries(0):
+            self.client.get('/api/gestionar-docentes/')
+
+        Usuario.objects.create(username="docente_nuevo", rol="DOCENTE")
+        self.assertEqual(len(self.client.get('/api/gestionar-docentes/').data), 2)
+        docente.last_name = "Quispe"
+        docente.save()
+        response = self.client.get('/api/gestionar-docentes/')
+        self.assertIn("Quispe", [d['last_name'] for d in response.data])
+
+
+class RespuestasCondicionalesTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.encargado = Usuario.objects.create(username="encargado_etag", rol="PRACTICAS")
+        self.estudiante = Usuario.objects.create(username="estudiante_etag", rol="ESTUDIANTE")
+        self.practica = Practica.objects.create(
+            estudiante=self.estudiante,
+            modulo=ModuloPracticas.objects.create(nombre="Módulo ETag", tipo_modulo="MODULO1"),
+            fecha_inicio="2024-01-01",
+            fecha_fin="2024-06-30",
+            estado="EN_CURSO"
+        )
+        self.client.force_authenticate(self.encargado)
+
+    def test_listado_sin_cambios_responde_304(self):
+        response = self.client.get('/api/practicas/')
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/practicas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        Asistencia.objects.create(
+            practica=self.practica, fecha="2024-01-02",
+            criterios_asistencia={'CONCEPTUAL': 15, 'PROCEDIMENTAL': 15, 'ACTITUDINAL': 15}
+        )
+        response = self.client.get('/api/practicas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_periodo_de_firmas_invalida_etag_y_fecha(self):
+        # Las URLs firmadas vencen aunque la fila no cambie
+        Practica.objects.filter(pk=self.practica.pk).update(updated_at=timezone.now() - timedelta(days=1))
+        url = f'/api/practicas/{self.practica.id}/'
+        response = self.client.get(url)
+        etag, modificado = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        with override_settings(MEDIA_FIRMA_VIGENCIA=2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response['ETag'], etag)
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=modificado)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detalle_con_version(self):
+        url = f'/api/practicas/{self.practica.id}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        etag = response['ETag']
+
+        self.practica.estado = 'COMPLETADO'
+        self.practica.save()
+        self.practica.refresh_from_db()
+        self.assertEqual(self.practica.version, 2)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['estado'], 'COMPLETADO')
+
+    def test_etag_depende_de_la_forma_y_del_usuario(self):
+        etag = self.client.get('/api/practicas/')['ETag']
+        self.assertNotEqual(self.client.get('/api/practicas/', {'fields': 'id'})['ETag'], etag)
+        self.client.force_authenticate(Usuario.objects.create(username="otro_etag", rol="PRACTICAS"))
+        response = self.client.get('/api/practicas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_informe_cambia_con_su_practica(self):
+        informe = Informe.objects.create(practica=self.practica, contenido="Informe")
+        etag = self.client.get('/api/informes/')['ETag']
+        self.practica.supervisores.add(Usuario.objects.create(username="docente_etag", rol="DOCENTE"))
+        response = self.client.get('/api/informes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['id'], informe.id)
+
+
+class SubidasFragmentadasTests(APITestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        ajustes = override_settings(
+            MEDIA_ROOT=media, SUBIDAS_DIRECTORIO=os.path.join(media, 'parciales'),
+            HASH_TAMANO_BLOQUE=16, SUBIDA_TAMANO_FRAGMENTO=32
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.estudiante = Usuario.objects.create(username="estudiante_subida", rol="ESTUDIANTE")
+        practica = Practica.objects.create(
+            estudiante=self.estudiante,
+            modulo=ModuloPracticas.objects.create(nombre="Módulo Subidas", tipo_modulo="MODULO1"),
+            fecha_inicio="2024-01-01",
+            fecha_fin="2024-06-30",
+            estado="EN_CURSO"
+        )
+        self.informe = Informe.objects.create(practica=practica, contenido="Informe final")
+        self.contenido = bytes(range(70))
+        self.client.force_authenticate(self.estudiante)
+
+    def _iniciar(self):
+        response = self.client.post('/api/subidas/', {
+            'destino': 'informe', 'objeto_id': self.informe.id, 'nombre': 'C:\\scans\\informe.pdf',
+            'tamano': len(self.contenido)
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['tamano_fragmento'], 32)
+        return f"/api/subidas/{response.data['id']}/"
+
+    def _enviar(self, url, offset, datos, **params):
+        return self.client.put(
+            f'{url}fragmento/?offset={offset}' + ''.join(f'&{k}={v}' for k, v in params.items()),
+            data=datos, content_type='application/octet-stream'
+        )
+
+    def test_subida_reanudable(self):
+        url = self._iniciar()
+        response = self._enviar(url, 0, self.contenido[:32], sha256='0' * 64)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url).data['recibido'], 0)
+
+        primero = self.contenido[:32]
+        response = self._enviar(url, 0, primero, sha256=hashlib.sha256(primero).hexdigest())
+        self.assertEqual(response.data['recibido'], 32)
+
+        # Reanudación: el cliente consulta lo recibido y continúa
+        self.assertEqual(self.client.get(url).data['recibido'], 32)
+        self.assertEqual(self._enviar(url, 0, primero).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.post(f'{url}completar/').status_code, status.HTTP_400_BAD_REQUEST)
+        self._enviar(url, 32, self.contenido[32:64])
+        self._enviar(url, 64, self.contenido[64:])
+
+        response = self.client.post(f'{url}completar/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        esperado = HashContenido()
+        esperado.update(self.contenido)
+        self.assertEqual(response.data['hash_contenido'], esperado.hexdigest())
+
+        self.informe.refresh_from_db()
+        self.assertEqual(self.informe.documento.name, nombre_por_contenido(esperado.hexdigest(), '.pdf'))
+        with self.informe.documento.open('rb') as archivo:
+            self.assertEqual(archivo.read(), self.contenido)
+
+    def test_fragmentos_intermedios_alineados_al_bloque(self):
+        url = self._iniciar()
+        response = self._enviar(url, 0, self.contenido[:20])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_destino_ajeno(self):
+        self.client.force_authenticate(Usuario.objects.create(username="otro_subida", rol="ESTUDIANTE"))
+        response = self.client.post('/api/subidas/', {
+            'destino': 'informe', 'objeto_id': self.informe.id, 'nombre': 'informe.pdf', 'tamano': 10
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_hash_por_bloques_independiente_de_las_escrituras(self):
+        por_partes = HashContenido()
+        for i in range(0, len(self.contenido), 7):
+            por_partes.update(self.contenido[i:i + 7])
+        de_una_vez = HashContenido()
+        de_una_vez.update(self.contenido)
+        self.assertEqual(por_partes.hexdigest(), de_una_vez.hexdigest())
+
+
+class AlmacenamientoPorContenidoTests(APITestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        ajustes = override_settings(MEDIA_ROOT=self.media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        estudiante = Usuario.objects.create(username="estudiante_cas", rol="ESTUDIANTE")
+        self.practica = Practica.objects.create(
+            estudiante=estudiante,
+            modulo=ModuloPracticas.objects.create(nombre="Módulo CAS", tipo_modulo="MODULO1"),
+            fecha_inicio="2024-01-01",
+            fecha_fin="2024-06-30",
+            estado="EN_CURSO"
+        )
+
+    def _informe(self, contenido, nombre='informe.pdf'):
+        return Informe.objects.create(
+            practica=self.practica, contenido="Informe", documento=SimpleUploadedFile(nombre, contenido)
+        )
+
+    def test_subidas_identicas_se_deduplican(self):
+        primero = self._informe(b'%PDF-1.4 mismo contenido')
+        segundo = self._informe(b'%PDF-1.4 mismo contenido', 'copia.PDF')
+        self.assertEqual(primero.documento.name, segundo.documento.name)
+        self.assertRegex(primero.documento.name, r'^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual(ArchivoContenido.objects.get().referencias, 2)
+
+        ruta = primero.documento.path
+        with self.captureOnCommitCallbacks(execute=True):
+            primero.documento = SimpleUploadedFile('otro.pdf', b'%PDF-1.4 otro contenido')
+            primero.save()
+        self.assertEqual(ArchivoContenido.objects.get(nombre=segundo.documento.name).referencias, 1)
+        self.assertTrue(os.path.exists(ruta))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Informe.objects.get(pk=segundo.pk).delete()
+        self.assertFalse(os.path.exists(ruta))
+        self.assertFalse(ArchivoContenido.objects.filter(nombre=segundo.documento.name).exists())
+
+    def test_rehashear_archivos_existentes(self):
+        for nombre in ('boletas_pago/boleta.pdf', 'futs/fut.pdf', 'futs/huerfano.pdf'):
+            os.makedirs(os.path.join(self.media, os.path.dirname(nombre)), exist_ok=True)
+            with open(os.path.join(self.media, nombre), 'wb') as archivo:
+                archivo.write(b'mismo escaneo')
+        usuario = Usuario.objects.create(username="estudiante_rehash", rol="ESTUDIANTE")
+        estudiante = Estudiante.objects.create(usuario=usuario, carrera="Computación", ciclo=2)
+        Estudiante.objects.filter(pk=estudiante.pk).update(
+            boleta_pago='boletas_pago/boleta.pdf', fut='futs/fut.pdf'
+        )
+
+        salida = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rehashear_media', hilos=2, stdout=salida)
+        self.assertIn('1 sin referencias', salida.getvalue())
+
+        estudiante.refresh_from_db()
+        self.assertEqual(estudiante.boleta_pago.name, estudiante.fut.name)
+        self.assertEqual(ArchivoContenido.objects.get().referencias, 2)
+        with estudiante.fut.open('rb') as archivo:
+            self.assertEqual(archivo.read(), b'mismo escaneo')
+        self.assertFalse(os.path.exists(os.path.join(self.media, 'boletas_pago/boleta.pdf')))
+
+
+class DescargaArchivosTests(APITestCase):
+    CONTENIDO = b'%PDF-1.4 informe escaneado'
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.estudiante = Usuario.objects.create(username="estudiante_descarga", rol="ESTUDIANTE")
+        self.docente = Usuario.objects.create(username="docente_descarga", rol="DOCENTE")
+        self.modulo = ModuloPracticas.objects.create(
+            nombre="Módulo Descargas", tipo_modulo="MODULO1",
+            estructura_informe=SimpleUploadedFile('estructura.pdf', b'%PDF-1.4 estructura')
+        )
+        practica = Practica.objects.create(
+            estudiante=self.estudiante,
+            modulo=self.modulo,
+            fecha_inicio="2024-01-01",
+            fecha_fin="2024-06-30",
+            estado="EN_CURSO"
+        )
+        practica.supervisores.add(self.docente)
+        self.informe = Informe.objects.create(
+            practica=practica, contenido="Informe", documento=SimpleUploadedFile('informe.pdf', self.CONTENIDO)
+        )
+        self.url = f'/api/archivos/informe/{self.informe.id}/'
+
+    def test_descarga_segun_rol(self):
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        for usuario in (self.estudiante, self.docente):
+            self.client.force_authenticate(usuario)
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(b''.join(response.streaming_content), self.CONTENIDO)
+            self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        self.client.force_authenticate(Usuario.objects.create(username="ajeno_descarga", rol="ESTUDIANTE"))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_404_NOT_FOUND)
+        estructura = f'/api/archivos/estructura_informe/{self.modulo.id}/'
+        self.assertEqual(self.client.get(estructura).status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(self.estudiante)
+        self.assertEqual(self.client.get(estructura).status_code, status.HTTP_200_OK)
+
+    def test_rangos_y_etag(self):
+        self.client.force_authenticate(self.estudiante)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=4-7')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENIDO[4:8])
+        self.assertEqual(response['Content-Range'], f'bytes 4-7/{len(self.CONTENIDO)}')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENIDO[-3:])
+        response = self.client.get(self.url, HTTP_RANGE='bytes=500-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+        etag = response['ETag'] if 'ETag' in response else self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Reemplazado el documento, la misma URL entrega el nuevo contenido
+        self.informe.documento = SimpleUploadedFile('informe.pdf', b'%PDF-otro contenido')
+        self.informe.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-otro contenido')
+
+    def test_enlace_firmado_del_serializer(self):
+        self.client.force_authenticate(self.estudiante)
+        url = self.client.get(f'/api/informes/{self.informe.id}/').data['documento_url']
+        self.client.force_authenticate(None)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        otra = url.replace(f'/informe/{self.informe.id}/', f'/informe/{self.informe.id + 1}/')
+        self.assertEqual(self.client.get(otra).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(MEDIA_ENTREGA='x-accel')
+    def test_entrega_delegada_a_nginx(self):
+        self.client.force_authenticate(self.docente)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Accel-Redirect'], '/media-interna/' + self.informe.documento.name)
+        self.assertEqual(response.content, b'')
+
+
+class BusquedaInformesTests(APITestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.docente = Usuario.objects.create(username="docente_busqueda", rol="DOCENTE")
+        modulo = ModuloPracticas.objects.create(nombre="Módulo Búsqueda", tipo_modulo="MODULO1")
+        self.informes = []
+        textos = [
+            "Instalación de la red de datos en el laboratorio de cómputo",
+            "Mantenimiento de la red eléctrica y respaldo de datos del área",
+            "Inventario de equipos del almacén",
+        ]
+        for i, texto in enumerate(textos):
+            estudiante = Usuario.objects.create(username=f"estudiante_busqueda{i}", rol="ESTUDIANTE")
+            practica = Practica.objects.create(
+                estudiante=estudiante, modulo=modulo,
+                fecha_inicio="2024-01-01", fecha_fin="2024-06-30", estado="EN_CURSO"
+            )
+            if i < 2:
+                practica.supervisores.add(self.docente)
+            self.informes.append(Informe.objects.create(practica=practica, contenido=texto))
+
+    def test_terminos_normalizados(self):
+        self.assertEqual(terminos("La Instalación de RED"), ['instalacion', 'red'])
+
+    def test_busqueda_ordenada_por_relevancia(self):
+        self.client.force_authenticate(Usuario.objects.create(username="practicas_busqueda", rol="PRACTICAS"))
+        response = self.client.get('/api/informes/', {'q': 'red de datos'})
+        self.assertEqual([d['id'] for d in response.data], [self.informes[0].id, self.informes[1].id])
+        self.assertGreater(response.data[0]['relevancia'], 0)
+        # Todos los términos deben aparecer
+        self.assertEqual(self.client.get('/api/informes/', {'q': 'red almacén'}).data, [])
+        response = self.client.get('/api/informes/', {'q': 'ALMACEN'})
+        self.assertEqual([d['id'] for d in response.data], [self.informes[2].id])
+
+    def test_solo_informes_visibles(self):
+        self.client.force_authenticate(self.docente)
+        self.assertEqual(self.client.get('/api/informes/', {'q': 'inventario'}).data, [])
+        self.assertEqual(len(buscar('inventario')), 1)
+
+    def test_indice_se_actualiza_al_guardar(self):
+        informe = self.informes[2]
+        informe.contenido = "Configuración de servidores"
+        informe.save()
+        self.assertEqual(buscar('inventario'), [])
+        self.assertEqual([pk for pk, _ in buscar('servidores')], [informe.id])
+
+        # Guardar sin tocar el texto no pasa por el índice
+        with CaptureQueriesContext(connection) as consultas:
+            informe.save(update_fields=['version'])
+        self.assertFalse([c for c in consultas if 'api_entradaindice' in c['sql'] or 'api_informeindexado' in c['sql']])
+
+        informe.documento.save('anexo.txt', SimpleUploadedFile('anexo.txt', 'Diagrama de topología'.encode()))
+        self.assertEqual([pk for pk, _ in buscar('topologia')], [informe.id])
+
+    def test_reindexar_por_lotes(self):
+        EntradaIndice.objects.all().delete()
+        InformeIndexado.objects.all().delete()
+        salida = StringIO()
+        call_command('reindexar_informes', '--lote', '2', stdout=salida)
+        self.assertIn('3 de 3 informes reindexados', salida.getvalue())
+        self.assertEqual(len(buscar('red')), 2)
+        salida = StringIO()
+        call_command('reindexar_informes', stdout=salida)
+        self.assertIn('0 de 3 informes reindexados', salida.getvalue())
+
+    def test_reindexar_exige_extractor_de_pdf(self):
+        if extractor_pdf_disponible():
+            self.skipTest('pypdf está instalado')
+        informe = self.informes[0]
+        informe.documento.save('informe.pdf', SimpleUploadedFile('informe.pdf', b'%PDF-1.4 informe'))
+        with self.assertRaises(CommandError):
+            call_command('reindexar_informes', stdout=StringIO())
+        salida = StringIO()
+        call_command('reindexar_informes', '--sin-pdf', stdout=salida)
+        self.assertIn('informes reindexados', salida.getvalue())
+
+
+class BusquedaPracticasTests(APITestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create(username="practicas_busca", rol="PRACTICAS")
+        self.client.force_authenticate(self.usuario)
+        modulo = ModuloPracticas.objects.create(nombre="Redes", tipo_modulo="MODULO1")
+        self.docentes = [
+            Usuario.objects.create(username=f"docente_garcia{i}", first_name="García", rol="DOCENTE")
+            for i in range(3)
+        ]
+        self.practicas = []
+        for i in range(2):
+            estudiante = Usuario.objects.create(username=f"alumno_busca{i}", first_name=f"Alumno{i}", rol="ESTUDIANTE")
+            practica = Practica.objects.create(
+                estudiante=estudiante, modulo=modulo,
+                fecha_inicio="2024-01-01", fecha_fin="2024-06-30", estado="EN_CURSO"
+            )
+            self.practicas.append(practica)
+        self.practicas[0].supervisores.set(self.docentes)
+
+    def test_busqueda_por_supervisores_sin_duplicados(self):
+        response = self.client.get('/api/practicas/', {'search': 'garcía'})
+        self.assertEqual([d['id'] for d in response.data], [self.practicas[0].id])
+
+        # Cada término puede estar en un campo distinto
+        response = self.client.get('/api/practicas/', {'search': 'garcía alumno0'})
+        self.assertEqual([d['id'] for d in response.data], [self.practicas[0].id])
+        response = self.client.get('/api/practicas/', {'search': 'redes'})
+        self.assertEqual(len(response.data), 2)
+
+    def test_consulta_sin_join_con_supervisores(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get('/api/practicas/', {'search': 'garcía', 'supervisores': self.docentes[1].id})
+        sql = next(c['sql'] for c in consultas if c['sql'].startswith('SELECT "api_practica"."id"'))
+        self.assertNotIn('DISTINCT', sql)
+        self.assertIn('EXISTS', sql)
+        principal = sql.split('EXISTS')[0]
+        self.assertNotIn('api_practica_supervisores', principal)
+
+    def test_filtro_por_supervisor(self):
+        response = self.client.get(
+            '/api/practicas/', [('supervisores', self.docentes[0].id), ('supervisores', self.docentes[2].id)]
+        )
+        self.assertEqual([d['id'] for d in response.data], [self.practicas[0].id])
+
+        self.client.force_authenticate(self.docentes[1])
+        response = self.client.get('/api/practicas/', {'search': 'garcía'})
+        self.assertEqual([d['id'] for d in response.data], [self.practicas[0].id])
+
+
+class AuditoriaConsultasTests(TestCase):
+    def test_catalogo_sin_alertas(self):
+        salida = StringIO()
+        call_command('auditar_consultas', stdout=salida)
+        self.assertIn('Sin alertas', salida.getvalue())
+        self.assertIn('informes: pendientes_evaluacion', salida.getvalue())
+
+    def test_detecta_recorridos_y_ordenamientos(self):
+        from .management.commands.auditar_consultas import PLANES
+
+        sql, params = Informe.objects.filter(observaciones='x').order_by('contenido').query.sql_with_params()
+        with connection.cursor() as cursor:
+            _, alertas = PLANES[connection.vendor](cursor, sql, params)
+        tipos = {tipo for tipo, _ in alertas}
+        self.assertIn('recorrido completo', tipos)
+        self.assertTrue(any('filesort' in tipo or 'temporal' in tipo for tipo in tipos))
+
+
+class MetricasTests(APITestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        ajustes = override_settings(METRICAS_DIRECTORIO=self.directorio, METRICAS_TOKEN='secreto')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        registro_metricas.reiniciar()
+        self.addCleanup(registro_metricas.reiniciar)
+
+        self.usuario = Usuario.objects.create(username="practicas_metricas", rol="PRACTICAS")
+        self.client.force_authenticate(self.usuario)
+
+    def metricas(self):
+        return self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto').content.decode()
+
+    def test_metricas_por_vista_y_accion(self):
+        self.client.get('/api/practicas/')
+        self.client.get('/api/practicas/999/')
+        texto = self.metricas()
+
+        etiquetas = 'accion="list",metodo="GET",vista="practica-list"'
+        self.assertIn(
+            'efsrt_http_solicitudes_total{accion="list",estado="200",metodo="GET",vista="practica-list"} 1', texto
+        )
+        self.assertIn('accion="retrieve",estado="404",metodo="GET",vista="practica-detail"', texto)
+        self.assertIn(f'efsrt_http_solicitud_segundos_count{{{etiquetas}}} 1', texto)
+        self.assertIn(f'efsrt_db_consultas_por_solicitud_bucket{{{etiquetas},le="+Inf"}} 1', texto)
+        self.assertIn(f'efsrt_http_respuesta_bytes_sum{{{etiquetas}}} 2.0', texto)
+        self.assertIn('# TYPE efsrt_http_solicitud_segundos histogram', texto)
+
+    def test_spans(self):
+        modulo = ModuloPracticas.objects.create(nombre="Módulo Métricas", tipo_modulo="MODULO1")
+        practica = Practica.objects.create(
+            estudiante=Usuario.objects.create(username="estudiante_metricas", rol="ESTUDIANTE"),
+            modulo=modulo, fecha_inicio="2024-01-01", fecha_fin="2024-06-30", estado="EN_CURSO"
+        )
+        practica.calcular_nota_final()
+        with span('manual'):
+            pass
+        texto = self.metricas()
+        self.assertIn('efsrt_span_segundos_count{span="Practica.calcular_nota_final"} 1', texto)
+        self.assertIn('efsrt_span_segundos_count{span="manual"} 1', texto)
+
+    def test_suma_entre_procesos(self):
+        def trabajar():
+            registro_metricas.observar('span_segundos', {'span': 'hijo'}, 0.3)
+            registro_metricas.volcar(forzar=True)
+
+        for _ in range(2):
+            proceso = multiprocessing.get_context('fork').Process(target=trabajar)
+            proceso.start()
+            proceso.join()
+        registro_metricas.observar('span_segundos', {'span': 'hijo'}, 0.3)
+
+        texto = self.metricas()
+        self.assertIn('efsrt_span_segundos_count{span="hijo"} 3', texto)
+        self.assertIn('efsrt_span_segundos_bucket{span="hijo",le="0.25"} 0', texto)
+        self.assertIn('efsrt_span_segundos_bucket{span="hijo",le="0.5"} 3', texto)
+
+    def test_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(METRICAS_TOKEN=None)
+    def test_sin_token_solo_administradores(self):
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(Usuario.objects.create(username="admin_metricas", rol="ADMIN"))
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_200_OK)
+
+    def test_limpiar_directorio(self):
+        self.client.get('/api/practicas/')
+        registro_metricas.volcar(forzar=True)
+        self.assertTrue(os.listdir(self.directorio))
+        call_command('limpiar_metricas', stdout=StringIO())
+        self.assertEqual(os.listdir(self.directorio), [])
+
+
+class SembradoYMedicionTests(TestCase):
+    def test_sembrar_y_medir(self):
+        call_command(
+            'sembrar_datos', '--estudiantes', '30', '--docentes', '4', '--jurados', '4',
+            '--modulos', '1', '--dias', '3', stdout=StringIO()
+        )
+        self.assertEqual(Usuario.objects.filter(rol='ESTUDIANTE', perfil_estudiante__isnull=False).count(), 30)
+        practica = Practica.objects.filter(estado='EVALUADO').first()
+        self.assertEqual(practica.jurados.count(), 3)
+        self.assertIsNotNone(practica.nota_final)
+        en_curso = Practica.objects.filter(estado='EN_CURSO').first()
+        self.assertEqual(en_curso.asistencia_total, 3)
+        self.assertTrue(en_curso.supervisores.exists())
+        self.assertEqual(InformeIndexado.objects.count(), Informe.objects.count())
+
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        salida = os.path.join(directorio, 'medicion.json')
+        call_command('medir_endpoints', '--repeticiones', '3', '--calentamiento', '0', '--salida', salida,
+                     stderr=StringIO())
+        with open(salida) as origen:
+            medicion = json.load(origen)
+        self.assertEqual({r['rol'] for r in medicion['resultados']},
+                         {'PRACTICAS', 'DOCENTE', 'ESTUDIANTE', 'JURADO', 'SECRETARIA'})
+        for resultado in medicion['resultados']:
+            self.assertEqual(resultado['estados'], [200], resultado['url'])
+            self.assertLessEqual(resultado['p50_ms'], resultado['p99_ms'])
+
+
+def _crear_practica_con_jurados(sufijo):
+    modulo = ModuloPracticas.objects.create(nombre=f"Módulo {sufijo}", tipo_modulo="MODULO3")
+    practica = Practica.objects.create(
+        estudiante=Usuario.objects.create(username=f"evaluado_{sufijo}", rol="ESTUDIANTE"),
+        modulo=modulo, fecha_inicio="2024-01-01", fecha_fin="2024-06-30", estado="EN_CURSO"
+    )
+    jurados = [Usuario.objects.create(username=f"jurado_{sufijo}{i}", rol="JURADO") for i in range(4)]
+    for jurado in jurados[:3]:
+        AsignacionJurado.objects.create(practica=practica, jurado=jurado)
+    return practica, jurados
+
+
+class EvaluarPracticaTests(APITestCase):
+    def setUp(self):
+        self.practica, self.jurados = _crear_practica_con_jurados("ev")
+        self.url = '/api/evaluaciones/evaluar_practica/'
+
+    def evaluar(self, jurado, calificacion, practica_id=None):
+        self.client.force_authenticate(jurado)
+        return self.client.post(self.url, {
+            'practica_id': practica_id or self.practica.id, 'calificacion': calificacion
+        }, format='json')
+
+    def test_tercera_evaluacion_cierra_la_practica(self):
+        self.assertEqual(self.evaluar(self.jurados[0], 14).status_code, 201)
+        self.practica.refresh_from_db()
+        self.assertEqual(self.practica.nota_jurado, Decimal('14.00'))
+        self.assertEqual(self.practica.estado, 'EN_CURSO')
+
+        self.evaluar(self.jurados[1], 15)
+        # Bloqueo, verificación, inserción y recálculo: sin consultas por jurado
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.evaluar(self.jurados[2], 17)
+        self.assertEqual(response.status_code, 201)
+        escrituras = [c for c in consultas if not c['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(escrituras), 3)
+
+        self.practica.refresh_from_db()
+        self.assertEqual(self.practica.estado, 'EVALUADO')
+        self.assertEqual(self.practica.nota_jurado, Decimal('15.33'))
+        self.assertEqual(self.practica.nota_final, Decimal('15.33'))
+
+    def test_rechazos(self):
+        self.assertEqual(self.evaluar(self.jurados[3], 12).status_code, 403)
+        self.assertEqual(self.evaluar(self.jurados[0], 25).status_code, 400)
+        self.assertEqual(self.evaluar(self.jurados[0], 12, practica_id=999999).status_code, 404)
+
+        self.evaluar(self.jurados[0], 12)
+        response = self.evaluar(self.jurados[0], 13)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], 'Ya has evaluado esta práctica')
+        self.assertEqual(Evaluacion.objects.filter(practica=self.practica).count(), 1)
+
+
+class EvaluarPracticaConcurrenteTests(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Requiere una base en archivo compartida entre hilos')
+
+    def test_jurados_simultaneos(self):
+        practica, jurados = _crear_practica_con_jurados("conc")
+        barrera = threading.Barrier(6)
+        errores = []
+
+        def enviar(jurado, calificacion):
+            try:
+                barrera.wait()
+                Evaluacion.registrar(practica.id, jurado, Decimal(calificacion))
+            except Exception as e:
+                errores.append(e)
+            finally:
+                connections.close_all()
+
+        # Cada jurado envía dos veces a la vez: solo una de sus evaluaciones entra
+        hilos = [threading.Thread(target=enviar, args=(jurado, 12 + i % 3)) for i, jurado in enumerate(jurados[:3] * 2)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(len(errores), 3)
+        self.assertTrue(all(str(e.detail[0]) == 'Ya has evaluado esta práctica' for e in errores))
+        practica.refresh_from_db()
+        self.assertEqual(Evaluacion.objects.filter(practica=practica).count(), 3)
+        self.assertEqual(practica.estado, 'EVALUADO')
+        self.assertEqual(practica.nota_final, Decimal('13.00'))
+        self.assertEqual(practica.nota_jurado, Decimal('13.00'))
+
+
+@override_settings(RECALCULO_NOTAS_ASINCRONO=True)
+class RecalculoNotasTests(APITestCase):
+    def setUp(self):
+        modulo = ModuloPracticas.objects.create(nombre="Módulo Recálculo", tipo_modulo="MODULO2")
+        self.practica = Practica.objects.create(
+            estudiante=Usuario.objects.create(username="alumno_recalculo", rol="ESTUDIANTE"),
+            modulo=modulo, fecha_inicio="2024-01-01", fecha_fin="2024-06-30", estado="EN_CURSO"
+        )
+        self.informes = [
+            Informe.objects.create(practica=self.practica, contenido=f"Informe {i}") for i in range(3)
+        ]
+        self.client.force_authenticate(Usuario.objects.create(username="encargado_recalculo", rol="PRACTICAS"))
+
+    def evaluar(self, informe, calificacion, **extra):
+        return self.client.post(
+            f'/api/informes/{informe.id}/evaluar_informe/', {'calificacion': calificacion, **extra}, format='json'
+        )
+
+    def vencer(self):
+        RecalculoNota.objects.update(programado_para=timezone.now() - timedelta(seconds=1))
+
+    def test_disparos_seguidos_se_agrupan(self):
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.evaluar(self.informes[0], 14)
+        self.assertTrue(response.data['recalculo_pendiente'])
+        self.assertIsNone(response.data['nota_final'])
+        self.assertFalse(any('"api_evaluacion"' in c['sql'] for c in consultas))
+
+        primero = RecalculoNota.objects.get()
+        self.evaluar(self.informes[1], 16)
+        segundo = RecalculoNota.objects.get()
+        self.assertGreater(segundo.programado_para, primero.programado_para)
+        self.assertEqual(segundo.limite, primero.limite)
+
+        # Las postergaciones no pasan del límite
+        RecalculoNota.objects.update(limite=timezone.now())
+        self.evaluar(self.informes[2], 18)
+        recalculo = RecalculoNota.objects.get()
+        self.assertEqual(recalculo.programado_para, recalculo.limite)
+
+        salida = StringIO()
+        call_command('procesar_recalculos', '--una-vez', stdout=salida)
+        self.assertIn('1 notas recalculadas', salida.getvalue())
+        self.assertFalse(RecalculoNota.objects.exists())
+        self.practica.refresh_from_db()
+        # 16 * 0.3, sin asistencias ni jurados
+        self.assertEqual(self.practica.nota_final, Decimal('4.80'))
+
+    def test_no_procesa_antes_de_tiempo_ni_si_se_reprogramo(self):
+        self.evaluar(self.informes[0], 14)
+        self.assertEqual(RecalculoNota.procesar_vencidos(), (0, []))
+
+        self.vencer()
+        anterior = RecalculoNota.objects.values_list('practica_id', 'programado_para').get()
+        self.evaluar(self.informes[1], 16)
+        # Otro trabajador leyó la fila antes del nuevo disparo: no la toma
+        self.assertEqual(RecalculoNota._ejecutar([anterior]), (0, []))
+        self.assertTrue(RecalculoNota.objects.exists())
+
+    def test_lectura_consistente(self):
+        response = self.evaluar(self.informes[0], 14, consistente=True)
+        self.assertFalse(response.data['recalculo_pendiente'])
+        self.assertEqual(Decimal(response.data['nota_final']), Decimal('4.20'))
+        self.assertFalse(RecalculoNota.objects.exists())
+
+        self.evaluar(self.informes[1], 16)
+        url = f'/api/practicas/{self.practica.id}/'
+        self.assertEqual(Decimal(self.client.get(url).data['nota_final']), Decimal('4.20'))
+        self.assertEqual(Decimal(self.client.get(url, {'consistente': 'true'}).data['nota_final']), Decimal('4.50'))
+        self.assertFalse(RecalculoNota.objects.exists())
+
+    @override_settings(RECALCULO_NOTAS_CONSISTENTE_MAXIMO=1)
+    def test_listado_consistente_acotado(self):
+        otra = Practica.objects.create(
+            estudiante=Usuario.objects.create(username="alumno_recalculo2", rol="ESTUDIANTE"),
+            modulo=self.practica.modulo, fecha_inicio="2024-01-01", fecha_fin="2024-06-30", estado="EN_CURSO"
+        )
+        self.evaluar(self.informes[0], 14)
+        self.evaluar(Informe.objects.create(practica=otra, contenido="Informe"), 16)
+
+        response = self.client.get('/api/practicas/', {'consistente': 'true'})
+        self.assertEqual(response.status_code, 200)
+        # Solo el más antiguo; el otro queda para el trabajador
+        self.assertEqual(list(RecalculoNota.objects.values_list('practica_id', flat=True)), [otra.id])
+
+    def test_falla_repone_la_fila_aunque_el_modo_sea_sincrono(self):
+        self.evaluar(self.informes[0], 14)
+        self.vencer()
+        url = f'/api/practicas/{self.practica.id}/'
+        with override_settings(RECALCULO_NOTAS_ASINCRONO=False), \
+                mock.patch.object(Practica, 'calcular_nota_final', side_effect=RuntimeError('falla de prueba')):
+            response = self.client.get(url, {'consistente': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertGreater(RecalculoNota.objects.get().programado_para, timezone.now())
+
+    @override_settings(RECALCULO_NOTAS_ASINCRONO=False)
+    def test_modo_sincrono(self):
+        response = self.evaluar(self.informes[0], 14)
+        self.assertFalse(response.data['recalculo_pendiente'])
+        self.assertEqual(Decimal(response.data['nota_final']), Decimal('4.20'))
+        self.assertFalse(RecalculoNota.objects.exists())
+
+
+@tarea('prueba_eco')
+def _tarea_eco(trabajo, valor, pasos=1):
+    for paso in range(1, pasos + 1):
+        trabajo.informar(paso, total=pasos)
+    return {'valor': valor}
+
+
+@tarea('prueba_falla', max_intentos=2)
+def _tarea_falla(trabajo):
+    raise RuntimeError('falla de prueba')
+
+
+class TrabajosTests(APITestCase):
+    def setUp(self):
+        self.encargado = Usuario.objects.create(username="encargado_trabajos", rol="PRACTICAS")
+        self.client.force_authenticate(self.encargado)
+
+    def test_prioridad_progreso_y_resultado(self):
+        normal = encolar('prueba_eco', {'valor': 1})
+        urgente = encolar('prueba_eco', {'valor': 2, 'pasos': 4}, prioridad=5)
+        encolar('prueba_eco', {'valor': 3}, ejecutar_desde=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(Trabajo.tomar('prueba', 1), [urgente.pk])
+        # Otro trabajador no vuelve a tomar el que está en curso ni el programado a futuro
+        self.assertEqual(Trabajo.tomar('otro', 5), [normal.pk])
+
+        ejecutar(urgente.pk)
+        urgente.refresh_from_db()
+        self.assertEqual(urgente.estado, 'COMPLETADO')
+        self.assertEqual(urgente.resultado, {'valor': 2})
+        self.assertEqual((urgente.avance, urgente.total, urgente.intentos), (4, 4, 1))
+        with self.assertRaises(LookupError):
+            encolar('no_existe')
+
+    @override_settings(TRABAJOS_REINTENTO_BASE=60)
+    def test_reintentos_con_espera_y_fallo_definitivo(self):
+        trabajo = encolar('prueba_falla', usuario=self.encargado)
+        ejecutar(Trabajo.tomar('prueba')[0])
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'PENDIENTE')
+        self.assertIn('falla de prueba', trabajo.error)
+        self.assertGreater(trabajo.ejecutar_desde, timezone.now() + timedelta(seconds=45))
+        self.assertEqual(Trabajo.tomar('prueba'), [])
+
+        Trabajo.objects.update(ejecutar_desde=timezone.now())
+        ejecutar(Trabajo.tomar('prueba')[0])
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.intentos), ('FALLIDO', 2))
+
+        response = self.client.get(f'/api/trabajos/{trabajo.pk}/')
+        self.assertEqual(response.data['error'], 'RuntimeError: falla de prueba')
+
+    def test_abandonados_vuelven_a_la_cola(self):
+        trabajo = encolar('prueba_eco', {'valor': 1})
+        Trabajo.tomar('caido')
+        perdido = Trabajo.objects.get(pk=trabajo.pk)
+        Trabajo.objects.update(latido=timezone.now() - timedelta(minutes=10))
+
+        self.assertEqual(Trabajo.recuperar_abandonados(300), 1)
+        self.assertEqual(Trabajo.tomar('nuevo'), [trabajo.pk])
+        # El trabajador caído ya no puede cerrar el intento que perdió
+        self.assertEqual(perdido.completar({'valor': 'viejo'}), 0)
+        ejecutar(trabajo.pk)
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.resultado, trabajo.trabajador), ('COMPLETADO', {'valor': 1}, 'nuevo'))
+
+    def test_endpoints_de_estado_y_cancelacion(self):
+        response = self.client.post('/api/practicas/recalcular_agregados/', {'practicas': [1, 2]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        url = f"/api/trabajos/{response.data['id']}/"
+        self.assertEqual(response['Location'], url)
+        self.assertEqual(self.client.get(url).data['estado'], 'PENDIENTE')
+        self.assertEqual(len(self.client.get('/api/trabajos/', {'estado': 'PENDIENTE'}).data), 1)
+
+        self.client.force_authenticate(Usuario.objects.create(username="ajeno_trabajos", rol="PRACTICAS"))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(self.encargado)
+        self.assertEqual(self.client.post(url + 'cancelar/').data['estado'], 'CANCELADO')
+        self.assertEqual(self.client.post(url + 'cancelar/').status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Trabajo.tomar('prueba'), [])
+
+    def test_importacion_en_segundo_plano(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        self.client.force_authenticate(Usuario.objects.create(username="secretaria_trabajos", rol="SECRETARIA"))
+        archivo = SimpleUploadedFile("padron.csv", ImportacionEstudiantesTests.CSV.encode('utf-8'))
+        with override_settings(TRABAJOS_DIRECTORIO=media, IMPORTACION_PROCESOS=1):
+            response = self.client.post(
+                '/api/gestionar-estudiantes/importar/',
+                {'archivo': archivo, 'en_segundo_plano': 'true', 'dni_como_password': 'true'},
+                format='multipart'
+            )
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertFalse(Usuario.objects.filter(username="alumno1").exists())
+
+            ejecutar(Trabajo.tomar('prueba')[0])
+            self.assertEqual(os.listdir(media), [])
+
+        trabajo = Trabajo.objects.get()
+        self.assertEqual(trabajo.estado, 'COMPLETADO')
+        # Sin el usuario previo, "existente" también se crea
+        self.assertEqual(trabajo.resultado['creados'], 3)
+        self.assertTrue(Usuario.objects.filter(username="alumno1").exists())
+
+
+class EjecutarTrabajosComandoTests(TransactionTestCase):
+    def test_pool_de_hilos(self):
+        for i in range(5):
+            encolar('prueba_eco', {'valor': i}, prioridad=i)
+        encolar('prueba_falla')
+
+        salida = StringIO()
+        call_command('ejecutar_trabajos', '--una-vez', '--hilos', '2', '--tipo', 'prueba_eco', stdout=salida)
+        self.assertIn('5 trabajos ejecutados', salida.getvalue())
+        self.assertEqual(
+            sorted(Trabajo.objects.filter(estado='COMPLETADO').values_list('resultado__valor', flat=True)),
+            list(range(5))
+        )
+        self.assertEqual(Trabajo.objects.get(tipo='prueba_falla').estado, 'PENDIENTE')
@@ -1,12 +1,11 @@
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .views import (
     UsuarioViewSet, ModuloPracticasViewSet, PracticaViewSet,
     AsistenciaViewSet, InformeViewSet, EvaluacionViewSet,
-    GestionarEstudiantesViewSet, GestionarDocentesViewSet, EstudianteViewSet
+    GestionarEstudiantesViewSet, GestionarDocentesViewSet, EstudianteViewSet,
+    SubidaFragmentadaViewSet, DescargaArchivoView, TrabajoViewSet
 )
 
 router = DefaultRouter()
@@ -26,8 +25,16 @@ router.register(r'asistencias', AsistenciaViewSet, basename='asistencia')
 router.register(r'informes', InformeViewSet, basename='informe')
 router.register(r'evaluaciones', EvaluacionViewSet , basename='evaluacion')
 
+# Resumable uploads
+router.register(r'subidas', SubidaFragmentadaViewSet, basename='subida')
+
+# Background jobs
+router.register(r'trabajos', TrabajoViewSet, basename='trabajo')
+
 urlpatterns = [
     path('', include(router.urls)),
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    # Los archivos subidos ya no se exponen en MEDIA_URL: se descargan con control de acceso
+    path('archivos/<str:tipo>/<int:pk>/', DescargaArchivoView.as_view(), name='descarga_archivo'),
+]
\ No newline at end of file
@@ -1,24 +1,108 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import mixins, viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from django_filters import rest_framework as django_filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
-from rest_framework.exceptions import ValidationError, NotFound
+from rest_framework.exceptions import ValidationError, NotAuthenticated, NotFound, PermissionDenied
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Exists, OuterRef, Prefetch, Q
+from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
 from .models import *
 from .serializers import *
 from .permissions import *
+from .authentication import RefreshTokenConRol
+from .revocacion import registro_revocaciones
+from .busqueda import ordenar_por_relevancia, ranking_busqueda
+from .cache_respuestas import CacheRespuestasMixin, etiqueta
+from .condicional import RespuestaCondicionalMixin
+from .exportacion import ExportacionMixin
+from .filtros import BusquedaSinDuplicadosFilter
+from .importacion import ImportadorEstudiantes, leer_filas
+from .media import firma_valida, respuesta_archivo, url_descarga
+from .metricas import span
+from .tareas import encolar, guardar_archivo
+from .subidas import FragmentoInvalido, adjuntar_archivo, escribir_fragmento, ruta_parcial, tamano_bloque
+from .pagination import (
+    PaginacionUsuarios, PaginacionPracticas, PaginacionAsistencias, PaginacionInformes,
+    PaginacionJurados
+)
+
+
+def _select_usuario(forma, ruta, campo_orm):
+    """select_related para un UsuarioSerializer anidado, o None si solo se envía su id."""
+    if not forma.expande(ruta):
+        return None
+    if forma.incluye(f'{ruta}.estudiante_data'):
+        return f'{campo_orm}__perfil_estudiante'
+    return campo_orm
+
+
+def optimizar_practicas(queryset, forma, ruta='', orm=''):
+    """
+    Ajusta select_related/prefetch_related a la forma pedida para un
+    PracticaSerializer ubicado en `ruta` de la respuesta, con prefijo ORM `orm`.
+    """
+    def en_ruta(campo):
+        return f'{ruta}.{campo}' if ruta else campo
+
+    relacionados = [orm[:-2]] if orm else []
+    estudiante = _select_usuario(forma, en_ruta('estudiante'), f'{orm}estudiante')
+    if estudiante:
+        relacionados.append(estudiante)
+    if forma.expande(en_ruta('modulo')):
+        relacionados.append(f'{orm}modulo')
+    if relacionados:
+        queryset = queryset.select_related(*relacionados)
+
+    if forma.expande(en_ruta('supervisores')):
+        supervisores = Usuario.objects.all()
+        if forma.incluye(en_ruta('supervisores.estudiante_data')):
+            supervisores = supervisores.select_related('perfil_estudiante')
+    elif forma.incluye(en_ruta('supervisores')):
+        supervisores = Usuario.objects.only('id')
+    else:
+        return queryset
+    return queryset.prefetch_related(Prefetch(f'{orm}supervisores', queryset=supervisores))
+
+
+class PerfilSegunCamposMixin:
+    """Carga el perfil de estudiante solo si la respuesta incluye estudiante_data."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if FormaRespuesta(self.request).incluye('estudiante_data'):
+            queryset = queryset.select_related('perfil_estudiante')
+        return queryset
 
 
-class UsuarioViewSet(viewsets.ModelViewSet):
+class UsuarioViewSet(ExportacionMixin, PerfilSegunCamposMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
+    pagination_class = PaginacionUsuarios
+    columnas_exportacion = [
+        ('id', 'id'),
+        ('username', 'username'),
+        ('nombres', 'first_name'),
+        ('apellidos', 'last_name'),
+        ('email', 'email'),
+        ('dni', 'dni'),
+        ('rol', 'rol'),
+        ('telefono', 'telefono'),
+        ('carrera', 'perfil_estudiante__carrera'),
+        ('ciclo', 'perfil_estudiante__ciclo'),
+    ]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['username', 'first_name', 'last_name', 'email', 'dni']
     filterset_fields = ['rol','dni']
@@ -48,7 +132,7 @@ class UsuarioViewSet(viewsets.ModelViewSet):
                 }
                 Estudiante.objects.create(**estudiante_data)
             
-            refresh = RefreshToken.for_user(user)
+            refresh = RefreshTokenConRol.for_user(user)
             return Response({
                 'user': serializer.data,
                 'tokens': {
@@ -75,7 +159,9 @@ class UsuarioViewSet(viewsets.ModelViewSet):
 
             user.set_password(new_password)
             user.save()
-            refresh = RefreshToken.for_user(user)
+            # Los tokens emitidos con la contraseña anterior dejan de ser válidos
+            registro_revocaciones.revocar_usuario(user.id)
+            refresh = RefreshTokenConRol.for_user(user)
             return Response({
                 'message': 'Contraseña actualizada exitosamente',
                 'tokens': {
@@ -96,8 +182,10 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         try:
             refresh_token = request.data["refresh_token"]
             token = RefreshToken(refresh_token)
-            # Invalidamos el token estableciendo su expiración al pasado
-            token.set_exp(claim='exp', from_time=timezone.now(), lifetime=timedelta(seconds=0))
+            registro_revocaciones.revocar_token(token)
+            # El access token con el que se llamó también queda invalidado
+            if request.auth is not None:
+                registro_revocaciones.revocar_token(request.auth)
             return Response({'message': 'Sesión cerrada exitosamente'})
         except KeyError:
             return Response({'error': 'El campo refresh_token es requerido'}, status=400)
@@ -162,7 +250,7 @@ class EstudianteViewSet(viewsets.ModelViewSet):
         except Exception:
             raise NotFound('Estudiante no encontrado')
 
-class ModuloPracticasViewSet(viewsets.ModelViewSet):
+class ModuloPracticasViewSet(CacheRespuestasMixin, viewsets.ModelViewSet):
     queryset = ModuloPracticas.objects.all()
     serializer_class = ModuloPracticasSerializer
     permission_classes = [IsAuthenticated, EsEncargadoPracticas]
@@ -193,40 +281,134 @@ class ModuloPracticasViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated, EsEncargadoPracticas | EsCoordinadorAcademico | EsAdministrador])
+    def estadisticas(self, request):
+        modulos = ModuloPracticas.objects.order_by('id')
+        practicas = Practica.objects.order_by()
+        asistencias = Asistencia.objects.order_by()
+        informes = Informe.objects.order_by().filter(calificacion__isnull=True, fecha_evaluacion__isnull=True)
+
+        modulo_id = request.query_params.get('modulo')
+        if modulo_id:
+            try:
+                modulo_id = int(modulo_id)
+            except ValueError:
+                return Response({'error': 'Se requiere modulo numérico'}, status=status.HTTP_400_BAD_REQUEST)
+            modulos = modulos.filter(id=modulo_id)
+            practicas = practicas.filter(modulo_id=modulo_id)
+            asistencias = asistencias.filter(practica__modulo_id=modulo_id)
+            informes = informes.filter(practica__modulo_id=modulo_id)
+
+        # Una consulta agrupada por tabla, con conteos condicionales por estado
+        conteos_estado = {
+            estado: Count('id', filter=Q(estado=estado))
+            for estado, _ in Practica.ESTADO_CHOICES
+        }
+        por_practicas = {
+            fila['modulo_id']: fila
+            for fila in practicas.values('modulo_id').annotate(
+                total=Count('id'),
+                promedio=Avg('nota_final'),
+                calificadas=Count('id', filter=Q(nota_final__isnull=False)),
+                aprobadas=Count('id', filter=Q(nota_final__gte=NOTA_APROBATORIA)),
+                **conteos_estado
+            )
+        }
+        por_asistencias = {
+            fila['practica__modulo_id']: fila
+            for fila in asistencias.values('practica__modulo_id').annotate(
+                total=Count('id'),
+                asistidas=Count('id', filter=Q(asistio='ASISTIO'))
+            )
+        }
+        pendientes = dict(
+            informes.values('practica__modulo_id').annotate(
+                total=Count('id')
+            ).values_list('practica__modulo_id', 'total')
+        )
+
+        def porcentaje(parte, total):
+            return round(100 * parte / total, 2) if total else None
+
+        data = []
+        for modulo in modulos.values('id', 'nombre', 'tipo_modulo'):
+            fila = por_practicas.get(modulo['id'], {})
+            asistencia = por_asistencias.get(modulo['id'], {})
+            promedio = fila.get('promedio')
+            data.append({
+                **modulo,
+                'total_practicas': fila.get('total', 0),
+                'practicas_por_estado': {estado: fila.get(estado, 0) for estado in conteos_estado},
+                'promedio_nota_final': round(float(promedio), 2) if promedio is not None else None,
+                'tasa_aprobacion': porcentaje(fila.get('aprobadas', 0), fila.get('calificadas', 0)),
+                'tasa_asistencia': porcentaje(asistencia.get('asistidas', 0), asistencia.get('total', 0)),
+                'informes_pendientes': pendientes.get(modulo['id'], 0),
+            })
+
+        return Response({
+            'status': 'success',
+            'data': data
+        })
+
     @action(detail=True, methods=['get'], url_path='listar-jurados')
     def listar_jurados(self, request, pk=None):
         try:
             modulo = self.get_object()
-            asignaciones = AsignacionJurado.objects.filter(
-                practica__modulo=modulo
-            ).select_related(
-                'jurado',
-                'practica',
-                'practica__estudiante'
-            ).distinct()
-
-            jurados_data = {}
-            for asignacion in asignaciones:
-                jurado_id = asignacion.jurado.id
-                if jurado_id not in jurados_data:
-                    jurados_data[jurado_id] = {
-                        'jurado__id': jurado_id,
-                        'jurado__username': asignacion.jurado.username,
-                        'jurado__first_name': asignacion.jurado.first_name,
-                        'estudiantes': []
-                    }
-
-                jurados_data[jurado_id]['estudiantes'].append({
-                    'id': asignacion.practica.estudiante.id,
-                    'nombre': f"{asignacion.practica.estudiante.first_name} {asignacion.practica.estudiante.last_name}",
-                    'estado': asignacion.practica.estado,
-                    'fecha_asignacion': asignacion.fecha_asignacion
-                })
+            asignaciones = AsignacionJurado.objects.filter(practica__modulo=modulo)
+
+            # Jurados del módulo proyectados por columnas, en orden estable por id
+            jurados = asignaciones.values(
+                'jurado_id', 'jurado__username', 'jurado__first_name'
+            ).annotate(total_estudiantes=Count('id')).order_by('jurado_id')
+
+            paginador = PaginacionJurados()
+            pagina = paginador.paginate_queryset(jurados, request, view=self)
+            jurados = list(pagina if pagina is not None else jurados)
+
+            solo_conteo = request.query_params.get('solo_conteo') in ('1', 'true', 'True')
+            if not solo_conteo:
+                estudiantes = {}
+                for fila in asignaciones.filter(
+                    jurado_id__in=[jurado['jurado_id'] for jurado in jurados]
+                ).order_by(
+                    'jurado_id', 'practica__estudiante__last_name', 'practica__estudiante__first_name', 'id'
+                ).values(
+                    'jurado_id',
+                    'fecha_asignacion',
+                    'practica__estado',
+                    'practica__estudiante_id',
+                    'practica__estudiante__first_name',
+                    'practica__estudiante__last_name'
+                ):
+                    estudiantes.setdefault(fila['jurado_id'], []).append({
+                        'id': fila['practica__estudiante_id'],
+                        'nombre': f"{fila['practica__estudiante__first_name']} {fila['practica__estudiante__last_name']}",
+                        'estado': fila['practica__estado'],
+                        'fecha_asignacion': fila['fecha_asignacion']
+                    })
+
+            data = []
+            for jurado in jurados:
+                item = {
+                    'jurado__id': jurado['jurado_id'],
+                    'jurado__username': jurado['jurado__username'],
+                    'jurado__first_name': jurado['jurado__first_name'],
+                }
+                if solo_conteo:
+                    item['total_estudiantes'] = jurado['total_estudiantes']
+                else:
+                    item['estudiantes'] = estudiantes.get(jurado['jurado_id'], [])
+                data.append(item)
 
-            return Response({
+            respuesta = {
                 'status': 'success',
-                'data': list(jurados_data.values())
-            })
+                'data': data
+            }
+            if pagina is not None:
+                respuesta['next'] = paginador.get_next_link()
+                respuesta['previous'] = paginador.get_previous_link()
+            return Response(respuesta)
         except Exception as e:
             return Response({
                 'status': 'error',
@@ -284,19 +466,91 @@ class ModuloPracticasViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PracticaViewSet(viewsets.ModelViewSet):
+def lectura_bandera(request, nombre):
+    """Bandera booleana enviada como parámetro de consulta o en el cuerpo."""
+    valor = request.query_params.get(nombre)
+    if valor is None and isinstance(request.data, dict):
+        valor = request.data.get(nombre)
+    return str(valor) in ('1', 'true', 'True')
+
+
+def lectura_consistente(request):
+    """consistente=true: recalcular lo pendiente para leer lo recién escrito."""
+    return lectura_bandera(request, 'consistente')
+
+
+def recalcular_para_lectura(practicas, limite=None):
+    """
+    Recalcula lo pendiente de `practicas` antes de leerlas. Si algún recálculo
+    falla (queda reprogramado) devuelve la respuesta 503 a enviar; si no, None.
+    """
+    _, errores = RecalculoNota.procesar(practicas, limite)
+    if errores:
+        return Response(
+            {'error': 'No se pudieron recalcular las notas; se reintentará en segundo plano'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': str(settings.RECALCULO_NOTAS_ESPERA)}
+        )
+    return None
+
+
+def respuesta_trabajo(trabajo):
+    """202 con el trabajo encolado y su URL de estado para consultar el avance."""
+    url = reverse('trabajo-detail', args=[trabajo.pk])
+    return Response(TrabajoSerializer(trabajo).data, status=status.HTTP_202_ACCEPTED, headers={'Location': url})
+
+
+def supervisada_por(usuarios):
+    """EXISTS sobre la tabla intermedia: filtra por supervisor sin repetir prácticas."""
+    return Exists(Practica.supervisores.through.objects.filter(practica=OuterRef('pk'), usuario__in=usuarios))
+
+
+class PracticaFilter(django_filters.FilterSet):
+    supervisores = django_filters.ModelMultipleChoiceFilter(
+        queryset=Usuario.objects.filter(rol='DOCENTE'), method='filtrar_supervisores'
+    )
+
+    class Meta:
+        model = Practica
+        fields = {
+            'fecha_inicio': ['gte', 'lte', 'exact'],
+            'modulo__tipo_modulo': ['exact'],
+            'estudiante': ['exact'],
+            'estado': ['exact']
+        }
+
+    def filtrar_supervisores(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(supervisada_por([usuario.pk for usuario in value]))
+
+
+class PracticaViewSet(RespuestaCondicionalMixin, CacheRespuestasMixin, ExportacionMixin, viewsets.ModelViewSet):
     serializer_class = PracticaSerializer
+    modelos_anidados_etag = (Usuario, ModuloPracticas)
+    pagination_class = PaginacionPracticas
+    columnas_exportacion = [
+        ('id', 'id'),
+        ('estudiante', 'estudiante__username'),
+        ('nombres', 'estudiante__first_name'),
+        ('apellidos', 'estudiante__last_name'),
+        ('dni', 'estudiante__dni'),
+        ('modulo', 'modulo__nombre'),
+        ('tipo_modulo', 'modulo__tipo_modulo'),
+        ('estado', 'estado'),
+        ('fecha_inicio', 'fecha_inicio'),
+        ('fecha_fin', 'fecha_fin'),
+        ('horas_completadas', 'horas_completadas'),
+        ('nota_asistencia', 'nota_asistencia'),
+        ('nota_jurado', 'nota_jurado'),
+        ('nota_informe', 'nota_informe'),
+        ('nota_final', 'nota_final'),
+    ]
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-   
-    filterset_fields = {
-        'fecha_inicio': ['gte', 'lte', 'exact'],
-        'modulo__tipo_modulo': ['exact'],
-        'estudiante': ['exact'],
-        'supervisores': ['exact'],
-        'estado': ['exact']
-    }
-   
+    filter_backends = [BusquedaSinDuplicadosFilter, DjangoFilterBackend]
+    filterset_class = PracticaFilter
+
+    # Los campos de supervisores se buscan con EXISTS (ver BusquedaSinDuplicadosFilter)
     search_fields = [
         'estudiante__username',
         'estudiante__first_name',
@@ -309,13 +563,7 @@ class PracticaViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        base_queryset = Practica.objects.select_related(
-            'estudiante',
-            'modulo'
-        ).prefetch_related(
-            'supervisores',
-            'evaluacion_set__jurado'
-        )
+        base_queryset = optimizar_practicas(Practica.objects.all(), FormaRespuesta(self.request))
 
         if user.rol == 'ESTUDIANTE':
             unique_practice_ids = base_queryset.filter(
@@ -325,20 +573,86 @@ class PracticaViewSet(viewsets.ModelViewSet):
             ).values_list('max_id', flat=True)
             return base_queryset.filter(id__in=unique_practice_ids)
         elif user.rol == 'DOCENTE':
-            return base_queryset.filter(supervisores=user)
+            return base_queryset.filter(supervisada_por([user.pk]))
         elif user.rol == 'JURADO':
-            return base_queryset.filter(asignacionjurado__jurado=user)
+            return base_queryset.filter(
+                Exists(AsignacionJurado.objects.filter(practica=OuterRef('pk'), jurado=user))
+            )
         return base_queryset
 
+    def alcance_cache(self):
+        # Estudiantes, docentes y jurados ven solo sus prácticas
+        if self.request.user.rol in ('ESTUDIANTE', 'DOCENTE', 'JURADO'):
+            return f'{self.request.user.rol}:{self.request.user.id}'
+        return self.request.user.rol
+
+    def etiquetas_alcance(self):
+        if self.request.user.rol in ('ESTUDIANTE', 'DOCENTE', 'JURADO'):
+            return [etiqueta(Usuario, self.request.user.id)]
+        return []
+
+    def etiquetas_objeto(self, practica):
+        etiquetas = [
+            etiqueta(Practica, practica.pk),
+            etiqueta(Usuario, practica.estudiante_id),
+            etiqueta(ModuloPracticas, practica.modulo_id),
+        ]
+        # Los supervisores solo se serializan (y prefetchean) si la respuesta los pide
+        if 'supervisores' in getattr(practica, '_prefetched_objects_cache', {}):
+            etiquetas.extend(etiqueta(Usuario, s.pk) for s in practica.supervisores.all())
+        return etiquetas
+
+    def list(self, request, *args, **kwargs):
+        if lectura_consistente(request):
+            # Acotado: con muchos pendientes (cierre de ciclo) el resto queda para el
+            # trabajador en vez de recalcular toda la institución en una solicitud
+            error = recalcular_para_lectura(
+                self.filter_queryset(self.get_queryset()), settings.RECALCULO_NOTAS_CONSISTENTE_MAXIMO
+            )
+            if error:
+                return error
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if lectura_consistente(request):
+            error = recalcular_para_lectura(self.get_queryset().filter(pk=kwargs['pk']))
+            if error:
+                return error
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, EsEncargadoPracticas])
+    def recalcular_agregados(self, request):
+        """Reconstruye asistencia y notas de todas las prácticas (o de `practicas`) en segundo plano."""
+        practicas = request.data.get('practicas')
+        if practicas is not None and not (
+            isinstance(practicas, list) and all(isinstance(pk, int) for pk in practicas)
+        ):
+            return Response({'error': 'practicas debe ser una lista de ids'}, status=status.HTTP_400_BAD_REQUEST)
+        return respuesta_trabajo(encolar('recalcular_agregados', {'practicas': practicas}, usuario=request.user))
+
     @action(detail=True, methods=['post'])
     def calcular_nota(self, request, pk=None):
         practica = self.get_object()
+        # El recálculo explícito deja sin efecto el que estuviera programado
+        RecalculoNota.objects.filter(pk=practica.pk).delete()
         nota_final = practica.calcular_nota_final()
         return Response({'nota_final': nota_final})
 
-class AsistenciaViewSet(viewsets.ModelViewSet):
+class AsistenciaViewSet(ExportacionMixin, viewsets.ModelViewSet):
     queryset = Asistencia.objects.all()
     serializer_class = AsistenciaSerializer
+    pagination_class = PaginacionAsistencias
+    columnas_exportacion = [
+        ('id', 'id'),
+        ('practica', 'practica_id'),
+        ('estudiante', 'practica__estudiante__username'),
+        ('modulo', 'practica__modulo__nombre'),
+        ('fecha', 'fecha'),
+        ('asistio', 'asistio'),
+        ('puntualidad', 'puntualidad'),
+        ('puntaje_diario', 'puntaje_diario'),
+        ('puntaje_general', 'puntaje_general'),
+    ]
     permission_classes = [IsAuthenticated, EsDocente |EsEstudiante]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = {
@@ -353,27 +667,102 @@ class AsistenciaViewSet(viewsets.ModelViewSet):
         if user.rol == 'ESTUDIANTE':
             return Asistencia.objects.filter(practica__estudiante=user)
         return Asistencia.objects.none()
+
+    def get_queryset_exportacion(self):
+        # Los docentes exportan la asistencia de las prácticas que supervisan
+        if self.request.user.rol == 'DOCENTE':
+            return self.filter_queryset(
+                Asistencia.objects.filter(practica__supervisores=self.request.user)
+            )
+        return super().get_queryset_exportacion()
     @action(detail=False, methods=['get'], url_path='estudiante/(?P<user_id>[^/.]+)')
     def asistencias_estudiante(self, request, user_id=None):
         asistencias = Asistencia.objects.filter(
             practica__estudiante_id=user_id
         ).order_by('-fecha')
+        page = self.paginate_queryset(asistencias)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
         serializer = self.get_serializer(asistencias, many=True)
         return Response(serializer.data)
 
-    def perform_create(self, serializer):
-        asistencia = serializer.save()
-        asistencia.calcular_puntaje_diario()
-        asistencia.calcular_puntaje_general()
+    @action(detail=False, methods=['post'], url_path='registro-masivo',
+            permission_classes=[IsAuthenticated, EsDocente])
+    def registro_masivo(self, request):
+        filas = request.data.get('asistencias') if isinstance(request.data, dict) else request.data
+        if not isinstance(filas, list) or not filas:
+            return Response(
+                {'error': 'Se requiere una lista de asistencias'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Una sola instancia del serializer valida todas las filas con las mismas reglas
+        validador = AsistenciaLoteSerializer()
+        errores = []
+        validas = {}
+        for indice, fila in enumerate(filas):
+            try:
+                datos = validador.run_validation(fila)
+            except ValidationError as e:
+                errores.append({'indice': indice, 'errores': e.detail})
+                continue
+            datos['practica_id'] = datos.pop('practica')
+            clave = (datos['practica_id'], datos['fecha'])
+            if clave in validas:
+                errores.append({'indice': indice, 'errores': {'fecha': ['Registro duplicado en el lote']}})
+                continue
+            validas[clave] = (indice, datos)
+
+        practicas_supervisadas = set(Practica.objects.filter(
+            id__in={practica_id for practica_id, _ in validas},
+            supervisores=request.user
+        ).values_list('id', flat=True))
+
+        registros = []
+        for (practica_id, _), (indice, datos) in validas.items():
+            if practica_id not in practicas_supervisadas:
+                errores.append({'indice': indice, 'errores': {'practica': ['Práctica no encontrada o no supervisada']}})
+                continue
+            registros.append(datos)
+
+        creadas, actualizadas = Asistencia.registrar_lote(registros) if registros else (0, 0)
+        errores.sort(key=lambda error: error['indice'])
+
+        return Response({
+            'status': 'success' if registros else 'error',
+            'creadas': creadas,
+            'actualizadas': actualizadas,
+            'errores': errores
+        }, status=status.HTTP_200_OK if registros else status.HTTP_400_BAD_REQUEST)
+
 
-    def perform_update(self, serializer):
-        asistencia = serializer.save()
-        asistencia.calcular_puntaje_diario()
-        asistencia.calcular_puntaje_general()
+def informes_visibles(queryset, user):
+    """Informes que el usuario puede ver según su rol."""
+    if user.rol == 'ESTUDIANTE':
+        return queryset.filter(practica__estudiante=user)
+    elif user.rol == 'PRACTICAS':
+        return queryset
+    elif user.rol == 'DOCENTE':
+        return queryset.filter(practica__supervisores=user)
+    return queryset.none()
 
 
-class InformeViewSet(viewsets.ModelViewSet):
+class InformeViewSet(RespuestaCondicionalMixin, ExportacionMixin, viewsets.ModelViewSet):
     serializer_class = InformeSerializer
+    campos_modificacion_etag = ('practica__updated_at',)
+    modelos_anidados_etag = (Usuario, ModuloPracticas)
+    pagination_class = PaginacionInformes
+    columnas_exportacion = [
+        ('id', 'id'),
+        ('practica', 'practica_id'),
+        ('estudiante', 'practica__estudiante__username'),
+        ('modulo', 'practica__modulo__nombre'),
+        ('fecha_entrega', 'fecha_entrega'),
+        ('calificacion', 'calificacion'),
+        ('aprobado', 'aprobado'),
+        ('evaluado_por', 'evaluado_por__username'),
+        ('fecha_evaluacion', 'fecha_evaluacion'),
+    ]
     parser_classes = (MultiPartParser, FormParser, JSONParser)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['practica', 'aprobado']
@@ -381,18 +770,31 @@ class InformeViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Informe.objects.select_related(
-            'practica__estudiante',
-            'evaluado_por'
-        ).prefetch_related('practica__supervisores')
+        forma = FormaRespuesta(self.request)
+        relacionados = ['practica']
+        if forma.incluye('estudiante_nombre'):
+            relacionados.append('practica__estudiante')
+        if forma.incluye('modulo_nombre') or forma.incluye('modulo_tipo'):
+            relacionados.append('practica__modulo')
+        if forma.incluye('evaluador_nombre'):
+            relacionados.append('evaluado_por')
+        queryset = Informe.objects.select_related(*relacionados)
+        if forma.incluye('supervisores_nombres'):
+            queryset = queryset.prefetch_related('practica__supervisores')
+
+        return informes_visibles(queryset, user)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        # ?q= busca en el contenido y en el texto del documento, por relevancia
+        consulta = self.request.query_params.get('q', '').strip()
+        if consulta and self.action == 'list':
+            # La firma del ETag y el listado filtran el mismo queryset: se busca una sola vez
+            if getattr(self, '_ranking_busqueda', None) is None:
+                self._ranking_busqueda = ranking_busqueda(queryset, consulta)
+            queryset = ordenar_por_relevancia(queryset, self._ranking_busqueda)
+        return queryset
 
-        if user.rol == 'ESTUDIANTE':
-            return queryset.filter(practica__estudiante=user)
-        elif user.rol == 'PRACTICAS':
-            return queryset
-        elif user.rol == 'DOCENTE':
-            return queryset.filter(practica__supervisores=user)
-        return queryset.none()
     def create(self, request, *args, **kwargs):
         try:
             # Validar que el estudiante tenga una práctica activa
@@ -455,14 +857,19 @@ class InformeViewSet(viewsets.ModelViewSet):
             informe.fecha_evaluacion = timezone.now()
             informe.save()
 
-            # Actualizar estado de la práctica si es necesario
-            practica = informe.practica
-            practica.calcular_nota_final()
+            # informe.save() programa el recálculo de la nota final; quien lo
+            # pida con consistente=true recibe la nota ya recalculada
+            pendiente = settings.RECALCULO_NOTAS_ASINCRONO
+            if pendiente and lectura_consistente(request):
+                # La calificación ya quedó guardada: si el recálculo falla se informa como pendiente
+                pendiente = bool(RecalculoNota.procesar([informe.practica_id])[1])
+            practica = Practica.objects.only('nota_final').get(pk=informe.practica_id)
 
             return Response({
                 'message': 'Informe evaluado exitosamente',
                 'calificacion': informe.calificacion,
-                'nota_final': practica.nota_final
+                'nota_final': practica.nota_final,
+                'recalculo_pendiente': pendiente
             })
 
         except Exception as e:
@@ -494,24 +901,25 @@ class InformeViewSet(viewsets.ModelViewSet):
 
 
 
-class EvaluacionViewSet(viewsets.ModelViewSet):
+class EvaluacionViewSet(RespuestaCondicionalMixin, viewsets.ModelViewSet):
     serializer_class = EvaluacionSerializer
+    campos_modificacion_etag = ('practica__updated_at',)
+    modelos_anidados_etag = (Usuario, ModuloPracticas)
     permission_classes = [IsAuthenticated, EsJurado]
 
     def get_queryset(self):
-        return Evaluacion.objects.filter(
-            jurado=self.request.user
-        ).select_related(
-            'practica',
-            'practica__estudiante',
-            'practica__modulo'
-        )
-
-    @action(detail=False, methods=['get'])
-    def get_queryset(self):
-        if self.request.user.rol == 'JURADO':
-            return Evaluacion.objects.filter(jurado=self.request.user)
-        return Evaluacion.objects.none()
+        if self.request.user.rol != 'JURADO':
+            return Evaluacion.objects.none()
+        forma = FormaRespuesta(self.request)
+        queryset = Evaluacion.objects.filter(jurado=self.request.user)
+        jurado = _select_usuario(forma, 'jurado', 'jurado')
+        if jurado:
+            queryset = queryset.select_related(jurado)
+        if forma.expande('practica_details'):
+            queryset = optimizar_practicas(queryset, forma, 'practica_details', 'practica__')
+        return queryset
+
+    @action(detail=False, methods=['get'], url_path='mis-evaluaciones')
     def mis_evaluaciones(self, request):
         evaluaciones = self.get_queryset()
         serializer = self.get_serializer(evaluaciones, many=True)
@@ -521,83 +929,62 @@ class EvaluacionViewSet(viewsets.ModelViewSet):
         })
 
     @action(detail=False, methods=['post'])
+    @span('EvaluacionViewSet.evaluar_practica')
     def evaluar_practica(self, request):
-        try:
-            practica_id = request.data.get('practica_id')
-            if not practica_id:
-                return Response({"error": "practica_id es requerido"}, status=400)
-            
-            practica = Practica.objects.get(id=practica_id)
-            
-            # Verificar asignación del jurado
-            if not AsignacionJurado.objects.filter(
-                practica=practica, 
-                jurado=request.user
-            ).exists():
-                return Response({
-                    "error": "No estás asignado a esta práctica"
-                }, status=403)
-
-            # Verificar evaluación previa
-            if Evaluacion.objects.filter(
-                practica=practica, 
-                jurado=request.user
-            ).exists():
-                return Response({
-                    "error": "Ya has evaluado esta práctica"
-                }, status=400)
+        practica_id = request.data.get('practica_id')
+        if not practica_id:
+            return Response({"error": "practica_id es requerido"}, status=400)
 
-            # Verificar límite de evaluaciones
-            evaluaciones_count = Evaluacion.objects.filter(
-                practica=practica
-            ).count()
-            
-            if evaluaciones_count >= 3:
-                return Response({
-                    "error": "Esta práctica ya tiene el máximo de evaluaciones"
-                }, status=400)
+        try:
+            calificacion = Decimal(str(request.data.get('calificacion')))
+            if not 0 <= calificacion <= 20:
+                raise ValueError()
+        except (ArithmeticError, ValueError):
+            return Response({"error": "La calificación debe ser un número entre 0 y 20"}, status=400)
 
-            # Crear evaluación
-            evaluacion = Evaluacion.objects.create(
-                practica=practica,
-                jurado=request.user,
-                calificacion=request.data.get('calificacion'),
+        try:
+            evaluacion = Evaluacion.registrar(
+                practica_id,
+                request.user,
+                calificacion,
                 observaciones=request.data.get('observaciones', ''),
                 criterios_evaluados=request.data.get('criterios_evaluados', {})
             )
-
-            # Calcular nota final si es la tercera evaluación
-            if evaluaciones_count == 2:
-                evaluaciones = Evaluacion.objects.filter(practica=practica)
-                promedio = sum(e.calificacion for e in evaluaciones) / 3
-                practica.nota_final = round(promedio, 2)
-                practica.estado = 'EVALUADO'
-                practica.save()
-
-            return Response({
-                'status': 'success',
-                'message': 'Evaluación registrada exitosamente',
-                'data': self.get_serializer(evaluacion).data
-            }, status=201)
-
-        except Practica.DoesNotExist:
+        except (Practica.DoesNotExist, ValueError):
             return Response({
                 "error": "Práctica no encontrada"
             }, status=404)
-        except Exception as e:
-            return Response({
-                "error": str(e)
-            }, status=400)
+        except PermissionDenied as e:
+            return Response({"error": str(e.detail)}, status=403)
+        except ValidationError as e:
+            return Response({"error": str(e.detail[0])}, status=400)
+
+        return Response({
+            'status': 'success',
+            'message': 'Evaluación registrada exitosamente',
+            'data': self.get_serializer(evaluacion).data
+        }, status=201)
+
+
+
+class EstudianteUsuarioFilter(django_filters.FilterSet):
+    # carrera y ciclo viven en el perfil del estudiante, no en Usuario
+    carrera = django_filters.CharFilter(field_name='perfil_estudiante__carrera')
+    ciclo = django_filters.NumberFilter(field_name='perfil_estudiante__ciclo')
 
+    class Meta:
+        model = Usuario
+        fields = ['carrera', 'ciclo', 'dni']
 
 
-class GestionarEstudiantesViewSet(viewsets.ModelViewSet):
+class GestionarEstudiantesViewSet(PerfilSegunCamposMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.filter(rol='ESTUDIANTE')
     serializer_class = UsuarioSerializer
+    pagination_class = PaginacionUsuarios
     permission_classes = [IsAuthenticated, EsSecretaria]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['username', 'first_name', 'last_name', 'carrera','dni']
-    filterset_fields = ['carrera', 'ciclo','dni']
+    search_fields = ['username', 'first_name', 'last_name', 'perfil_estudiante__carrera','dni']
+    filterset_class = EstudianteUsuarioFilter
 
     @action(detail=False, methods=['post'])
     def asignar_modulo(self, request):
@@ -612,9 +999,36 @@ class GestionarEstudiantesViewSet(viewsets.ModelViewSet):
         
         return Response({'message': 'Estudiante asignado exitosamente al módulo'})
 
-class GestionarDocentesViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def importar(self, request):
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response({'error': 'Se requiere el archivo del padrón'}, status=status.HTTP_400_BAD_REQUEST)
+        if not archivo.name.lower().endswith(('.csv', '.xlsx')):
+            return Response({'error': 'El padrón debe ser un archivo CSV o XLSX'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dni_como_password = lectura_bandera(request, 'dni_como_password')
+        if lectura_bandera(request, 'en_segundo_plano'):
+            trabajo = encolar(
+                'importar_estudiantes',
+                {'archivo': guardar_archivo(archivo, 'padron'), 'nombre': archivo.name,
+                 'dni_como_password': dni_como_password},
+                usuario=request.user
+            )
+            return respuesta_trabajo(trabajo)
+
+        reporte = ImportadorEstudiantes(dni_como_password=dni_como_password).importar(
+            leer_filas(archivo, archivo.name)
+        )
+        return Response({
+            'status': 'success' if reporte['creados'] else 'error',
+            **reporte
+        }, status=status.HTTP_201_CREATED if reporte['creados'] else status.HTTP_400_BAD_REQUEST)
+
+class GestionarDocentesViewSet(CacheRespuestasMixin, PerfilSegunCamposMixin, viewsets.ModelViewSet):
     queryset = Usuario.objects.filter(rol='DOCENTE')
     serializer_class = UsuarioSerializer
+    pagination_class = PaginacionUsuarios
     permission_classes = [IsAuthenticated, EsEncargadoPracticas]
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['username', 'first_name', 'last_name','dni']
@@ -631,3 +1045,196 @@ class GestionarDocentesViewSet(viewsets.ModelViewSet):
         )
         
         return Response({'message': 'Docente asignado exitosamente como supervisor'})
+
+
+class SubidaFragmentadaViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                               mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    POST /subidas/ inicia, PUT /subidas/{id}/fragmento/?offset=N envía los bytes
+    crudos de un fragmento (opcionalmente con ?sha256=) y POST
+    /subidas/{id}/completar/ adjunta el archivo al destino. GET /subidas/{id}/
+    indica cuántos bytes se recibieron para reanudar.
+    """
+    serializer_class = SubidaFragmentadaSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return SubidaFragmentada.objects.filter(usuario=self.request.user)
+
+    def _objeto_destino(self, destino, objeto_id):
+        """Instancia destino si el usuario puede escribir en ella, con las reglas de cada viewset."""
+        user = self.request.user
+        if destino == 'informe':
+            if user.rol != 'ESTUDIANTE':
+                raise PermissionDenied('Solo el estudiante puede subir el documento de su informe')
+            objeto = Informe.objects.filter(pk=objeto_id, practica__estudiante=user).first()
+        elif destino in ('boleta_pago', 'fut'):
+            objeto = Estudiante.objects.select_related('usuario').filter(pk=objeto_id).first()
+            if objeto and objeto.usuario_id != user.id and user.rol not in ('SECRETARIA', 'ADMIN'):
+                raise PermissionDenied('No puede modificar los documentos de este estudiante')
+        else:
+            if user.rol != 'PRACTICAS':
+                raise PermissionDenied('Solo el encargado de prácticas puede subir la estructura')
+            objeto = ModuloPracticas.objects.filter(pk=objeto_id).first()
+        if objeto is None:
+            raise NotFound('El destino de la subida no existe')
+        return objeto
+
+    def perform_create(self, serializer):
+        self._objeto_destino(serializer.validated_data['destino'], serializer.validated_data['objeto_id'])
+        serializer.save(usuario=self.request.user)
+
+    def perform_destroy(self, instance):
+        if os.path.exists(ruta_parcial(instance)):
+            os.remove(ruta_parcial(instance))
+        instance.delete()
+
+    @action(detail=True, methods=['put'], parser_classes=[])
+    def fragmento(self, request, pk=None):
+        subida = self.get_object()
+        if subida.estado != 'EN_CURSO':
+            return Response({'error': 'La subida ya fue completada'}, status=status.HTTP_409_CONFLICT)
+        try:
+            offset = int(request.query_params.get('offset', ''))
+            longitud = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'Se requiere offset numérico'}, status=status.HTTP_400_BAD_REQUEST)
+        if offset != subida.recibido:
+            # El cliente reanuda desde `recibido`
+            return Response({'error': 'Offset inesperado', 'recibido': subida.recibido},
+                            status=status.HTTP_409_CONFLICT)
+
+        final = offset + longitud == subida.tamano
+        if (not 0 < longitud <= settings.SUBIDA_TAMANO_FRAGMENTO
+                or offset + longitud > subida.tamano
+                or (not final and longitud % tamano_bloque())):
+            return Response({
+                'error': f'Cada fragmento debe medir un múltiplo de {tamano_bloque()} bytes '
+                         f'(hasta {settings.SUBIDA_TAMANO_FRAGMENTO}), salvo el último'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            bloques, hash_contenido = escribir_fragmento(
+                subida, request.stream, longitud, request.query_params.get('sha256')
+            )
+        except FragmentoInvalido as e:
+            return Response({'error': str(e), 'recibido': subida.recibido},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # Condicionado a `recibido`: dos envíos simultáneos del mismo fragmento no avanzan dos veces
+        actualizadas = SubidaFragmentada.objects.filter(pk=subida.pk, recibido=offset).update(
+            recibido=offset + longitud,
+            hashes_bloques=''.join(bloques),
+            hash_contenido=hash_contenido if final else '',
+            actualizado=timezone.now()
+        )
+        if not actualizadas:
+            return Response({'error': 'El fragmento ya fue recibido'}, status=status.HTTP_409_CONFLICT)
+        return Response({'recibido': offset + longitud})
+
+    @action(detail=True, methods=['post'])
+    def completar(self, request, pk=None):
+        with transaction.atomic():
+            subida = self.get_queryset().select_for_update().filter(pk=pk).first()
+            if subida is None:
+                raise NotFound()
+            if subida.estado != 'EN_CURSO':
+                return Response({'error': 'La subida ya fue completada'}, status=status.HTTP_409_CONFLICT)
+            if subida.recibido != subida.tamano:
+                return Response({'error': 'Faltan fragmentos', 'recibido': subida.recibido},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            objeto = self._objeto_destino(subida.destino, subida.objeto_id)
+            _, campo = subida.modelo_destino()
+            nombre = adjuntar_archivo(objeto, campo, ruta_parcial(subida), subida.nombre, subida.hash_contenido)
+            subida.estado = 'COMPLETADA'
+            subida.save(update_fields=['estado', 'actualizado'])
+
+        return Response({
+            'archivo': url_descarga(subida.destino, objeto.pk, request),
+            'nombre': nombre,
+            'hash_contenido': subida.hash_contenido
+        })
+
+
+class DescargaArchivoView(APIView):
+    """
+    GET /archivos/{tipo}/{pk}/ entrega el documento de un informe, la boleta o
+    el FUT de un estudiante o la estructura de informe de un módulo, con las
+    mismas reglas de rol que los viewsets (o con una firma vigente).
+    """
+    permission_classes = [AllowAny]
+    CAMPOS = {
+        'informe': (Informe, 'documento'),
+        'boleta_pago': (Estudiante, 'boleta_pago'),
+        'fut': (Estudiante, 'fut'),
+        'estructura_informe': (ModuloPracticas, 'estructura_informe'),
+    }
+
+    def _visibles(self, tipo, user):
+        modelo, _ = self.CAMPOS[tipo]
+        if tipo == 'informe':
+            return informes_visibles(Informe.objects.all(), user)
+        if tipo in ('boleta_pago', 'fut'):
+            if user.rol in ('ADMIN', 'SECRETARIA', 'PRACTICAS'):
+                return Estudiante.objects.all()
+            return Estudiante.objects.filter(usuario=user)
+        if user.rol == 'PRACTICAS':
+            return ModuloPracticas.objects.all()
+        # Los demás ven la estructura de los módulos de las prácticas que les tocan
+        practicas = Practica.objects.all()
+        if user.rol == 'ESTUDIANTE':
+            practicas = practicas.filter(estudiante=user)
+        elif user.rol == 'DOCENTE':
+            practicas = practicas.filter(supervisores=user)
+        elif user.rol == 'JURADO':
+            practicas = practicas.filter(asignacionjurado__jurado=user)
+        return ModuloPracticas.objects.filter(pk__in=practicas.values('modulo_id'))
+
+    def get(self, request, tipo, pk):
+        if tipo not in self.CAMPOS:
+            raise NotFound()
+        modelo, campo = self.CAMPOS[tipo]
+
+        firma = request.query_params.get('firma')
+        if firma and firma_valida(firma, tipo, pk):
+            queryset = modelo.objects.all()
+        elif request.user and request.user.is_authenticated:
+            queryset = self._visibles(tipo, request.user)
+        else:
+            raise NotAuthenticated()
+
+        objeto = queryset.filter(pk=pk).only('pk', campo).first()
+        if objeto is None or not getattr(objeto, campo):
+            raise NotFound()
+        archivo = getattr(objeto, campo)
+        return respuesta_archivo(request, archivo, f'{tipo}_{pk}{os.path.splitext(archivo.name)[1]}')
+
+
+class TrabajoViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Estado de los trabajos en segundo plano para consultar su avance: cada
+    usuario ve los que encoló (el administrador, todos). POST
+    /trabajos/{id}/cancelar/ retira un trabajo que todavía no empezó.
+    """
+    serializer_class = TrabajoSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['estado', 'tipo']
+
+    def get_queryset(self):
+        trabajos = Trabajo.objects.order_by('-creado')
+        if self.request.user.rol == 'ADMIN':
+            return trabajos
+        return trabajos.filter(usuario=self.request.user)
+
+    @action(detail=True, methods=['post'])
+    def cancelar(self, request, pk=None):
+        trabajo = self.get_object()
+        if not trabajo.cancelar():
+            return Response(
+                {'error': f'No se puede cancelar un trabajo {trabajo.get_estado_display().lower()}'},
+                status=status.HTTP_409_CONFLICT
+            )
+        trabajo.refresh_from_db()
+        return Response(self.get_serializer(trabajo).data)
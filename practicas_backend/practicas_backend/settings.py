@@ -48,6 +48,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir la solicitud completa
+    'api.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     #conectar frontent modulo usado
@@ -149,12 +151,19 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.JWTAutenticacionConRol',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PaginacionCursor',
 }
+
+# Paginación por cursor: con False solo se pagina cuando el cliente envía
+# `cursor` o `page_size`, para mantener la respuesta en lista del frontend actual
+PAGINACION_OBLIGATORIA = os.environ.get('PAGINACION_OBLIGATORIA', 'False') == 'True'
+# Tope del conteo usado como estimación en motores sin EXPLAIN con filas (SQLite)
+LIMITE_CONTEO_ESTIMADO = 10000
 #implementacion para la autenticacion por tokens
 from datetime import timedelta
 
@@ -163,7 +172,31 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': False,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.TokenConRolSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.authentication.TokenRefreshConRevocacionSerializer',
+}
+
+# Con True, request.user se arma con los claims firmados del token (id, username,
+# rol) sin consultar la base de datos; un cambio de rol aplica al renovar el token
+JWT_SIN_ESTADO = os.environ.get('JWT_SIN_ESTADO', 'False') == 'True'
+# Cada cuántos segundos cada proceso trae de la base las revocaciones nuevas
+REVOCACION_INTERVALO_SYNC = 5
+
+# Caché de respuestas de lectura. Por defecto en memoria del proceso; con varios
+# procesos, CACHE_DIRECTORIO activa el backend de archivos compartido entre ellos
+CACHE_DIRECTORIO = os.environ.get('CACHE_DIRECTORIO')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIRECTORIO,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    } if CACHE_DIRECTORIO else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
 }
+CACHE_RESPUESTAS_ALIAS = 'default'
+CACHE_RESPUESTAS_TTL = 300
 
 #configuracion para la autenticacion por tokens (login)
 AUTH_USER_MODEL = 'api.Usuario'
@@ -187,3 +220,55 @@ CORS_ALLOW_METHODS = [
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Archivos subidos direccionados por contenido (cas/ab/cd/<hash>), con deduplicación
+STORAGES = {
+    'default': {'BACKEND': 'api.almacenamiento.AlmacenamientoPorContenido'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Cómo se envían las descargas: 'django' (desarrollo, con Range), 'x-accel' (nginx,
+# location internal en MEDIA_URL_INTERNA apuntando a MEDIA_ROOT) o 'x-sendfile'
+MEDIA_ENTREGA = os.environ.get('MEDIA_ENTREGA', 'django')
+MEDIA_URL_INTERNA = '/media-interna/'
+# Segundos de validez de los enlaces de descarga firmados que arman los serializers
+MEDIA_FIRMA_VIGENCIA = 3600
+
+# Subidas fragmentadas: los fragmentos intermedios deben ser múltiplos del bloque de hash
+HASH_TAMANO_BLOQUE = 4 * 1024 * 1024
+SUBIDA_TAMANO_FRAGMENTO = 2 * HASH_TAMANO_BLOQUE
+SUBIDA_TAMANO_MAXIMO = 200 * 1024 * 1024
+SUBIDA_VIGENCIA_HORAS = 24
+# Mismo disco que MEDIA_ROOT para mover el archivo terminado sin copiarlo
+SUBIDAS_DIRECTORIO = os.path.join(MEDIA_ROOT, 'subidas_parciales')
+
+# Búsqueda en informes: términos indexados como máximo por informe (contenido + documento)
+BUSQUEDA_MAX_TERMINOS = 50000
+BUSQUEDA_MAX_RESULTADOS = 500
+
+# Recálculo de notas finales. Por defecto se hace dentro de la solicitud; con
+# RECALCULO_NOTAS_ASINCRONO=True se difiere y se agrupa por práctica, y entonces hay
+# que correr el trabajador (manage.py procesar_recalculos) o las notas no se actualizan
+RECALCULO_NOTAS_ASINCRONO = os.environ.get('RECALCULO_NOTAS_ASINCRONO', 'False') == 'True'
+RECALCULO_NOTAS_ESPERA = 5
+RECALCULO_NOTAS_ESPERA_MAXIMA = 60
+# Recálculos que un listado con consistente=true ejecuta como máximo en la solicitud
+RECALCULO_NOTAS_CONSISTENTE_MAXIMO = 50
+
+# Trabajos en segundo plano (api/tareas.py, comando ejecutar_trabajos). Los
+# reintentos esperan TRABAJOS_REINTENTO_BASE * 2^(intento - 1) segundos, con tope
+TRABAJOS_REINTENTO_BASE = 30
+TRABAJOS_REINTENTO_MAXIMO = 3600
+# El trabajador marca un latido cada TRABAJOS_LATIDO segundos; un trabajo en curso
+# sin latido durante TRABAJOS_ABANDONO se devuelve a la cola
+TRABAJOS_LATIDO = 30
+TRABAJOS_ABANDONO = 300
+# Archivos subidos que esperan a que un trabajo los procese
+TRABAJOS_DIRECTORIO = os.path.join(MEDIA_ROOT, 'trabajos_pendientes')
+
+# Métricas (/metrics). Con varios procesos, METRICAS_DIRECTORIO es donde cada uno
+# vuelca las suyas para sumarlas; al iniciar el servicio, antes de levantar los
+# procesos, correr `manage.py limpiar_metricas` para vaciarlo
+METRICAS_DIRECTORIO = os.environ.get('METRICAS_DIRECTORIO')
+METRICAS_INTERVALO_ESCRITURA = 1.0
+# Si se define, /metrics exige "Authorization: Bearer <token>"; si no, un usuario ADMIN
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')